@@ -0,0 +1,266 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from channels import N_CHANNELS, as_block
+from ring_buffer import RingBuffer
+from sample_clock import SampleClock, UniformResampler
+from serial_link import DEFAULT_LATENCY, HISTOGRAM_BUCKETS, LinkReader
+from sources import test_signal
+
+# Control block at the start of the shared memory segment (int64 slots)
+HEAD = 0             # samples written so far, published after the data
+STATUS = 1           # one of the STATUS_* values below
+LINK_DROPPED = 2     # frames lost on the serial link (binary and Rice frames)
+LINK_CORRUPTED = 3   # frames or lines rejected by the decoder
+BYTES_READ = 4
+LATENCY_TARGET = 5   # read latency target in microseconds, written by the GUI
+BYTES_PER_S = 6
+LATENCY_MEAN = 7     # microseconds from a chunk's arrival to its publication
+LATENCY_MAX = 8
+READS = 9
+CHUNK_HISTOGRAM = 10                         # HISTOGRAM_BUCKETS slots of LinkReader.histogram
+MEASURED_RATE = 30   # SampleClock estimate in milli-samples/s, 0 until it has locked
+BLOCKS = 31          # blocks decoded
+WRITING = 32         # HEAD plus the block being written, published before the data
+CTRL_SLOTS = 33
+CTRL_BYTES = 8 * CTRL_SLOTS
+
+STATUS_STARTING = 0
+STATUS_SERIAL = 1
+STATUS_TEST = 2
+STATUS_STOPPED = 3
+
+LOOPBACK_PORT = 'loopback'
+
+
+def _open_port(port, baudrate):
+    """Open the serial port, or the firmware stand-in for LOOPBACK_PORT"""
+    if port == LOOPBACK_PORT:
+        from loopback import LoopbackDevice
+        return LoopbackDevice(baudrate=baudrate)
+    import serial
+    return serial.Serial(port=port, baudrate=baudrate, timeout=0.1)
+
+
+def _acquisition_main(shm_name, capacity, port, baudrate, protocol, sample_rate,
+                      interval, source, resample, stop_event):
+    """Body of the acquisition process: read, decode, publish into shared memory"""
+    from decoder import negotiate_protocol
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ctrl = np.ndarray((CTRL_SLOTS,), dtype=np.int64, buffer=shm.buf)
+    ring = RingBuffer(capacity, buffer=shm.buf[CTRL_BYTES:], item_shape=(N_CHANNELS,))
+    serial_port = None
+    try:
+        if source is None:
+            try:
+                serial_port = _open_port(port, baudrate)
+                decoder = negotiate_protocol(serial_port, protocol)
+                ctrl[STATUS] = STATUS_SERIAL
+            except Exception as e:
+                print(f"Serial connection failed: {e}, entering test mode")
+                # Same signals as SerialReader's test mode
+                source = test_signal(sample_rate, chunk_interval=interval)
+        if source is not None:
+            ctrl[STATUS] = STATUS_TEST
+            _run_source(source, ring, ctrl, stop_event)
+            return
+
+        # Reads block until a chunk arrives or the latency target passes, no fixed polling
+        link = LinkReader(serial_port, ctrl[LATENCY_TARGET] / 1e6)
+        clock = SampleClock(sample_rate)
+        resampler = UniformResampler(sample_rate) if resample else None
+        missing = 0     # frames lost before the last stamped block
+        while not stop_event.is_set():
+            if ctrl[LATENCY_TARGET] != round(link.latency * 1e6):
+                link.latency = ctrl[LATENCY_TARGET] / 1e6
+            raw_data = link.read()
+            arrival = time.perf_counter()
+            block = decoder.feed_channels(raw_data) if raw_data else np.empty((N_CHANNELS, 0))
+            if block.shape[1]:
+                gap = getattr(decoder, 'frames_missing', 0) - missing
+                missing += gap
+                clock.stamp(block.shape[1], arrival, gap=gap)
+                ctrl[BLOCKS] = clock.seq
+                ctrl[MEASURED_RATE] = round(clock.rate * 1e3) if clock.locked else 0
+                if resampler is not None:
+                    block = resampler.process(block, clock.rate)
+                ctrl[WRITING] = ring.head + block.shape[1]
+                ring.write(block.T)
+                ctrl[HEAD] = ring.head
+                link.delivered()
+            ctrl[BYTES_READ] = link.bytes_read
+            ctrl[BYTES_PER_S] = int(link.rate)
+            ctrl[LATENCY_MEAN] = int(link.delivery.mean * 1e6)
+            ctrl[LATENCY_MAX] = int(link.delivery.max * 1e6) if link.delivery.count else 0
+            ctrl[READS] = link.reads
+            ctrl[CHUNK_HISTOGRAM:CHUNK_HISTOGRAM + HISTOGRAM_BUCKETS] = link.histogram
+            ctrl[LINK_DROPPED] = getattr(decoder, 'frames_dropped', 0)
+            ctrl[LINK_CORRUPTED] = getattr(decoder, 'frames_corrupted',
+                                           getattr(decoder, 'lines_invalid', 0))
+    finally:
+        ctrl[STATUS] = STATUS_STOPPED
+        if source is not None:
+            source.stop()
+        if serial_port is not None and serial_port.is_open:
+            serial_port.close()
+        del ctrl, ring
+        shm.close()
+
+
+def _run_source(source, ring, ctrl, stop_event):
+    """Publish a SampleSource's chunks until it runs out or the GUI stops us"""
+    source.start()
+    while not stop_event.is_set() and not source.exhausted:
+        block = as_block(source.next_chunk())
+        if block.shape[1]:
+            ctrl[WRITING] = ring.head + block.shape[1]
+            ring.write(block.T)
+            ctrl[HEAD] = ring.head
+
+
+class SharedRingReader(RingBuffer):
+    """GUI-side view of the ring the acquisition process writes.
+
+    `head` only moves when read_new() takes a snapshot of the published write
+    index, so everything the GUI computes between two polls sees one
+    consistent set of samples while the producer keeps writing ahead.
+    Items are (N_CHANNELS,) rows, one per sample instant.
+    """
+
+    def __init__(self, capacity, buffer, ctrl):
+        super().__init__(capacity, buffer=buffer, item_shape=(N_CHANNELS,))
+        self._ctrl = ctrl
+        self.dropped = 0
+
+    def write(self, samples):
+        raise TypeError("the acquisition process is the only writer of a shared ring")
+
+    def reserve(self, capacity):
+        if capacity > self.capacity:
+            raise ValueError(f"shared ring holds {self.capacity} samples, {capacity} requested")
+
+    def clear(self, head=0):
+        raise TypeError("a shared ring cannot be cleared by the reader")
+
+    def read_new(self):
+        """Samples published since the last call, as (copy, absolute start index).
+
+        The new samples are copied out of shared memory, so the producer can
+        never change them while the GUI filters, triggers on or records them.
+        The copy is checked against WRITING afterwards: whatever the producer
+        may have started overwriting during the copy is discarded and counted
+        in `dropped`, like samples the GUI fell a whole ring behind on.
+        """
+        published = int(self._ctrl[HEAD])
+        start = self.head
+        if published - start > self.capacity:
+            # The GUI fell more than a whole ring behind: count and skip the overwritten part
+            self.dropped += published - start - self.capacity
+            start = published - self.capacity
+        self.head = published
+        values = self.since(start).copy()
+        torn = min(int(self._ctrl[WRITING]) - self.capacity - start, len(values))
+        if torn > 0:
+            self.dropped += torn
+            values = values[torn:]
+            start += torn
+        return values, start
+
+
+class AcquisitionProcess:
+    """Serial acquisition in a separate process, sharing samples through shared memory.
+
+    The child owns the port, decodes every chunk and appends it to a ring in a
+    multiprocessing.shared_memory segment, then publishes the new write index.
+    The GUI polls `ring.read_new()` for copies of the new samples and draws
+    from views of that ring, so painting, dialogs or an FFT in the GUI process
+    never stall acquisition; only falling (nearly) a whole ring behind loses
+    samples, counted in `dropped`.
+    """
+
+    def __init__(self, port='COM3', baudrate=115200, protocol='auto', capacity=1 << 20,
+                 sample_rate=1000, interval=0.02, source=None, latency=DEFAULT_LATENCY,
+                 resample=False):
+        self.port = port
+        self.source = source        # a SampleSource to publish instead of opening the port
+        self.baudrate = baudrate
+        self.protocol = protocol
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self.interval = interval    # chunk pacing of a SampleSource
+        self.latency = latency      # serial read latency target, seconds
+        self.resample = resample    # put the port's samples on a sample_rate grid (see UniformResampler)
+        self.process = None
+        self.shm = None
+        self.ring = None
+        self._ctrl = None
+        self._stop_event = None
+
+    @property
+    def dropped(self):
+        """Samples overwritten before the GUI could read them"""
+        return self.ring.dropped if self.ring is not None else 0
+
+    @property
+    def status(self):
+        return int(self._ctrl[STATUS]) if self._ctrl is not None else STATUS_STOPPED
+
+    def counters(self):
+        """Link-level counters published by the acquisition process"""
+        if self._ctrl is None:
+            return {}
+        return {'samples': int(self._ctrl[HEAD]),
+                'dropped': self.dropped,
+                'link_dropped': int(self._ctrl[LINK_DROPPED]),
+                'link_corrupted': int(self._ctrl[LINK_CORRUPTED]),
+                'bytes_read': int(self._ctrl[BYTES_READ]),
+                'bytes_per_s': float(self._ctrl[BYTES_PER_S]),
+                'reads': int(self._ctrl[READS]),
+                'chunk_histogram': self._ctrl[CHUNK_HISTOGRAM:CHUNK_HISTOGRAM + HISTOGRAM_BUCKETS].copy(),
+                'latency_mean': self._ctrl[LATENCY_MEAN] / 1e6,
+                'latency_max': self._ctrl[LATENCY_MAX] / 1e6,
+                'blocks': int(self._ctrl[BLOCKS]),
+                'sample_rate': self._ctrl[MEASURED_RATE] / 1e3 or self.sample_rate,
+                'rate_locked': bool(self._ctrl[MEASURED_RATE])}
+
+    def set_latency(self, seconds):
+        """Change the serial read latency target; the child picks it up on its next read"""
+        self.latency = seconds
+        if self._ctrl is not None:
+            self._ctrl[LATENCY_TARGET] = round(seconds * 1e6)
+
+    def start(self):
+        size = CTRL_BYTES + 2 * self.capacity * N_CHANNELS * np.dtype(np.float64).itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self._ctrl = np.ndarray((CTRL_SLOTS,), dtype=np.int64, buffer=self.shm.buf)
+        self._ctrl[:] = 0
+        self._ctrl[LATENCY_TARGET] = round(self.latency * 1e6)
+        self.ring = SharedRingReader(self.capacity, self.shm.buf[CTRL_BYTES:], self._ctrl)
+        self._stop_event = mp.Event()
+        self.process = mp.Process(
+            target=_acquisition_main,
+            args=(self.shm.name, self.capacity, self.port, self.baudrate, self.protocol,
+                  self.sample_rate, self.interval, self.source, self.resample, self._stop_event),
+            daemon=True)
+        self.process.start()
+
+    def stop(self, timeout=1.0):
+        """Stop the child, then release the shared memory"""
+        if self.process is not None:
+            self._stop_event.set()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout)
+            self.process = None
+        if self.shm is not None:
+            # Views into the segment must go before it can be closed
+            self.ring = None
+            self._ctrl = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
@@ -0,0 +1,67 @@
+"""ASCII vs binary framing: bytes per sample, decode throughput and loss accounting.
+
+Uses the loopback device, so no board is needed.
+Run from the repository root:  python benchmarks/bench_binary.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from decoder import BinaryFrameDecoder, negotiate_protocol  # noqa: E402
+from loopback import LoopbackDevice  # noqa: E402
+
+
+def capture(protocol, n_reads, **device_args):
+    """Pull n_reads chunks from a max-speed loopback; return (device, decoder, stats)"""
+    device = LoopbackDevice(realtime=False, **device_args)
+    decoder = negotiate_protocol(device, protocol, timeout=0.05)
+    chunks = [device.read_all() for _ in range(n_reads)]
+    start = time.perf_counter()
+    samples = sum(len(decoder.feed(chunk)) for chunk in chunks)
+    elapsed = time.perf_counter() - start
+    n_bytes = sum(len(chunk) for chunk in chunks)
+    return device, decoder, samples, n_bytes, elapsed
+
+
+def throughput():
+    print("protocol  bytes/sample  decode MS/s  max S/s @115200  max S/s @921600")
+    for protocol in ('ascii', 'binary'):
+        _, _, samples, n_bytes, elapsed = capture(protocol, 50, chunk_samples=20000, seed=1)
+        per_sample = n_bytes / samples
+        print(f"{protocol:<8}  {per_sample:12.2f}  {samples / elapsed / 1e6:11.2f}  "
+              f"{115200 / 10 / per_sample:15.0f}  {921600 / 10 / per_sample:15.0f}")
+
+
+def loss():
+    print("\nimpaired link (1% dropped, 1% corrupted units)")
+    for protocol in ('ascii', 'binary'):
+        device, decoder, samples, _, _ = capture(protocol, 50, chunk_samples=20000,
+                                                 drop_rate=0.01, corrupt_rate=0.01, seed=2)
+        if isinstance(decoder, BinaryFrameDecoder):
+            detected = (f"decoder: {decoder.frames_corrupted} corrupted, "
+                        f"{decoder.frames_dropped} sequence gaps")
+        else:
+            detected = f"decoder: {decoder.lines_invalid} invalid lines (drops undetectable)"
+        print(f"{protocol:<8} sent {device.units_sent} units, dropped {device.units_dropped}, "
+              f"corrupted {device.units_corrupted}; {detected}; "
+              f"{samples} samples out, {device.samples_sent} clean samples sent")
+
+
+def realtime(seconds=2.0):
+    print(f"\nrealtime loopback at 115200 baud, 20 kS/s requested, {seconds:.0f} s")
+    for protocol in ('ascii', 'binary'):
+        device = LoopbackDevice(baudrate=115200, sample_rate=20000, seed=3)
+        decoder = negotiate_protocol(device, protocol, timeout=0.1)
+        samples = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            time.sleep(0.01)
+            samples += len(decoder.feed(device.read_all()))
+        print(f"{protocol:<8} {samples / seconds:8.0f} S/s delivered")
+
+
+if __name__ == "__main__":
+    throughput()
+    loss()
+    realtime()
@@ -0,0 +1,55 @@
+"""Frame time of the waveform plot against buffer depth, with and without min/max decimation.
+
+Each frame appends a 100 ms chunk to the ring buffer, takes the newest
+`depth` samples, hands them to the curve and renders the plot offscreen,
+which is what update_waveform does every timer tick.
+Run from the repository root:  python benchmarks/bench_decimation.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pyqtgraph as pg  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from decimation import MinMaxDecimator  # noqa: E402
+from ring_buffer import RingBuffer  # noqa: E402
+
+WIDTH = 1500   # plot width in pixels
+FRAMES = 10
+
+
+def frame_time(plot, curve, depth, decimate):
+    rng = np.random.default_rng(0)
+    chunk = max(depth // 10, 1)
+    ring = RingBuffer(depth)
+    ring.write(rng.normal(size=depth))
+    time_buffer = np.linspace(0, 1.0, depth)
+    decimator = MinMaxDecimator(WIDTH)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        ring.write(rng.normal(size=chunk))
+        data = ring.latest(depth)
+        if decimate:
+            positions, values = decimator.decimate(data, ring.head - depth)
+            curve.setData(time_buffer[positions], values)
+        else:
+            curve.setData(time_buffer, data)
+        plot.grab()
+    return (time.perf_counter() - start) / FRAMES
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    plot = pg.PlotWidget()
+    plot.resize(WIDTH, 600)
+    curve = plot.plot([], [], pen=pg.mkPen('y', width=2))
+    print(f"{'depth':>10} {'full (ms)':>12} {'decimated (ms)':>15}")
+    for depth in (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7):
+        full = frame_time(plot, curve, depth, False) if depth <= 10 ** 6 else float('nan')
+        decimated = frame_time(plot, curve, depth, True)
+        print(f"{depth:>10} {full * 1e3:>12.2f} {decimated * 1e3:>15.2f}")
@@ -0,0 +1,119 @@
+"""Throughput of the batch ASCII decoder against the original per-line loop.
+
+Run from the repository root:  python benchmarks/bench_decoder.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from decoder import AsciiFrameDecoder  # noqa: E402
+
+
+class LegacyDecoder:
+    """The per-line loop formerly inlined in SerialReader._run_serial_mode"""
+
+    def __init__(self):
+        self.last_valid_value = None
+        self.last_values = [None, None]
+
+    def feed(self, chunk):
+        raw_data = chunk.decode('ascii', errors='ignore')
+        values = []
+        for line in raw_data.strip().split('\n'):
+            try:
+                parts = line.strip().split('#')
+                if len(parts) < 2 or len(parts[0]) < 2 or len(parts[1]) < 2:
+                    raise ValueError("Incomplete data")
+                raw1 = float(parts[0])
+                raw2 = float(parts[1])
+                value1 = raw1 * 3.3 / 4095
+                value2 = raw2 * (-3.3) / 4095
+                if raw1 <= 51:
+                    value1 = 0
+                if raw2 <= 51:
+                    value2 = 0
+                combined = value1 + value2
+                threshold = 0.7
+                if self.last_valid_value is None:
+                    self.last_valid_value = combined
+                    self.last_values = [combined, combined]
+                else:
+                    diff1 = abs(combined - self.last_values[-1])
+                    diff2 = abs(combined - self.last_values[-2])
+                    if diff1 < threshold or diff2 < threshold:
+                        self.last_valid_value = combined
+                    else:
+                        combined = self.last_valid_value
+                    self.last_values.append(self.last_valid_value)
+                    self.last_values = self.last_values[-2:]
+                values.append(combined)
+            except Exception:
+                values.append(self.last_valid_value)
+        return values
+
+
+def make_stream(n, seed=0, corrupt=0.0):
+    """Firmware-like lines: a noisy sine on both channels with occasional spikes"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    raw1 = np.clip(2048 + 1500 * np.sin(2 * np.pi * t / 97) + rng.normal(0, 40, n), 0, 4095)
+    raw2 = np.clip(600 + rng.normal(0, 30, n), 0, 4095)
+    spikes = rng.random(n) < 0.01
+    raw1[spikes] = rng.integers(0, 4096, spikes.sum())
+    lines = [f"{a}#{b}\n" for a, b in zip(raw1.astype(int), raw2.astype(int))]
+    if corrupt:
+        junk = ["#12\n", "7#3\n", "12 #340\n", "\n", "abc\n", "99#+42\n", "4095#4095\r\n"]
+        for i in np.flatnonzero(rng.random(n) < corrupt):
+            lines[i] = junk[i % len(junk)]
+    return ''.join(lines).encode('ascii')
+
+
+def split_chunks(stream, size):
+    return [stream[i:i + size] for i in range(0, len(stream), size)]
+
+
+def check_equivalence():
+    """Random chunking of the stream must match the legacy loop on whole lines"""
+    for seed, corrupt in [(1, 0.0), (2, 0.05), (3, 0.3)]:
+        stream = make_stream(20000, seed=seed, corrupt=corrupt)
+        expected = LegacyDecoder().feed(stream)
+        first = next(i for i, v in enumerate(expected) if v is not None)
+        expected = np.array(expected[first:], dtype=float)
+
+        decoder = AsciiFrameDecoder()
+        rng = np.random.default_rng(seed)
+        out, pos = [], 0
+        while pos < len(stream):
+            step = int(rng.integers(1, 400))
+            out.append(decoder.feed(stream[pos:pos + step]))
+            pos += step
+        got = np.concatenate(out)
+        assert np.array_equal(got, expected), f"mismatch (seed={seed})"
+    print("equivalence: OK")
+
+
+def bench(decoder_cls, chunks, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        decoder = decoder_cls()
+        start = time.perf_counter()
+        n = 0
+        for chunk in chunks:
+            n += len(decoder.feed(chunk))
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+if __name__ == "__main__":
+    check_equivalence()
+    stream = make_stream(500000)
+    # 1150 bytes is what read_all() returns at 115200 baud every 100 ms
+    for chunk_size in (1150, 11500, 115000):
+        chunks = split_chunks(stream, chunk_size)
+        legacy = bench(LegacyDecoder, chunks)
+        batch = bench(AsciiFrameDecoder, chunks)
+        print(f"chunk {chunk_size:>6} B: legacy {legacy / 1e6:6.2f} MS/s   "
+              f"batch {batch / 1e6:6.2f} MS/s   x{batch / legacy:.1f}")
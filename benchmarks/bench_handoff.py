@@ -0,0 +1,106 @@
+"""Lag and memory of the reader-to-GUI hand-off when the consumer stalls.
+
+A producer thread queues (2, BLOCK) blocks at BLOCK_RATE per second, as
+SerialReader does; the consumer drains them, spends COST seconds per
+block and stalls for STALL seconds once, like a GUI busy with a dialog
+or a large redraw. "unbounded" is the behaviour of emitting every block
+as a Qt signal: nothing is lost but everything waits. Reported per
+policy: the most blocks that were waiting, the worst and the final lag
+(age of a block when it was processed), and the blocks lost or merged.
+Both bounded policies that drop data must keep the worst lag within
+LAG_BUDGET, twice the queue's depth in blocks plus their processing.
+Run from the repository root:  python benchmarks/bench_handoff.py
+"""
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handoff import COALESCE, DEFAULT_BLOCKS, DROP_OLDEST, HANDOFF_POLICIES, BlockQueue  # noqa: E402
+
+BLOCK = 1000
+BLOCK_RATE = 200        # blocks/s
+COST = 0.004            # consumer seconds per block: 80 % busy
+STALL = 1.0
+DURATION = 4.0
+LAG_BUDGET = 2 * DEFAULT_BLOCKS * (1 / BLOCK_RATE + COST)
+
+
+class Unbounded:
+    """Every block handed over on its own, like one queued signal per block"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def put(self, block):
+        self.queue.put(block)
+        return True
+
+    def take(self):
+        blocks = []
+        while not self.queue.empty():
+            blocks.append((0, self.queue.get()))
+        return blocks
+
+    def close(self):
+        pass
+
+    def __len__(self):
+        return self.queue.qsize()
+
+
+def run(handoff):
+    stop = threading.Event()
+    wake = threading.Event()
+
+    def produce():
+        start = time.perf_counter()
+        k = 0
+        while not stop.is_set():
+            delay = start + k / BLOCK_RATE - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            block = np.full((2, BLOCK), time.perf_counter())
+            if handoff.put(block):
+                wake.set()
+            k += 1
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    t0 = time.perf_counter()
+    stalled = False
+    lags = []
+    peak = 0
+    while time.perf_counter() - t0 < DURATION:
+        wake.wait(0.1)
+        wake.clear()
+        peak = max(peak, len(handoff))
+        if not stalled and time.perf_counter() - t0 > 1.0:
+            stalled = True
+            time.sleep(STALL)
+            peak = max(peak, len(handoff))
+        for _, block in handoff.take():
+            # Processing one block; the first sample carries its queueing time
+            time.sleep(COST)
+            lags.append(time.perf_counter() - block[0, 0])
+    stop.set()
+    handoff.close()
+    producer.join()
+    return peak, max(lags), lags[-1]
+
+
+if __name__ == "__main__":
+    print(f"{'policy':>12} {'peak blocks':>12} {'max lag s':>10} {'final lag s':>12} {'dropped':>8} {'coalesced':>10}")
+    cases = [('unbounded', Unbounded())] + [(p, BlockQueue(policy=p)) for p in HANDOFF_POLICIES]
+    for name, handoff in cases:
+        peak, worst, final = run(handoff)
+        counters = handoff.counters() if isinstance(handoff, BlockQueue) else {}
+        print(f"{name:>12} {peak:>12} {worst:>10.2f} {final:>12.2f} "
+              f"{counters.get('blocks_dropped', 0):>8} {counters.get('blocks_coalesced', 0):>10}")
+        if name in (DROP_OLDEST, COALESCE):
+            assert worst < LAG_BUDGET, f"{name} lag {worst:.2f} s over the {LAG_BUDGET:.2f} s budget"
@@ -0,0 +1,93 @@
+"""Cost and trigger stability of the sin(x)/x display reconstruction.
+
+The first table times SincInterpolator.upsample() on n visible samples at
+the factor draw_trace picks for a 1500-column plot, with the windows
+taken from rings of increasing depth: the cost follows the samples on
+screen, not the memory behind them. The FFT row is the alternative
+(zero-padding the spectrum of the same window) for comparison.
+
+The second part feeds a 1 kS/s sine whose frequency is not a divisor of
+the sample rate through TriggerEngine and reconstructs the window around
+every trigger. Reported: the spread of where the sine's true rising zero
+crossing is drawn, relative to the trigger point, when frames are placed
+on the trigger sample only and when they are shifted by the sub-sample
+offset found on the interpolated trace (what trigger_offset() does).
+Run from the repository root:  python benchmarks/bench_interpolation.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpolation import HALF_WIDTH, SEARCH, SincInterpolator, crossing, upsample_factor  # noqa: E402
+from ring_buffer import RingBuffer  # noqa: E402
+from trigger import TriggerEngine  # noqa: E402
+
+COLUMNS = 1500          # MinMaxDecimator's default, the points draw_trace aims for
+CHANNELS = 2
+SAMPLE_RATE = 1000
+FREQUENCY = 37.3        # Hz: triggers land at every phase relative to the samples
+WINDOW = 20             # samples on screen in the jitter test
+
+
+def timed(fn, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def fft_upsample(block, factor):
+    n = block.shape[-1]
+    return np.fft.irfft(np.fft.rfft(block, axis=-1), n * factor, axis=-1) * factor
+
+
+def jitter(align):
+    """Standard deviation, in samples, of the drawn zero crossing around the trigger point"""
+    t = np.arange(200 * SAMPLE_RATE // 10) / SAMPLE_RATE
+    stream = np.sin(2 * np.pi * FREQUENCY * t) + np.random.default_rng(0).normal(0, 0.002, len(t))
+    pre = WINDOW // 2
+    trigger = TriggerEngine(level=0.0, hysteresis=0.05, pre_trigger=pre, post_trigger=WINDOW - pre)
+    fired = trigger.process(stream, 0)
+    interpolator = SincInterpolator()
+    factor = upsample_factor(WINDOW, COLUMNS)
+    found = []
+    for position in fired:
+        start = position - pre - HALF_WIDTH
+        if start < 0 or start + WINDOW + 2 * HALF_WIDTH > len(stream):
+            continue
+        shift = 0.0
+        if align:
+            values = interpolator.upsample(stream[np.newaxis, start:start + WINDOW + 2 * HALF_WIDTH], factor)[0]
+            i = pre * factor
+            at = crossing(values, i - SEARCH * factor, i, 0.0)
+            shift = 0.0 if at is None else at / factor - pre
+        # The true crossing nearest the trigger sample (noise can fire it a hair early),
+        # in samples from the trigger point on screen
+        true = np.round(position * FREQUENCY / SAMPLE_RATE) * SAMPLE_RATE / FREQUENCY
+        found.append(true - position - shift)
+    return np.std(found), len(found)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    interpolator = SincInterpolator()
+    print(f"{'visible n':>10} {'factor':>7} {'ring depth':>11} {'sinc us':>8} {'fft us':>7}")
+    for n in [10, 50, 100, 300]:
+        factor = upsample_factor(n, COLUMNS)
+        for depth in [10_000, 1_000_000]:
+            ring = RingBuffer(depth, item_shape=(CHANNELS,))
+            ring.write(rng.normal(size=(depth, CHANNELS)))
+            block = ring.latest(n + 2 * HALF_WIDTH).T
+            sinc = timed(lambda: interpolator.upsample(block, factor))
+            fft = timed(lambda: fft_upsample(block[:, HALF_WIDTH:-HALF_WIDTH], factor))
+            print(f"{n:>10} {factor:>7} {depth:>11} {sinc * 1e6:>8.1f} {fft * 1e6:>7.1f}")
+
+    print()
+    for align in [False, True]:
+        spread, frames = jitter(align)
+        label = "sub-sample aligned" if align else "trigger sample only"
+        print(f"{label:>20}: level crossing std {spread:.4f} samples over {frames} frames")
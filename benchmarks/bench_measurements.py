@@ -0,0 +1,82 @@
+"""Automatic measurements: accuracy, per-chunk cost and statistics memory.
+
+A trapezoidal pulse train with known frequency, duty cycle and edge times
+is fed to MeasurementEngine in random-sized chunks. The engine measures
+each chunk once as it arrives; the alternative rescans the whole displayed
+window every frame and keeps every past value to compute statistics.
+Run from the repository root:  python benchmarks/bench_measurements.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from measurements import (DUTY, FALL, FREQUENCY, MEASUREMENTS, RISE, MeasurementEngine,  # noqa: E402
+                          RunningStats)
+
+FS = 100_000
+FREQ = 1000.0
+DUTY_CYCLE = 0.3
+EDGE = 20            # samples from base to top
+FRAME = 20_000       # displayed window
+
+
+def pulse_train(n, noise=0.01, seed=0):
+    """Trapezoid between -1 and 1 V with linear EDGE-sample edges"""
+    phase = (np.arange(n) * FREQ / FS) % 1.0
+    ramp = EDGE * FREQ / FS
+    x = np.clip(np.minimum(phase / ramp, (DUTY_CYCLE + ramp - phase) / ramp), 0, 1) * 2 - 1
+    return x + np.random.default_rng(seed).normal(0, noise, n)
+
+
+if __name__ == "__main__":
+    x = pulse_train(2_000_000)
+
+    engine = MeasurementEngine(fs=FS)
+    rng = np.random.default_rng(1)
+    i = 0
+    while i < len(x):
+        n = int(rng.integers(1, 5000))
+        engine.process(x[i:i + n], i)
+        i += n
+        if i >= FRAME:
+            engine.measure_frame(x[i - FRAME:i], i - FRAME)
+    edge_time = 0.8 * EDGE / FS
+    expected = {FREQUENCY: FREQ, DUTY: 100 * DUTY_CYCLE,
+                RISE: edge_time, FALL: edge_time}
+    print("accuracy, random chunks of 1..5000 samples, 10 mV noise")
+    print(f"{'measurement':>12} {'expected':>12} {'mean':>12} {'std':>12} {'count':>8}")
+    for name in MEASUREMENTS:
+        stats = engine.stats[name]
+        target = expected.get(name, float('nan'))
+        print(f"{name:>12} {target:12.6g} {stats.mean:12.6g} {stats.std:12.3g} {stats.count:8d}")
+
+    print()
+    print("edge measurements per chunk (MS/s of stream)")
+    for chunk in (100, 1000, 10000):
+        engine = MeasurementEngine(fs=FS)
+        engine.measure_frame(x[:FRAME], -1)
+        start = time.perf_counter()
+        for j in range(0, len(x), chunk):
+            engine.process(x[j:j + chunk], j)
+        elapsed = time.perf_counter() - start
+        print(f"chunk {chunk:6d}: {len(x) / elapsed / 1e6:8.2f} MS/s")
+
+    print()
+    print("statistics over N acquisitions: kept values + np.std per frame vs RunningStats")
+    values = rng.normal(100.0, 0.5, 20_000)
+    kept = []
+    start = time.perf_counter()
+    for v in values:
+        kept.append(v)
+        np.mean(kept), np.std(kept), min(kept), max(kept)
+    rescan = time.perf_counter() - start
+    stats = RunningStats()
+    start = time.perf_counter()
+    for v in values:
+        stats.add(v)
+    running = time.perf_counter() - start
+    print(f"rescan  {rescan * 1e3:9.1f} ms, {len(kept) * 8:8d} bytes kept, std {np.std(kept, ddof=1):.6f}")
+    print(f"running {running * 1e3:9.1f} ms, {'O(1)':>8} memory,     std {stats.std:.6f}")
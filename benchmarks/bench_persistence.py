@@ -0,0 +1,72 @@
+"""Cost per waveform of the persistence (digital phosphor) accumulation.
+
+Noisy sine waveforms of n samples are added to a PersistenceMap in
+batches of k, as process_new_samples hands over the acquisitions one
+chunk completed. Reported: microseconds per waveform on the acquisition
+path (add()), the sample rate that pace sustains, and, for comparison,
+np.histogram2d of the same samples (dots only, no connecting spans).
+The last lines are the per-frame cost of folding in 50 ms of waveforms
+at 1 MS/s and producing the image: decay(), which flushes, and
+intensity().
+Run from the repository root:  python benchmarks/bench_persistence.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persistence import COLUMNS, ROWS, PersistenceMap  # noqa: E402
+
+TOTAL = 2_000_000      # samples accumulated per case
+
+
+def waveforms(k, n, rng):
+    t = np.arange(n) / n
+    return 3 * np.sin(2 * np.pi * 4 * t) + rng.normal(0, 0.1, (k, n))
+
+
+def per_waveform(fn, k, n, rng):
+    batches = max(TOTAL // (k * n), 3)
+    data = [waveforms(k, n, rng) for _ in range(3)]
+    start = time.perf_counter()
+    for i in range(batches):
+        fn(data[i % 3])
+    return (time.perf_counter() - start) / (batches * k)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"{'n':>6} {'batch':>6} {'us/waveform':>12} {'MS/s':>7} {'histogram2d us':>15} {'MS/s':>7}")
+    for n in [100, 1000, 10000]:
+        for k in [1, 10, 100]:
+            persistence = PersistenceMap()
+            persistence.configure(n, -4.0, 4.0)
+            columns = persistence.columns
+            x = np.tile(np.arange(n), k)
+
+            def histogram(w):
+                np.histogram2d(x, w.ravel(), bins=(columns, ROWS), range=((0, n), (-4.0, 4.0)))
+
+            ours = per_waveform(persistence.add, k, n, rng)
+            theirs = per_waveform(histogram, k, n, rng)
+            print(f"{n:>6} {k:>6} {ours * 1e6:>12.1f} {n / ours / 1e6:>7.1f} "
+                  f"{theirs * 1e6:>15.1f} {n / theirs / 1e6:>7.1f}")
+
+    persistence = PersistenceMap()
+    persistence.configure(1000, -4.0, 4.0)
+    frame = waveforms(50, 1000, rng)
+    repeat = 100
+    flush = image = 0.0
+    for _ in range(repeat):
+        persistence.add(frame)
+        start = time.perf_counter()
+        persistence.decay(0.05)
+        middle = time.perf_counter()
+        persistence.intensity()
+        flush += middle - start
+        image += time.perf_counter() - middle
+    print(f"\nper frame, {COLUMNS} x {ROWS} map with 50k new samples: decay + flush "
+          f"{flush / repeat * 1e3:.2f} ms, intensity {image / repeat * 1e3:.2f} ms")
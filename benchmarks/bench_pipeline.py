@@ -0,0 +1,97 @@
+"""Whole-chain throughput without hardware: source -> decode -> ring -> filter -> trigger -> decimate -> render.
+
+A SyntheticSource running at max speed feeds chunks that are encoded once
+as the firmware's "raw1#raw2\\n" lines (outside the timed loop), then pushed
+through the same stages the GUI runs for every serial read: both channels
+are decoded into one (channels, n) block and stored, filtered and decimated
+together, and the trigger watches channel 1. Reports the time per stage
+and the sustained end-to-end rate.
+Run from the repository root:  python benchmarks/bench_pipeline.py [--render]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from channels import N_CHANNELS  # noqa: E402
+from decimation import MinMaxDecimator  # noqa: E402
+from decoder import AsciiFrameDecoder, raw_from_volts  # noqa: E402
+from filters import LOWPASS, StreamingFilter  # noqa: E402
+from loopback import IDLE_COUNTS  # noqa: E402
+from ring_buffer import RingBuffer  # noqa: E402
+from sources import SINE, SyntheticSource  # noqa: E402
+from trigger import EDGE, TriggerEngine  # noqa: E402
+
+SAMPLE_RATE = 1_000_000
+DEPTH = 1_000_000     # displayed window
+CHUNKS = 40
+
+
+def encode_lines(volts):
+    """Volts -> firmware ASCII lines, like main.c after the analog front end"""
+    return b''.join(b'%d#%d\n' % pair for pair in map(tuple, raw_from_volts(volts, IDLE_COUNTS).tolist()))
+
+
+def run(chunk_interval, render):
+    source = SyntheticSource(SINE, frequency=1000, amplitude=1.5, noise=0.01, glitch_rate=50,
+                             sample_rate=SAMPLE_RATE, chunk_interval=chunk_interval, speed=None)
+    payloads = [encode_lines(source.next_chunk()) for _ in range(4)]
+
+    decoder = AsciiFrameDecoder()
+    ring = RingBuffer(DEPTH, item_shape=(N_CHANNELS,))
+    filtered = RingBuffer(DEPTH, item_shape=(N_CHANNELS,))
+    stream_filter = StreamingFilter(LOWPASS, 20000, SAMPLE_RATE)
+    trigger = TriggerEngine(level=0.5, kind=EDGE, hysteresis=0.05)
+    decimator = MinMaxDecimator(1500)
+    time_axis = np.linspace(0, DEPTH / SAMPLE_RATE, DEPTH)
+    if render:
+        import pyqtgraph as pg
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication(sys.argv)  # noqa: F841
+        plot = pg.PlotWidget()
+        plot.resize(1500, 600)
+        curves = [plot.plot([], []) for _ in range(N_CHANNELS)]
+
+    # Load the deferred scipy filter code outside the timed loop
+    stream_filter.process(np.zeros((N_CHANNELS, 1)))
+    stream_filter.reset()
+
+    stages = dict.fromkeys(('decode', 'buffer', 'filter', 'trigger', 'decimate', 'render'), 0.0)
+    samples = 0
+    start = time.perf_counter()
+    for i in range(CHUNKS):
+        t0 = time.perf_counter()
+        values = decoder.feed_channels(payloads[i % len(payloads)])
+        t1 = time.perf_counter()
+        first = ring.head
+        ring.write(values.T)
+        t2 = time.perf_counter()
+        filtered.write(stream_filter.process(values).T)
+        t3 = time.perf_counter()
+        trigger.process(values[0], first)
+        t4 = time.perf_counter()
+        positions, envelope = decimator.decimate(filtered.latest(DEPTH).T, filtered.head - DEPTH)
+        t5 = time.perf_counter()
+        if render:
+            for curve, trace in zip(curves, envelope):
+                curve.setData(time_axis[positions], trace)
+            plot.grab()
+        t6 = time.perf_counter()
+        for name, dt in zip(stages, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5)):
+            stages[name] += dt
+        samples += values.shape[1]
+    elapsed = time.perf_counter() - start
+    return samples, elapsed, stages
+
+
+if __name__ == "__main__":
+    render = '--render' in sys.argv
+    for chunk_interval in (0.01, 0.1):
+        samples, elapsed, stages = run(chunk_interval, render)
+        chunk = int(SAMPLE_RATE * chunk_interval)
+        print(f"chunk {chunk} samples: {samples / elapsed / 1e6:.2f} MS/s end to end")
+        for name, total in stages.items():
+            print(f"  {name:<9} {total / CHUNKS * 1e3:8.2f} ms/chunk")
@@ -0,0 +1,96 @@
+"""End-to-end SerialReader throughput against the pty firmware emulator (Linux).
+
+SerialReader opens the emulator's pseudo-terminal like a COM port, so the
+whole host path runs: pyserial reads, the decoder, and data_ready. For
+increasing line rates it reports sustained decoded samples/s, latency from the
+oldest sample of each block reaching the pty to the data_ready slot taking
+it from the hand-off queue, CPU used by this (host) process, and the share of samples lost. A second table
+sweeps the read latency target at a fixed rate, and a third checks corrupted lines and dropped
+bytes at a rate the link sustains.
+Run from the repository root:  python benchmarks/bench_pty.py
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PyQt5.QtCore import Qt  # noqa: E402
+
+from main_interface import SerialReader  # noqa: E402
+from pty_device import PtyEmulator  # noqa: E402
+from serial_link import DEFAULT_LATENCY, LATENCY_TARGETS  # noqa: E402
+
+DURATION = 3.0   # seconds per run
+
+
+def run(rate, burst, corrupt_rate=0.0, drop_byte_rate=0.0, latency=DEFAULT_LATENCY):
+    emulator = PtyEmulator(sample_rate=rate, burst=burst, corrupt_rate=corrupt_rate,
+                           drop_byte_rate=drop_byte_rate, seed=1)
+    port = emulator.start()
+    reader = SerialReader(None, port=port, protocol='ascii', latency=latency, sample_rate=rate)
+    emitted = []
+
+    def drain():
+        now = time.monotonic()
+        emitted.extend((now, block.shape[-1]) for _, block in reader.queue.take())
+
+    reader.data_ready.connect(drain, Qt.DirectConnection)
+    thread = threading.Thread(target=reader.run, daemon=True)
+    cpu0, wall0 = time.process_time(), time.monotonic()
+    thread.start()
+    time.sleep(DURATION)
+    # Let the read loop finish before the port is closed under it
+    reader.running = False
+    thread.join(1.0)
+    reader.stop()
+    cpu = (time.process_time() - cpu0) / (time.monotonic() - wall0)
+    emulator.stop()
+
+    counters = emulator.counters()
+    sent_lines, sent_times = emulator.burst_log()
+    times = np.array([t for t, _ in emitted])
+    decoded = np.cumsum([n for _, n in emitted])
+    total = int(decoded[-1]) if len(decoded) else 0
+    # The burst that carried the oldest sample of each emission
+    first = decoded - [n for _, n in emitted] + 1
+    k = np.minimum(np.searchsorted(sent_lines, first), len(sent_lines) - 1)
+    latency = times - sent_times[k] if len(times) else np.zeros(1)
+    span = times[-1] - times[0] if len(times) > 1 else DURATION
+    offered = counters['lines_sent'] + counters['samples_skipped']
+    return {'rate': total / DURATION if span <= 0 else (total - (decoded[0] if len(decoded) else 0)) / span,
+            'latency_p50': np.median(latency), 'latency_p99': np.percentile(latency, 99),
+            'cpu': cpu, 'lost': 1 - total / max(offered, 1), 'counters': counters,
+            'decoded': total, 'rejected': reader.decoder.lines_invalid, 'link': reader.counters()}
+
+
+if __name__ == "__main__":
+    print(f"{'offered/s':>10} {'burst':>6} {'decoded/s':>10} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'cpu %':>6} {'lost %':>7}")
+    for rate in (1_000, 10_000, 100_000, 300_000, 1_000_000):
+        burst = max(rate // 1000, 1)
+        r = run(rate, burst)
+        print(f"{rate:>10} {burst:>6} {r['rate']:>10.0f} {r['latency_p50'] * 1e3:>7.1f} "
+              f"{r['latency_p99'] * 1e3:>7.1f} {r['cpu'] * 100:>6.1f} {r['lost'] * 100:>7.2f}")
+
+    print()
+    print(f"{'target ms':>10} {'decoded/s':>10} {'p50 ms':>7} {'p99 ms':>7} {'cpu %':>6} "
+          f"{'reads/s':>8} {'lost %':>7}")
+    for latency in LATENCY_TARGETS:
+        r = run(100_000, 100, latency=latency)
+        print(f"{latency * 1e3:>10g} {r['rate']:>10.0f} {r['latency_p50'] * 1e3:>7.1f} "
+              f"{r['latency_p99'] * 1e3:>7.1f} {r['cpu'] * 100:>6.1f} "
+              f"{r['link']['reads'] / DURATION:>8.0f} {r['lost'] * 100:>7.2f}")
+
+    print()
+    # Rejected lines still yield a sample (the decoder holds the last valid value)
+    print(f"{'corrupt':>8} {'drop B':>7} {'sent':>8} {'corrupted':>10} {'bytes lost':>10} "
+          f"{'rejected':>9} {'decoded':>8}")
+    for corrupt_rate, drop_byte_rate in ((0.01, 0.0), (0.0, 0.001), (0.01, 0.001)):
+        r = run(2_000, 2, corrupt_rate, drop_byte_rate)
+        c = r['counters']
+        print(f"{corrupt_rate:>8} {drop_byte_rate:>7} {c['lines_sent']:>8} {c['lines_corrupted']:>10} "
+              f"{c['bytes_dropped']:>10} {r['rejected']:>9} {r['decoded']:>8}")
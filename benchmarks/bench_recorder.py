@@ -0,0 +1,99 @@
+"""Sustained CaptureRecorder throughput and the caller-side cost of write().
+
+Feeds the recorder chunks as fast as possible and reports disk throughput,
+plus the worst write() call, which is what the acquisition path pays.
+The producer runs flat out, so a non-zero drop count means it outpaced the
+disk; at real acquisition rates the bounded queue never fills.
+It first checks that a failed disk write is listed in the header's gaps.
+Run from the repository root:  python benchmarks/bench_recorder.py [directory]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recorder import CaptureRecorder, open_capture  # noqa: E402
+
+TOTAL = 50_000_000   # samples per run
+
+
+class FailingFile:
+    """File wrapper whose nth write() raises OSError"""
+
+    def __init__(self, file, fail_at):
+        self.file = file
+        self.fail_at = fail_at
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        if self.writes == self.fail_at:
+            raise OSError("simulated disk error")
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+def check_write_error(directory, chunk=1000, chunks=50):
+    """A block lost to an OSError must show up in gaps, at its file position"""
+    path = os.path.join(directory, 'bench_error.osc')
+    recorder = CaptureRecorder(dtype='float32', block_bytes=chunk * 4)
+    recorder.start(path, sample_rate=1_000_000)
+    recorder._file = FailingFile(recorder._file, fail_at=3)
+    ramp = np.arange(chunk * chunks, dtype=np.float32)
+    for i in range(chunks):
+        recorder.write(ramp[i * chunk:(i + 1) * chunk], start=i * chunk)
+    recorder.stop()
+    header, samples = open_capture(path)
+    assert isinstance(recorder.error, OSError)
+    assert header['samples'] + header['samples_dropped'] == len(ramp)
+    assert header['samples_dropped'] > 0
+    assert len(header['gaps']) == 1
+    position, missing = header['gaps'][0]
+    assert missing == header['samples_dropped']
+    # Samples either side of the gap are where the gaps entry says they are
+    assert np.array_equal(samples[:position], ramp[:position])
+    assert np.array_equal(samples[position:], ramp[position + missing:])
+    del samples
+    os.remove(path)
+    return position, missing
+
+
+def run(directory, dtype, chunk):
+    rng = np.random.default_rng(0)
+    data = np.round(rng.normal(0, 1, chunk) / 0.01) * 0.01
+    path = os.path.join(directory, f'bench_{dtype}.osc')
+    recorder = CaptureRecorder(dtype=dtype)
+    recorder.start(path, sample_rate=1_000_000)
+    worst = 0.0
+    start = time.perf_counter()
+    for _ in range(TOTAL // chunk):
+        t = time.perf_counter()
+        recorder.write(data)
+        worst = max(worst, time.perf_counter() - t)
+    recorder.stop()
+    elapsed = time.perf_counter() - start
+    header, samples = open_capture(path)
+    assert header['samples'] + header['samples_dropped'] == TOTAL // chunk * chunk
+    assert len(samples) == header['samples']
+    size = os.path.getsize(path)
+    del samples
+    os.remove(path)
+    return header['samples'] / elapsed, size / elapsed, worst, header['samples_dropped']
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else tempfile.gettempdir()
+    position, missing = check_write_error(directory)
+    print(f"failed write: {missing} samples listed as a gap at {position}")
+    print(f"writing {TOTAL} samples per run to {directory}")
+    print(f"{'dtype':>8} {'chunk':>7} {'MS/s':>8} {'MB/s':>8} {'worst write() (ms)':>19} {'dropped':>9}")
+    for dtype in ('int16', 'float32'):
+        for chunk in (1000, 100000):
+            rate, throughput, worst, dropped = run(directory, dtype, chunk)
+            print(f"{dtype:>8} {chunk:>7} {rate / 1e6:>8.1f} {throughput / 1e6:>8.1f} "
+                  f"{worst * 1e3:>19.3f} {dropped:>9}")
@@ -0,0 +1,94 @@
+"""Delta + Rice frames against binary and ASCII: bytes per sample, samples/s per baud, decode speed.
+
+Uses the loopback device, so no board is needed. Each signal is sent in
+every protocol from a max-speed loopback and decoded; reported are the
+bytes per sample pair on the wire, the sample rate one baud carries (a
+UART byte is 10 bits), what that makes at 115200 and 921600 baud, and
+the decode throughput. The Rice frames are checked to decode to exactly
+the pairs the binary frames carry. The last lines run the realtime
+loopback at 115200 baud with 20 kS/s requested, as bench_binary does.
+Run from the repository root:  python benchmarks/bench_rice.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from decoder import RICE_PAIRS, RiceFrameDecoder, encode_rice_frame, negotiate_protocol  # noqa: E402
+from loopback import LoopbackDevice  # noqa: E402
+
+SIGNALS = {                        # loopback settings: a slow, a mid-band and a noisy input
+    '1 Hz sine': dict(signal_freq=1.0, noise=0.0),
+    '50 Hz sine': dict(signal_freq=50.0, noise=0.0),
+    '50 Hz + 10 mV': dict(signal_freq=50.0, noise=0.01),
+}
+PROTOCOLS = ('ascii', 'binary', 'rice')
+
+
+def capture(protocol, n_reads, **device_args):
+    """Bytes and decoded pairs of n_reads max-speed loopback chunks, and the decode time"""
+    device = LoopbackDevice(realtime=False, chunk_samples=20000, seed=1, **device_args)
+    decoder = negotiate_protocol(device, protocol, timeout=0.05)
+    chunks = [device.read_all() for _ in range(n_reads)]
+    start = time.perf_counter()
+    blocks = [decoder.feed_channels(chunk) for chunk in chunks]
+    elapsed = time.perf_counter() - start
+    return sum(len(chunk) for chunk in chunks), np.hstack(blocks), elapsed
+
+
+def throughput():
+    print(f"{'signal':<14} {'protocol':<8} {'bytes/pair':>10} {'S/s per baud':>13} "
+          f"{'S/s @115200':>12} {'S/s @921600':>12} {'decode MS/s':>12}")
+    for name, settings in SIGNALS.items():
+        reference = None
+        for protocol in PROTOCOLS:
+            n_bytes, block, elapsed = capture(protocol, 20, **settings)
+            per_pair = n_bytes / block.shape[1]
+            per_baud = 1 / (10 * per_pair)
+            print(f"{name:<14} {protocol:<8} {per_pair:>10.2f} {per_baud:>13.4f} {115200 * per_baud:>12.0f} "
+                  f"{921600 * per_baud:>12.0f} {block.shape[1] / elapsed / 1e6:>12.2f}")
+            if protocol == 'binary':
+                reference = block
+            elif protocol == 'rice':
+                n = min(reference.shape[1], block.shape[1])
+                assert np.array_equal(reference[:, :n], block[:, :n]), "Rice frames are not lossless"
+
+
+def coder():
+    """Encoder and decoder alone on one long slow signal"""
+    rng = np.random.default_rng(0)
+    n = RICE_PAIRS * 2000
+    pairs = np.clip(2048 + np.cumsum(rng.integers(-4, 5, (n, 2)), axis=0), 0, 4095)
+    start = time.perf_counter()
+    frames = b''.join(encode_rice_frame(i, pairs[i * RICE_PAIRS:(i + 1) * RICE_PAIRS, 0],
+                                        pairs[i * RICE_PAIRS:(i + 1) * RICE_PAIRS, 1])
+                      for i in range(n // RICE_PAIRS))
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = RiceFrameDecoder()._pairs(frames)
+    decode = time.perf_counter() - start
+    assert np.array_equal(decoded, pairs)
+    print(f"\nrandom walk, {n} pairs: {len(frames) * 8 / n / 2:.2f} bits/sample; "
+          f"reference encoder {n / encode / 1e6:.2f} MS/s, decoder {n / decode / 1e6:.2f} MS/s "
+          f"({decode / (n // RICE_PAIRS) * 1e6:.1f} us per {RICE_PAIRS}-pair frame)")
+
+
+def realtime(seconds=2.0):
+    print(f"\nrealtime loopback at 115200 baud, 20 kS/s of a 1 Hz sine requested, {seconds:.0f} s")
+    for protocol in PROTOCOLS:
+        device = LoopbackDevice(baudrate=115200, sample_rate=20000, signal_freq=1.0, noise=0.0, seed=3)
+        decoder = negotiate_protocol(device, protocol, timeout=0.1)
+        samples = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            time.sleep(0.01)
+            samples += decoder.feed_channels(device.read_all()).shape[1]
+        print(f"{protocol:<8} {samples / seconds:8.0f} S/s delivered")
+
+
+if __name__ == "__main__":
+    throughput()
+    coder()
+    realtime()
@@ -0,0 +1,45 @@
+"""Per-chunk cost of the old np.roll + np.linspace buffer update vs RingBuffer.
+
+Run from the repository root:  python benchmarks/bench_ring_buffer.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ring_buffer import RingBuffer  # noqa: E402
+
+CHUNK = 100   # samples per serial chunk (1 kS/s read every 100 ms)
+
+
+def roll_update(depth, chunks):
+    """What on_serial_data used to do for every chunk"""
+    data_buffer = np.zeros(depth)
+    start = time.perf_counter()
+    for chunk in chunks:
+        data_buffer = np.roll(data_buffer, -len(chunk))
+        data_buffer[-len(chunk):] = chunk
+        time_buffer = np.linspace(0, 1.0, depth)  # noqa: F841
+    return (time.perf_counter() - start) / len(chunks)
+
+
+def ring_update(depth, chunks):
+    ring = RingBuffer(depth)
+    start = time.perf_counter()
+    for chunk in chunks:
+        ring.write(chunk)
+        data_buffer = ring.latest(depth)  # noqa: F841
+    return (time.perf_counter() - start) / len(chunks)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"chunk of {CHUNK} samples")
+    for depth, n_chunks in ((1000, 20000), (100000, 2000), (10000000, 20)):
+        chunks = [rng.normal(size=CHUNK) for _ in range(n_chunks)]
+        old = roll_update(depth, chunks)
+        new = ring_update(depth, chunks)
+        print(f"depth {depth:>9}: roll+linspace {old * 1e6:10.1f} us   "
+              f"ring {new * 1e6:6.1f} us   x{old / new:.0f}")
@@ -0,0 +1,94 @@
+"""Accuracy and cost of the sample-rate estimate and the uniform resampler.
+
+Block arrivals are simulated for a port delivering TRUE_RATE samples/s in
+chunks of varying size, each arrival late by an exponential read delay
+plus, for a share of the blocks, a long stall (a busy GUI or OS).
+Reported for each stall share: the error of SampleClock's rate after
+SECONDS of arrivals, against an ordinary least-squares line through the
+same window. A second table reads on a fixed period, as LinkReader does
+at each latency target, and checks the clock locks within a few seconds
+at every one. The last lines are the cost of stamp() plus reading the
+rate per block, and of UniformResampler.process() per sample.
+Run from the repository root:  python benchmarks/bench_sample_clock.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sample_clock import MIN_SPAN, RATE_WINDOW, SampleClock, UniformResampler  # noqa: E402
+from serial_link import LATENCY_TARGETS  # noqa: E402
+
+NOMINAL = 1000
+TRUE_RATE = 1037.4      # what the firmware's polling loop really manages
+SECONDS = 10
+JITTER = 0.002          # mean read delay, seconds
+STALL = 0.05            # seconds a stalled read is late
+
+
+def arrivals(stall_share, rng):
+    counts = rng.integers(10, 40, int(SECONDS * TRUE_RATE / 25))
+    ends = np.cumsum(counts)
+    late = rng.exponential(JITTER, len(ends)) + STALL * (rng.random(len(ends)) < stall_share)
+    return counts, ends / TRUE_RATE + late
+
+
+def periodic(interval, rng):
+    """Arrivals every `interval` seconds of whatever the port delivered meanwhile"""
+    times = np.arange(interval, SECONDS, interval) + rng.exponential(JITTER, int(SECONDS / interval) - 1)
+    ends = np.floor(np.maximum.accumulate(times - JITTER) * TRUE_RATE)
+    return np.diff(ends, prepend=0).astype(int), times
+
+
+def least_squares(ends, times):
+    recent = times >= times[-1] - RATE_WINDOW
+    slope = np.polyfit(ends[recent], times[recent], 1)[0]
+    return 1 / slope
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"{'stalled':>8} {'clock S/s':>10} {'error ppm':>10} {'lstsq S/s':>10} {'error ppm':>10}")
+    for share in [0.0, 0.05, 0.2]:
+        counts, times = arrivals(share, rng)
+        clock = SampleClock(NOMINAL)
+        for count, arrival in zip(counts, times):
+            clock.stamp(int(count), arrival)
+        fitted = least_squares(np.cumsum(counts), times)
+        print(f"{share:>8.0%} {clock.rate:>10.2f} {(clock.rate / TRUE_RATE - 1) * 1e6:>10.0f} "
+              f"{fitted:>10.2f} {(fitted / TRUE_RATE - 1) * 1e6:>10.0f}")
+
+    print(f"\n{'read every':>10} {'locked after s':>15} {'clock S/s':>10} {'error ppm':>10}")
+    for interval in LATENCY_TARGETS:
+        counts, times = periodic(interval, rng)
+        clock = SampleClock(NOMINAL)
+        locked_at = None
+        for count, arrival in zip(counts, times):
+            clock.stamp(int(count), arrival)
+            if locked_at is None and clock.locked:
+                locked_at = arrival
+        # The window is in seconds, so every read period reaches MIN_SPAN
+        assert locked_at is not None and locked_at < 2 * MIN_SPAN, f"not locked at {interval * 1e3:g} ms reads"
+        print(f"{interval * 1e3:>8g} ms {locked_at:>15.2f} {clock.rate:>10.2f} "
+              f"{(clock.rate / TRUE_RATE - 1) * 1e6:>10.0f}")
+
+    counts, times = arrivals(0.05, rng)
+    clock = SampleClock(NOMINAL)
+    start = time.perf_counter()
+    for count, arrival in zip(counts, times):
+        clock.stamp(int(count), arrival)
+        clock.rate
+    per_block = (time.perf_counter() - start) / len(counts)
+
+    resampler = UniformResampler(NOMINAL)
+    block = rng.normal(size=(2, 1000))
+    repeat = 1000
+    start = time.perf_counter()
+    for _ in range(repeat):
+        resampler.process(block, TRUE_RATE)
+    per_sample = (time.perf_counter() - start) / (repeat * block.shape[1])
+    print(f"\nstamp + rate: {per_block * 1e6:.1f} us per block; "
+          f"resample: {per_sample * 1e9:.1f} ns per input sample ({1 / per_sample / 1e6:.0f} MS/s)")
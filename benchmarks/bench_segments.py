@@ -0,0 +1,83 @@
+"""Segmented acquisition throughput and re-arm dead time.
+
+A two-channel stream with a pulse every PERIOD samples is fed through
+TriggerEngine in CHUNK-sample chunks, as SerialReader delivers them, and
+each chunk's triggers go to SegmentMemory.capture(). Reported: the
+segments captured per second of processing time, the share of triggers
+that got a segment, and the cost of average() / envelope() against
+recomputing them from every captured segment. The last row is what the
+live display keeps: the newest trigger of each 20 fps frame.
+Run from the repository root:  python benchmarks/bench_segments.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ring_buffer import RingBuffer  # noqa: E402
+from segments import SegmentMemory  # noqa: E402
+from trigger import TriggerEngine  # noqa: E402
+
+SAMPLE_RATE = 1_000_000
+CHUNK = 10_000
+PERIOD = 500            # samples between pulses: 2000 triggers/s
+LENGTH = 400            # samples per segment
+SEGMENTS = 5000
+CHANNELS = 2
+
+
+def pulse_stream(n):
+    t = np.arange(n)
+    x = np.where(t % PERIOD < PERIOD // 4, 1.0, 0.0)
+    x += np.random.default_rng(0).normal(0, 0.02, n)
+    return np.vstack((x, 0.5 * x))
+
+
+def run(length, segments):
+    stream = pulse_stream(segments * PERIOD + 4 * CHUNK)
+    ring = RingBuffer(8 * CHUNK, item_shape=(CHANNELS,))
+    trigger = TriggerEngine(level=0.5, hysteresis=0.1, pre_trigger=length // 4,
+                            post_trigger=length - length // 4)
+    memory = SegmentMemory()
+    memory.arm(segments, length, trigger.pre_trigger, CHANNELS)
+    fired_total = 0
+    elapsed = 0.0
+    for start in range(0, stream.shape[1], CHUNK):
+        block = stream[:, start:start + CHUNK]
+        ring.write(block.T)
+        t0 = time.perf_counter()
+        fired = trigger.process(block[0], start)
+        memory.capture(ring, fired)
+        elapsed += time.perf_counter() - t0
+        fired_total += len(fired)
+        if memory.full:
+            break
+    return memory, fired_total, elapsed, start + CHUNK
+
+
+def timed(fn, repeat=20):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+if __name__ == "__main__":
+    print(f"{'segments':>9} {'length':>7} {'captured':>9} {'triggers':>9} {'seg/s':>10} {'stream x':>9} "
+          f"{'avg ms':>7} {'env ms':>7} {'full avg ms':>12} {'full env ms':>12}")
+    for segments in [100, 1000, SEGMENTS]:
+        memory, fired, elapsed, samples = run(LENGTH, segments)
+        data = memory.data[:memory.count]
+        average = timed(memory.average)
+        envelope = timed(memory.envelope)
+        full_average = timed(lambda: data.mean(axis=0))
+        full_envelope = timed(lambda: (data.min(axis=0), data.max(axis=0)))
+        print(f"{segments:>9} {LENGTH:>7} {memory.count:>9} {fired:>9} {memory.count / elapsed:>10.0f} "
+              f"{samples / SAMPLE_RATE / elapsed:>9.0f} {average * 1e3:>7.3f} {envelope * 1e3:>7.3f} "
+              f"{full_average * 1e3:>12.3f} {full_envelope * 1e3:>12.3f}")
+    triggers_per_s = SAMPLE_RATE / PERIOD
+    print(f"live display at 20 fps keeps 20 of {triggers_per_s:.0f} triggers/s "
+          f"({20 / triggers_per_s:.1%}); segmented memory keeps every one until full")
@@ -0,0 +1,60 @@
+"""Per-tick spectrum cost: old full-buffer fft in show_fft vs the incremental SpectrumAnalyzer.
+
+Each tick appends a chunk to the ring; the old code re-transformed the whole
+displayed buffer, the analyzer only transforms the segments completed since
+the previous tick.
+Run from the repository root:  python benchmarks/bench_spectrum.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.fft import fft, fftfreq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ring_buffer import RingBuffer  # noqa: E402
+from spectrum import HANN, SpectrumAnalyzer  # noqa: E402
+
+FS = 1000
+TICKS = 50
+
+
+def legacy_tick(data_buffer):
+    """What show_fft used to compute every tick"""
+    n = len(data_buffer)
+    yf = fft(data_buffer - np.mean(data_buffer))
+    xf = fftfreq(n, 1 / FS)[:n // 2]
+    yf_db = 20 * np.log10(np.maximum(np.abs(yf[0:n // 2]), 1e-12))
+    return xf[1:], yf_db[1:]
+
+
+def run(depth, chunk, segment):
+    rng = np.random.default_rng(0)
+    ring = RingBuffer(depth)
+    ring.write(rng.normal(size=depth))
+    chunks = [rng.normal(size=chunk) for _ in range(TICKS)]
+
+    start = time.perf_counter()
+    for c in chunks:
+        ring.write(c)
+        legacy_tick(ring.latest(depth))
+    legacy = (time.perf_counter() - start) / TICKS
+
+    analyzer = SpectrumAnalyzer(segment=segment, window=HANN, fs=FS)
+    analyzer.update(ring)
+    start = time.perf_counter()
+    for c in chunks:
+        ring.write(c)
+        analyzer.update(ring)
+        analyzer.spectrum_db()
+    incremental = (time.perf_counter() - start) / TICKS
+    return legacy, incremental
+
+
+if __name__ == "__main__":
+    print(f"{'depth':>10} {'chunk':>7} {'segment':>8} {'fft (ms)':>10} {'welch (ms)':>11}")
+    for depth, chunk, segment in ((2000, 100, 1024), (100000, 10000, 4096),
+                                  (1000000, 100000, 8192), (10000000, 1000000, 8192)):
+        legacy, incremental = run(depth, chunk, segment)
+        print(f"{depth:>10} {chunk:>7} {segment:>8} {legacy * 1e3:>10.2f} {incremental * 1e3:>11.2f}")
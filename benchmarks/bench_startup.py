@@ -0,0 +1,69 @@
+"""Cold start of the GUI and of the headless runner.
+
+Every case runs in a fresh interpreter and is timed from launch until it
+prints 'ready' (or exits), so interpreter start-up and imports are
+included. The GUI is ready once its first frame with samples has been
+drawn (offscreen); the headless runner once it has processed its first
+chunk and shut its acquisition process down. The last row is the scipy
+import that filters.py, spectrum.py and main_interface.py now defer
+until a filter or the FFT view is used.
+Run from the repository root:  python benchmarks/bench_startup.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPEAT = 5
+
+GUI_FIRST_FRAME = """
+import os
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+import main_interface
+app = QApplication([])
+window = main_interface.OscilloscopeUI()
+window.show()
+def check():
+    if window.scheduler.frames and window.ring_buffer.head:
+        print('ready', flush=True)
+        os._exit(0)
+timer = QTimer()
+timer.timeout.connect(check)
+timer.start(1)
+app.exec_()
+"""
+
+CASES = [
+    ("GUI: import main_interface", ['-c', 'import main_interface']),
+    ("GUI: first frame", ['-c', GUI_FIRST_FRAME]),
+    ("headless: import headless", ['-c', 'import headless']),
+    ("headless: first chunk, exit", ['headless.py', '--test', '--samples', '1']),
+    ("eager: import scipy.signal, scipy.fft", ['-c', 'import scipy.signal, scipy.fft']),
+]
+
+
+def launch(args):
+    """Seconds from launching the interpreter until it says 'ready' or exits"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + args, cwd=ROOT, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True)
+    for line in process.stdout:
+        if line.strip() == 'ready':
+            break
+    elapsed = time.perf_counter() - start
+    process.wait()
+    return elapsed
+
+
+if __name__ == "__main__":
+    # One untimed run first so every case reads the files from a warm OS cache
+    for _, args in CASES:
+        launch(args)
+    print(f"{'case':<40} {'median ms':>10} {'min ms':>8}")
+    for name, args in CASES:
+        times = [launch(args) for _ in range(REPEAT)]
+        print(f"{name:<40} {statistics.median(times) * 1e3:>10.0f} {min(times) * 1e3:>8.0f}")
@@ -0,0 +1,155 @@
+"""Fan-out of live sample blocks through StreamServer.
+
+A producer publishes (2, 1000) blocks at 1000 blocks/s (1 MS/s per
+channel, 8 MB/s of frames per subscriber) to a number of fast subscribers
+plus one slow one that reads 4 KB every 10 ms. Reported per case: the
+time publish() takes on the acquisition path, the blocks/s the producer
+actually kept up, what the fast subscribers received and whether it had
+gaps, and what happened to the slow one under each drop policy. The last
+row is the naive alternative: a blocking sendall() of a per-subscriber
+copy, where the slow subscriber throttles the producer for everyone.
+The subscribers are threads of this process, so publish() times include
+waiting for the GIL.
+Run from the repository root:  python benchmarks/bench_stream.py
+"""
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_server import DISCONNECT, DROP_NEWEST, DROP_OLDEST, StreamServer, encode_frame, subscribe  # noqa: E402
+
+BLOCK = 1000
+RATE = 1000         # blocks per second
+DURATION = 2.0
+SLOW_READ = 4096
+SLOW_PERIOD = 0.01
+
+
+class FastSubscriber(threading.Thread):
+    def __init__(self, address):
+        super().__init__(daemon=True)
+        self.address = address
+        self.samples = 0
+        self.gaps = 0
+
+    def run(self):
+        end = None
+        try:
+            for start, _, block in subscribe(self.address):
+                if end is not None and start != end:
+                    self.gaps += 1
+                end = start + block.shape[1]
+                self.samples += block.shape[1]
+        except OSError:
+            pass
+
+
+class SlowSubscriber(threading.Thread):
+    def __init__(self, address):
+        super().__init__(daemon=True)
+        self.sock = socket.create_connection(address)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 16)
+        self.received = 0
+
+    def run(self):
+        try:
+            while True:
+                data = self.sock.recv(SLOW_READ)
+                if not data:
+                    return
+                self.received += len(data)
+                time.sleep(SLOW_PERIOD)
+        except OSError:
+            pass
+
+
+def produce(publish):
+    """Publish at RATE for DURATION; returns publish() call times and the blocks/s achieved"""
+    block = np.random.default_rng(0).standard_normal((2, BLOCK))
+    times = []
+    t0 = time.perf_counter()
+    k = 0
+    while time.perf_counter() - t0 < DURATION:
+        due = t0 + k / RATE
+        now = time.perf_counter()
+        if now < due:
+            time.sleep(due - now)
+        t = time.perf_counter()
+        publish(block, k * BLOCK)
+        times.append(time.perf_counter() - t)
+        k += 1
+    return times, k / (time.perf_counter() - t0)
+
+
+def run_server(n_fast, policy):
+    server = StreamServer(('127.0.0.1', 0), 1e6, max_queue=64, policy=policy)
+    server.start()
+    fast = [FastSubscriber(server.address) for _ in range(n_fast)]
+    slow = SlowSubscriber(server.address)
+    for s in fast + [slow]:
+        s.start()
+    while server.subscribers < n_fast + 1:
+        time.sleep(0.01)
+    times, rate = produce(server.publish)
+    time.sleep(0.2)
+    counters = server.counters()
+    server.stop()
+    for s in fast:
+        s.join(1)
+    # The fast subscribers drop nothing unless they fall behind, so the drops are the slow one's
+    if counters['clients_dropped']:
+        slow_text = "disconnected"
+    else:
+        slow_text = f"{counters['frames_dropped']} frames dropped"
+    return times, rate, fast, slow_text
+
+
+def run_blocking(n_fast):
+    """The naive server: every block is copied and sendall()'d to each subscriber in turn"""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    address = listener.getsockname()
+    fast = [FastSubscriber(address) for _ in range(n_fast)]
+    for s in fast:
+        s.start()
+    slow = SlowSubscriber(address)
+    slow.start()
+    conns = [listener.accept()[0] for _ in range(n_fast + 1)]
+
+    def publish(block, start):
+        for conn in conns:
+            conn.sendall(bytes(encode_frame(block, start, 1e6)))
+
+    times, rate = produce(publish)
+    for conn in conns:
+        conn.close()
+    listener.close()
+    for s in fast:
+        s.join(1)
+    return times, rate, fast, "throttles the producer"
+
+
+def report(name, times, rate, fast):
+    received = statistics.mean(s.samples for s in fast) / BLOCK
+    gaps = sum(s.gaps for s in fast)
+    return (f"{name:<26} {statistics.median(times) * 1e6:>9.0f} {max(times) * 1e3:>8.1f} "
+            f"{rate:>9.0f} {received:>10.0f} {gaps:>5}")
+
+
+if __name__ == "__main__":
+    print(f"{'case':<26} {'p50 us':>9} {'max ms':>8} {'blocks/s':>9} {'fast recv':>10} {'gaps':>5}  slow subscriber")
+    for n_fast in [1, 4, 16]:
+        for policy in [DROP_OLDEST, DROP_NEWEST, DISCONNECT]:
+            times, rate, fast, slow = run_server(n_fast, policy)
+            print(report(f"{n_fast} fast, {policy}", times, rate, fast) + f"  {slow}")
+    for n_fast in [1, 4]:
+        times, rate, fast, slow = run_blocking(n_fast)
+        print(report(f"{n_fast} fast, blocking sendall", times, rate, fast) + f"  {slow}")
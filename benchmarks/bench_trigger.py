@@ -0,0 +1,63 @@
+"""Trigger cost per 100 ms tick: old per-sample loop vs TriggerEngine.
+
+The old loop rescanned the whole displayed buffer every tick; the engine can
+rescan it in one vectorized pass, or (as the UI uses it) only look at the
+samples that arrived since the last tick.
+Run from the repository root:  python benchmarks/bench_trigger.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trigger import EDGE, PULSE_WIDTH, RUNT, TriggerEngine  # noqa: E402
+
+
+def legacy_scan(display_data, trigger_level, edge="Rising"):
+    """The loop formerly in update_waveform"""
+    for i in range(1, len(display_data)):
+        prev = display_data[i - 1]
+        current = display_data[i]
+        if edge == "Rising" and prev < trigger_level <= current:
+            return i
+        elif edge == "Falling" and prev > trigger_level >= current:
+            return i
+    return None
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print("full-buffer scan, worst case (no crossing found)")
+    for depth in (10000, 100000, 1000000, 10000000):
+        quiet = rng.normal(0, 0.01, depth)
+        legacy = timed(lambda: legacy_scan(quiet, 1.0), repeat=1) if depth <= 1000000 else None
+        engine = timed(lambda: TriggerEngine(level=1.0).process(quiet, 0))
+        legacy_txt = f"{legacy * 1e3:9.1f} ms" if legacy is not None else "     (skipped)"
+        print(f"depth {depth:>9}: loop {legacy_txt}   engine {engine * 1e3:8.2f} ms")
+
+    print("\nstreaming: samples arriving per tick, busy 1 kHz-ish signal")
+    for per_tick in (100, 10000, 1000000):
+        t = np.arange(per_tick)
+        chunk = np.sin(2 * np.pi * t / 97) + rng.normal(0, 0.05, per_tick)
+        for kind in (EDGE, PULSE_WIDTH, RUNT):
+            engine = TriggerEngine(level=0.2, kind=kind, hysteresis=0.1, holdoff=200,
+                                   width_max=60, runt_level=0.9)
+            head = [0]
+
+            def tick():
+                engine.process(chunk, head[0])
+                head[0] += per_tick
+
+            cost = timed(tick)
+            print(f"{per_tick:>8} samples/tick  {kind:<12} {cost * 1e3:8.3f} ms")
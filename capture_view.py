@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+
+from recorder import open_capture
+
+# Min/max pyramid: level 0 summarizes PYRAMID_BASE samples per row, each level
+# above groups PYRAMID_FACTOR rows of the one below. All levels live in one
+# (rows, 2) .npy file next to the capture, opened with mmap_mode='r'.
+PYRAMID_BASE = 16
+PYRAMID_FACTOR = 4
+PYRAMID_MIN_ROWS = 64
+PYRAMID_EXT = '.pyr.npy'
+BUILD_BLOCK = 1 << 20   # rows (or samples) reduced per step while building
+
+
+def pyramid_levels(count):
+    """[(bucket size in samples, first row, rows)] for a capture of `count` samples"""
+    levels = []
+    bucket = PYRAMID_BASE
+    offset = 0
+    while True:
+        rows = -(-count // bucket)
+        levels.append((bucket, offset, rows))
+        offset += rows
+        if rows <= PYRAMID_MIN_ROWS:
+            return levels
+        bucket *= PYRAMID_FACTOR
+
+
+def _reduce(mins, maxs, group):
+    """Min of `mins` and max of `maxs` over consecutive groups (last group may be partial)"""
+    full = len(mins) // group * group
+    out_min = mins[:full].reshape(-1, group).min(axis=1)
+    out_max = maxs[:full].reshape(-1, group).max(axis=1)
+    if full < len(mins):
+        out_min = np.append(out_min, mins[full:].min())
+        out_max = np.append(out_max, maxs[full:].max())
+    return out_min, out_max
+
+
+def build_pyramid(data, path, progress=None, cancelled=None):
+    """Write the min/max pyramid of `data` to `path`; returns False if cancelled.
+
+    Works block by block on memmaps, so memory use does not grow with the
+    capture. `progress(fraction)` is called after every block; the file is
+    written under a temporary name and only renamed into place when complete.
+    """
+    levels = pyramid_levels(len(data))
+    total = levels[-1][1] + levels[-1][2]
+    work = len(data) + sum(rows for _, _, rows in levels[:-1])
+    done = 0
+    tmp_path = path + '.tmp'
+    out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=data.dtype, shape=(total, 2))
+    complete = False
+    try:
+        source_min = source_max = data
+        group = PYRAMID_BASE
+        for bucket, offset, rows in levels:
+            # Blocks are a whole number of groups, so only the very last one can be partial
+            step = BUILD_BLOCK * group
+            for i in range(0, len(source_min), step):
+                if cancelled is not None and cancelled.is_set():
+                    return False
+                mins, maxs = _reduce(source_min[i:i + step], source_max[i:i + step], group)
+                row = offset + i // group
+                out[row:row + len(mins), 0] = mins
+                out[row:row + len(mins), 1] = maxs
+                done += min(step, len(source_min) - i)
+                if progress is not None:
+                    progress(done / work)
+            source_min = out[offset:offset + rows, 0]
+            source_max = out[offset:offset + rows, 1]
+            group = PYRAMID_FACTOR
+        out.flush()
+        complete = True
+    finally:
+        source_min = source_max = out = None
+        if complete:
+            os.replace(tmp_path, path)
+        else:
+            os.remove(tmp_path)
+    return True
+
+
+class CaptureView:
+    """Read-only view of a capture file for the offline viewer.
+
+    Samples are accessed through np.memmap and the min/max pyramid cached
+    next to the file, so envelope() touches at most a few thousand rows
+    whatever the capture length or zoom: constant time per frame.
+    Multi-channel captures are viewed (and indexed) by their first channel.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header, self.data = open_capture(path)
+        if self.data.ndim > 1:
+            self.data = self.data[:, 0]
+        self.count = len(self.data)
+        self.sample_rate = self.header['sample_rate']
+        self.scale = self.header['scale']
+        self.levels = pyramid_levels(self.count)
+        self.pyramid_path = path + PYRAMID_EXT
+        self.pyramid = None
+
+    @property
+    def duration(self):
+        return self.count / self.sample_rate
+
+    def load_pyramid(self):
+        """Map the cached pyramid if it is up to date; returns True on success"""
+        try:
+            if os.path.getmtime(self.pyramid_path) < os.path.getmtime(self.path):
+                return False
+            pyramid = np.load(self.pyramid_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return False
+        expected = (self.levels[-1][1] + self.levels[-1][2], 2)
+        if pyramid.shape != expected or pyramid.dtype != self.data.dtype:
+            return False
+        self.pyramid = pyramid
+        return True
+
+    def build_pyramid(self, progress=None, cancelled=None):
+        """Build and map the pyramid (call from a worker thread)"""
+        if self.count == 0 or not build_pyramid(self.data, self.pyramid_path, progress, cancelled):
+            return False
+        return self.load_pyramid()
+
+    def envelope(self, start, n, columns):
+        """(sample indices, volts) of about `columns` min/max pairs covering samples [start, start+n)"""
+        start = int(min(max(start, 0), max(self.count - 1, 0)))
+        n = int(min(max(n, 1), self.count - start))
+        if n <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        if n <= 2 * columns:
+            values = np.asarray(self.data[start:start + n], dtype=np.float64)
+            return start + np.arange(n), values * self.scale
+
+        # Coarsest level that still has at least `columns` rows in the window
+        usable = [level for level in self.levels if level[0] <= n / columns]
+        if usable and self.pyramid is not None:
+            bucket, offset, rows = usable[-1]
+            first = start // bucket
+            last = min(-(-(start + n) // bucket), rows)
+            mins = self.pyramid[offset + first:offset + last, 0]
+            maxs = self.pyramid[offset + first:offset + last, 1]
+            first *= bucket
+        elif n <= columns * PYRAMID_BASE * PYRAMID_FACTOR:
+            raw = self.data[start:start + n]
+            bucket, first, mins, maxs = 1, start, raw, raw
+        else:
+            return None     # too much raw data to scan per frame; wait for the pyramid
+
+        group = -(-len(mins) // columns)
+        mins, maxs = _reduce(mins, maxs, group)
+        positions = np.repeat(np.maximum(first + np.arange(len(mins)) * group * bucket, start), 2)
+        values = np.empty(2 * len(mins))
+        values[0::2] = mins
+        values[1::2] = maxs
+        return positions, values * self.scale
@@ -0,0 +1,75 @@
+import numpy as np
+
+N_CHANNELS = 2
+CHANNEL_NAMES = ['CH1', 'CH2']
+PROBE_GAINS = {'x1': 1.0, 'x10': 10.0}
+
+
+def as_block(samples, channels=N_CHANNELS):
+    """(channels, n) block of a chunk; a 1-D chunk (mono source or capture) becomes CH1"""
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim == 2:
+        return samples
+    block = np.zeros((channels, len(samples)))
+    block[0] = samples
+    return block
+
+
+class ChannelSettings:
+    """Per-channel vertical settings held as arrays, one entry per channel.
+
+    apply() scales and offsets a whole (channels, n) block with two
+    broadcast operations, so display cost does not grow with a Python loop
+    over channels. `gain` is the probe attenuation factor.
+    """
+
+    def __init__(self, channels=N_CHANNELS):
+        self.gain = np.ones(channels)
+        self.offset = np.zeros(channels)
+        self.enabled = np.ones(channels, dtype=bool)
+
+    @property
+    def channels(self):
+        return len(self.gain)
+
+    def key(self):
+        """Hashable snapshot of the scaling, for caches of displayed values"""
+        return tuple(self.gain) + tuple(self.offset)
+
+    def apply(self, block):
+        """Displayed volts of a (channels, n) block of acquired volts"""
+        return block * self.gain[:, np.newaxis] + self.offset[:, np.newaxis]
+
+    def to_acquired(self, channel, volts):
+        """Acquired volts of channel `channel` that display as `volts`"""
+        return (volts - self.offset[channel]) / self.gain[channel]
+
+
+class ChannelView:
+    """One channel of a multi-channel RingBuffer behind the 1-D read interface.
+
+    latest() and since() return strided views into the ring, so consumers
+    written for a single stream (spectrum, measurements) read a channel
+    without copying it out.
+    """
+
+    def __init__(self, ring, channel):
+        self.ring = ring
+        self.channel = channel
+
+    @property
+    def head(self):
+        return self.ring.head
+
+    @property
+    def capacity(self):
+        return self.ring.capacity
+
+    def __len__(self):
+        return len(self.ring)
+
+    def latest(self, n):
+        return self.ring.latest(n)[:, self.channel]
+
+    def since(self, head):
+        return self.ring.since(head)[:, self.channel]
@@ -0,0 +1,100 @@
+import numpy as np
+
+
+class MinMaxDecimator:
+    """Reduce a trace to min/max envelope pairs, one pair per plot column.
+
+    Columns are aligned to absolute sample indices (ring buffer `head`
+    coordinates) rather than to the window, so when the window scrolls the
+    columns already reduced keep their min/max and only the samples that
+    arrived since the last frame are scanned. The partial columns at the two
+    window edges are recomputed every frame. Short traces (no more than two
+    samples per column) pass through unchanged.
+
+    `data` may be a (channels, n) block; all channels are reduced together
+    along the last axis and share the column positions.
+    """
+
+    def __init__(self, columns=1500):
+        self.columns = max(int(columns), 1)
+        self.reset()
+
+    def reset(self):
+        """Forget cached columns (the samples behind them changed)"""
+        self._key = None
+        self._first = 0                     # absolute column index of _mins[..., 0]
+        self._mins = None
+        self._maxs = None
+
+    def resize(self, columns):
+        """Follow the plot width in pixels; returns True if it changed"""
+        columns = max(int(columns), 1)
+        if columns == self.columns:
+            return False
+        self.columns = columns
+        self.reset()
+        return True
+
+    def decimate(self, data, start, stream=None):
+        """Return (positions, values) to plot for `data`, whose first sample is index `start`.
+
+        `positions` are sample offsets into `data`. `stream` identifies the
+        sample source; cached columns are only reused for the same stream.
+        """
+        data = np.asarray(data)
+        n = data.shape[-1]
+        if n <= 2 * self.columns:
+            return np.arange(n), data
+
+        bucket = -(-n // self.columns)
+        if (stream, bucket, data.shape[:-1]) != self._key:
+            self.reset()
+            self._key = (stream, bucket, data.shape[:-1])
+        end = start + n
+        first = -(-start // bucket)         # first column fully inside the window
+        last = end // bucket                # one past the last full column
+
+        self._update_cache(data, start, bucket, first, last)
+        mins = self._mins[..., first - self._first:last - self._first]
+        maxs = self._maxs[..., first - self._first:last - self._first]
+        edges = np.arange(first, last) * bucket - start
+
+        # Partial columns at the window edges
+        head = first * bucket - start
+        if head > 0:
+            mins = np.concatenate((data[..., :head].min(axis=-1, keepdims=True), mins), axis=-1)
+            maxs = np.concatenate((data[..., :head].max(axis=-1, keepdims=True), maxs), axis=-1)
+            edges = np.concatenate(([0], edges))
+        tail = last * bucket - start
+        if tail < n:
+            mins = np.concatenate((mins, data[..., tail:].min(axis=-1, keepdims=True)), axis=-1)
+            maxs = np.concatenate((maxs, data[..., tail:].max(axis=-1, keepdims=True)), axis=-1)
+            edges = np.concatenate((edges, [tail]))
+
+        positions = np.repeat(edges, 2)
+        values = np.empty(data.shape[:-1] + (2 * len(edges),), dtype=data.dtype)
+        values[..., 0::2] = mins
+        values[..., 1::2] = maxs
+        return positions, values
+
+    def _update_cache(self, data, start, bucket, first, last):
+        """Make the cache cover columns [first, last), reducing only columns not seen yet"""
+        if self._mins is None:
+            self._mins = np.empty(data.shape[:-1] + (0,), dtype=data.dtype)
+            self._maxs = self._mins
+        cached_end = self._first + self._mins.shape[-1]
+        if not self._first <= first <= cached_end:
+            # No usable overlap (first frame, or the window jumped)
+            self._first, cached_end = first, first
+            self._mins = self._mins[..., :0]
+            self._maxs = self._maxs[..., :0]
+        keep = slice(first - self._first, min(cached_end, last) - self._first)
+        self._mins = self._mins[..., keep]
+        self._maxs = self._maxs[..., keep]
+        self._first = first
+        new_from = self._first + self._mins.shape[-1]
+        if new_from < last:
+            block = data[..., new_from * bucket - start:last * bucket - start]
+            block = block.reshape(data.shape[:-1] + (-1, bucket))
+            self._mins = np.concatenate((self._mins, block.min(axis=-1)), axis=-1)
+            self._maxs = np.concatenate((self._maxs, block.max(axis=-1)), axis=-1)
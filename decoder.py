@@ -0,0 +1,724 @@
+import binascii
+import struct
+import time
+
+import numpy as np
+
+# ADC scaling used by the firmware's "raw1#raw2\n" frames
+ADC_FULL_SCALE = 4095
+ADC_VREF = 3.3
+DEAD_BAND = 51          # raw counts at or below this read as 0 V
+SPIKE_THRESHOLD = 0.7   # volts
+
+_NL = ord('\n')
+_CR = ord('\r')
+_HASH = ord('#')
+_ZERO = ord('0')
+_NINE = ord('9')
+_MAX_DIGITS = 15        # float64 holds every integer of this many digits exactly
+
+# Binary frames: sync, seq, count, count x (raw1, raw2), CRC-16/CCITT over seq..payload.
+# All fields are little-endian uint16.
+FRAME_SYNC = b'\x5a\xa5'   # 0xA55A
+FRAME_HEADER = struct.Struct('<HHH')
+FRAME_CRC = struct.Struct('<H')
+FRAME_MAX_PAIRS = 256
+CRC_INIT = 0xFFFF
+
+# Rice frames: sync, seq, count, payload bytes, Rice parameter k of each channel, the
+# frame's first raw pair, the delta-coded payload, then the same CRC (see RiceFrameDecoder)
+RICE_SYNC = b'\x5a\xc3'    # 0xC35A
+RICE_HEADER = struct.Struct('<HHHHBBHH')
+RICE_PAIRS = 64             # pairs per frame sent by main.c
+RICE_MAX_K = 12
+RICE_ESCAPE = 16            # this quotient marks a delta sent raw after the unary codes
+RICE_RAW_BITS = 13          # a zig-zag delta of 12-bit samples
+RICE_MAX_BYTES = (2 * (FRAME_MAX_PAIRS - 1) * (RICE_MAX_K + RICE_ESCAPE + 1 + RICE_RAW_BITS) + 7) // 8
+
+# Handshake commands understood by main.c
+CMD_BINARY = b'MODE BIN\n'
+CMD_ASCII = b'MODE ASCII\n'
+CMD_RICE = b'MODE RICE\n'
+ACK_BINARY = b'ACK BIN\n'
+ACK_ASCII = b'ACK ASCII\n'
+ACK_RICE = b'ACK RICE\n'
+
+
+def channel_volts(raw1, raw2):
+    """Per-channel voltages of raw ADC pairs as a (2, n) block (vectorized)
+
+    Row 0 is ADC_CHANNEL_0, row 1 ADC_CHANNEL_1 with the firmware's negative
+    scaling, so the rows sum to the combined trace.
+    """
+    raw = np.stack((raw1, raw2))
+    volts = raw * (np.array([ADC_VREF, -ADC_VREF]) / ADC_FULL_SCALE)[:, np.newaxis]
+    return np.where(raw <= DEAD_BAND, 0.0, volts)
+
+
+def scale_raw(raw1, raw2):
+    """Convert raw ADC pairs to the combined voltage (vectorized)"""
+    value1 = raw1 * ADC_VREF / ADC_FULL_SCALE
+    value2 = raw2 * (-ADC_VREF) / ADC_FULL_SCALE
+    value1 = np.where(raw1 <= DEAD_BAND, 0.0, value1)
+    value2 = np.where(raw2 <= DEAD_BAND, 0.0, value2)
+    return value1 + value2
+
+
+def raw_from_volts(volts, idle=0):
+    """Raw ADC pairs (n, 2) the analog front end produces for `volts` (inverse of scale_raw)
+
+    The conditioning board splits the signal into positive and negative
+    halves; `idle` counts are added to both, like an idle input sitting a few
+    counts up inside the dead-band.
+    """
+    volts = np.asarray(volts, dtype=np.float64)
+    scale = ADC_FULL_SCALE / ADC_VREF
+    raw = np.empty((len(volts), 2), dtype=np.uint16)
+    raw[:, 0] = np.clip(np.rint(np.maximum(volts, 0) * scale) + idle, 0, ADC_FULL_SCALE)
+    raw[:, 1] = np.clip(np.rint(np.maximum(-volts, 0) * scale) + idle, 0, ADC_FULL_SCALE)
+    return raw
+
+
+def _parse_line(line):
+    """Parse one line exactly like the original per-line loop, None if invalid"""
+    try:
+        parts = line.decode('ascii', errors='ignore').strip().split('#')
+        if len(parts) < 2 or len(parts[0]) < 2 or len(parts[1]) < 2:
+            return None
+        return float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+
+
+def _field_values(buf, start, length):
+    """Decimal value of the digit fields buf[start:start+length], Horner-style"""
+    value = np.zeros(len(start), dtype=np.int64)
+    last = len(buf) - 1
+    for k in range(min(int(length.max(initial=0)), _MAX_DIGITS)):
+        digit = buf[np.minimum(start + k, last)].astype(np.int64) - _ZERO
+        value = np.where(length > k, value * 10 + digit, value)
+    return value.astype(np.float64)
+
+
+def _first_true(mask_for, start, stop):
+    """Index of the first True produced by mask_for(a, b) in [start, stop), or stop.
+
+    Scans in growing windows so a hit near `start` costs a few samples,
+    not a pass over the whole chunk.
+    """
+    width = 64
+    while start < stop:
+        end = min(start + width, stop)
+        hits = np.flatnonzero(mask_for(start, end))
+        if hits.size:
+            return start + int(hits[0])
+        start = end
+        width *= 4
+    return stop
+
+
+class FrameDecoder:
+    """State shared by the stream decoders: carry-over bytes and the glitch filter"""
+
+    def __init__(self, threshold=SPIKE_THRESHOLD, max_pending=1024):
+        self.threshold = threshold
+        self.max_pending = max_pending
+        self.pending = b''
+        self.last_valid_value = None   # output of the last valid sample
+        self.last_valid_pair = None    # feed_channels: (2,) volts of the last output pair
+        self.history = None            # (y[k-1], y[k-2]) for spike rejection
+        self.bytes_discarded = 0
+
+    def reset(self):
+        """Forget partial frames and filter history"""
+        self.pending = b''
+        self.last_valid_value = None
+        self.last_valid_pair = None
+        self.history = None
+
+    def feed(self, chunk):
+        """Decode a chunk of raw bytes into an array of voltages"""
+        raise NotImplementedError
+
+    def feed_channels(self, chunk):
+        """Decode a chunk of raw bytes into a (2, n) block of per-channel voltages.
+
+        The spike filter still runs on the combined trace (the sum of the
+        rows): a rejected sample repeats the previous output pair, so the
+        rows sum to what feed() returns. Use either feed() or
+        feed_channels() on one decoder, not both.
+        """
+        raise NotImplementedError
+
+    def _cap_pending(self, data):
+        """Keep the unterminated tail, dropping runaway garbage without newlines"""
+        if len(data) > self.max_pending:
+            self.bytes_discarded += len(data)
+            return b''
+        return data
+
+    def _reject_spikes(self, combined):
+        """Vectorized form of the original 0.7 V glitch filter.
+
+        A sample is kept if it lies within the threshold of either of the two
+        previous outputs, otherwise the previous output is repeated. While the
+        input tracks itself this reduces to a diff test on the raw samples; while
+        a value is being held it reduces to a distance test against that value.
+        Only the transitions between the two states are stepped one by one.
+        """
+        if combined.size == 0:
+            return combined
+        if self.history is None:
+            self.history = (combined[0], combined[0])
+
+        threshold = self.threshold
+        ext = np.concatenate((self.history[::-1], combined))
+        out = ext.copy()
+        step = np.abs(np.diff(ext))
+        near = (step[1:] < threshold) | (np.abs(ext[2:] - ext[:-2]) < threshold)
+        n = len(ext)
+        p = 2
+        while p < n:
+            y1 = out[p - 1]
+            y2 = out[p - 2]
+            if y1 == ext[p - 1] and y2 == ext[p - 2]:
+                # Tracking: outputs equal inputs until the first rejected sample
+                p = _first_true(lambda a, b: ~near[a - 2:b - 2], p, n)
+                if p < n:
+                    out[p] = out[p - 1]
+                    p += 1
+            elif y1 == y2:
+                # Holding: repeat y1 until a sample comes back within range
+                q = _first_true(lambda a, b: np.abs(ext[a:b] - y1) < threshold, p, n)
+                out[p:q] = y1
+                p = q + 1
+            else:
+                if not (abs(ext[p] - y1) < threshold or abs(ext[p] - y2) < threshold):
+                    out[p] = y1
+                p += 1
+
+        self.history = (out[-1], out[-2])
+        return out[2:]
+
+    def _reject_channel_spikes(self, block):
+        """_reject_spikes() for a (2, n) block: judged on the combined trace, held pair by pair"""
+        n = block.shape[1]
+        if n == 0:
+            return block
+        combined = block.sum(axis=0)
+        kept = self._reject_spikes(combined) == combined
+        # Each output takes the newest kept pair; -1 is one held over from the last chunk
+        source = np.maximum.accumulate(np.where(kept, np.arange(n), -1))
+        if source[0] >= 0:
+            return block[:, source]
+        return np.hstack((self.last_valid_pair[:, np.newaxis], block))[:, source + 1]
+
+
+class AsciiFrameDecoder(FrameDecoder):
+    """Batch decoder for the firmware's "%hu#%hu\\n" text stream.
+
+    Each call to feed() takes the raw bytes of one read_all() and returns a
+    float64 array with one voltage per complete line. Partial lines are kept
+    and completed by the next chunk. Scaling, dead-band and spike rejection
+    produce the same values as the original per-line loop in SerialReader.
+    """
+
+    def __init__(self, threshold=SPIKE_THRESHOLD, max_pending=1024):
+        super().__init__(threshold, max_pending)
+        self.lines_decoded = 0
+        self.lines_invalid = 0
+
+    def feed(self, chunk):
+        """Decode a chunk of raw bytes into an array of voltages"""
+        lines = self._complete_lines(chunk)
+        if lines is None:
+            return np.empty(0)
+        raw1, raw2, valid = lines
+
+        combined = self._reject_spikes(scale_raw(raw1[valid], raw2[valid]))
+
+        # Invalid lines repeat the last valid output, like the original loop
+        last_idx = np.cumsum(valid) - 1
+        if self.last_valid_value is None:
+            # Nothing to repeat yet: drop lines preceding the first valid one
+            last_idx = last_idx[last_idx >= 0]
+            values = combined[last_idx]
+        else:
+            values = np.concatenate(([self.last_valid_value], combined))[last_idx + 1]
+
+        if combined.size:
+            self.last_valid_value = float(combined[-1])
+        return values
+
+    def feed_channels(self, chunk):
+        lines = self._complete_lines(chunk)
+        if lines is None:
+            return np.empty((2, 0))
+        raw1, raw2, valid = lines
+        block = self._reject_channel_spikes(channel_volts(raw1[valid], raw2[valid]))
+
+        # Invalid lines repeat the last valid sample, as in feed()
+        last_idx = np.cumsum(valid) - 1
+        if self.last_valid_pair is None:
+            values = block[:, last_idx[last_idx >= 0]]
+        else:
+            values = np.hstack((self.last_valid_pair[:, np.newaxis], block))[:, last_idx + 1]
+        if block.shape[1]:
+            self.last_valid_pair = block[:, -1].copy()
+        return values
+
+    def _complete_lines(self, chunk):
+        """(raw1, raw2, valid) for the complete lines received so far, or None"""
+        data = self.pending + bytes(chunk) if self.pending else bytes(chunk)
+        end = data.rfind(b'\n')
+        if end < 0:
+            self.pending = self._cap_pending(data)
+            return None
+        self.pending = self._cap_pending(data[end + 1:])
+
+        raw1, raw2, valid = self._parse(data[:end + 1])
+        self.lines_decoded += len(valid)
+        self.lines_invalid += int(len(valid) - np.count_nonzero(valid))
+        return raw1, raw2, valid
+
+    def _parse(self, data):
+        """Split complete lines into (raw1, raw2, valid) arrays"""
+        buf = np.frombuffer(data, dtype=np.uint8)
+        if buf.max() >= 0x80:
+            buf = buf[buf < 0x80]   # the original decode used errors='ignore'
+
+        # Every field ends at a '#' or at the newline closing its line
+        is_nl = buf == _NL
+        is_hash = buf == _HASH
+        sep = np.flatnonzero(is_nl | is_hash)
+        ends_line = is_nl[sep]
+        start = np.empty_like(sep)
+        start[0] = 0
+        start[1:] = sep[:-1] + 1
+        stop = sep.copy()
+        # Drop the CR of "\r\n" endings, the original loop stripped it
+        cr = ends_line & (sep > start) & (buf[sep - 1] == _CR)
+        stop[cr] -= 1
+        length = stop - start
+
+        last_field = np.flatnonzero(ends_line)
+        line_end = sep[last_field]
+        n_lines = len(last_field)
+        first_field = np.empty(n_lines, dtype=np.intp)
+        first_field[0] = 0
+        first_field[1:] = last_field[:-1] + 1
+        second_field = np.minimum(first_field + 1, last_field)
+
+        len1 = length[first_field]
+        len2 = length[second_field]
+        valid = (last_field > first_field) & (len1 >= 2) & (len2 >= 2)
+        raw1, raw2 = _field_values(buf, np.concatenate((start[first_field], start[second_field])),
+                                   np.concatenate((len1, len2))).reshape(2, n_lines)
+
+        # Lines with anything but digits (spaces, signs, overlong numbers...)
+        # go through the exact per-line parser instead
+        other = ~(((buf >= _ZERO) & (buf <= _NINE)) | is_nl | is_hash)
+        other[stop[cr]] = False
+        slow = np.zeros(n_lines, dtype=bool)
+        slow[np.searchsorted(line_end, np.flatnonzero(other))] = True
+        slow |= (len1 > _MAX_DIGITS) | (len2 > _MAX_DIGITS)
+        if slow.any():
+            line_start = start[first_field]
+            raw_bytes = buf.tobytes()
+            for i in np.flatnonzero(slow):
+                parsed = _parse_line(raw_bytes[line_start[i]:line_end[i]])
+                valid[i] = parsed is not None
+                if parsed is not None:
+                    raw1[i], raw2[i] = parsed
+        return raw1, raw2, valid
+
+
+class BinaryFrameDecoder(FrameDecoder):
+    """Decoder for the packed binary frames sent by main.c in binary mode.
+
+    Payloads are mapped with np.frombuffer straight out of the received bytes;
+    the only pass over the samples is the scaling to volts. Frames failing the
+    CRC are skipped and counted in frames_corrupted. Gaps in the sequence
+    counter not explained by them are counted in frames_dropped, so each
+    missing frame is counted once.
+    """
+    sync = FRAME_SYNC
+    header = FRAME_HEADER
+
+    def __init__(self, threshold=SPIKE_THRESHOLD, max_pending=None):
+        if max_pending is None:
+            max_pending = self.header.size + self._max_payload() + FRAME_CRC.size
+        super().__init__(threshold, max_pending)
+        self.next_seq = None
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.frames_corrupted = 0
+        self._corrupted_since = 0    # frames_corrupted when the last good frame arrived
+
+    def reset(self):
+        """Forget partial frames, filter history and the expected sequence number"""
+        super().reset()
+        self.next_seq = None
+        self._corrupted_since = self.frames_corrupted
+
+    @property
+    def frames_missing(self):
+        """Frames whose samples never arrived, dropped or corrupted"""
+        return self.frames_dropped + self.frames_corrupted
+
+    def feed(self, chunk):
+        """Decode a chunk of raw bytes into an array of voltages"""
+        pairs = self._pairs(chunk)
+        if pairs is None:
+            return np.empty(0)
+        combined = self._reject_spikes(scale_raw(pairs[:, 0], pairs[:, 1]))
+        if combined.size:
+            self.last_valid_value = float(combined[-1])
+        return combined
+
+    def feed_channels(self, chunk):
+        pairs = self._pairs(chunk)
+        if pairs is None:
+            return np.empty((2, 0))
+        block = self._reject_channel_spikes(channel_volts(pairs[:, 0], pairs[:, 1]))
+        if block.shape[1]:
+            self.last_valid_pair = block[:, -1].copy()
+        return block
+
+    def _pairs(self, chunk):
+        """Raw (n, 2) ADC pairs of the valid frames received so far, or None"""
+        data = self.pending + bytes(chunk) if self.pending else bytes(chunk)
+        view = memoryview(data)
+        size = len(data)
+        frames = []     # (payload offset, header fields, frames_corrupted when found)
+        pos = 0
+        while True:
+            start = data.find(self.sync, pos)
+            if start < 0:
+                # A trailing first sync byte may be the start of the next frame
+                keep = 1 if data.endswith(self.sync[:1]) else 0
+                self.bytes_discarded += size - pos - keep
+                pos = size - keep
+                break
+            self.bytes_discarded += start - pos
+            pos = start
+            if pos + self.header.size > size:
+                break
+            fields = self.header.unpack_from(data, pos)
+            payload = self._payload_size(fields)
+            if payload is None:
+                self.frames_corrupted += 1
+                pos += 1
+                continue
+            end = pos + self.header.size + payload + FRAME_CRC.size
+            if end > size:
+                break
+            crc, = FRAME_CRC.unpack_from(data, end - FRAME_CRC.size)
+            if binascii.crc_hqx(view[pos + 2:end - FRAME_CRC.size], CRC_INIT) != crc:
+                self.frames_corrupted += 1
+                pos += 1
+                continue
+            frames.append((pos + self.header.size, fields, self.frames_corrupted))
+            pos = end
+        self.pending = self._cap_pending(data[pos:])
+        if not frames:
+            return None
+
+        pairs, decoded = self._decode_frames(data, [frame[:2] for frame in frames])
+        undecodable = 0
+        for (_, fields, corrupted), ok in zip(frames, decoded):
+            if not ok:
+                # Intact but not decodable: a sender bug rather than line noise
+                undecodable += 1
+                continue
+            corrupted += undecodable
+            seq = fields[1]
+            if self.next_seq is not None:
+                # Frames rejected since the last good one are already counted as corrupted
+                # (false syncs inside a payload can count more than the gap)
+                gap = (seq - self.next_seq) & 0xFFFF
+                self.frames_dropped += max(gap - (corrupted - self._corrupted_since), 0)
+            self._corrupted_since = corrupted
+            self.next_seq = (seq + 1) & 0xFFFF
+            self.frames_decoded += 1
+        self.frames_corrupted += undecodable
+
+        if not len(pairs):
+            return None
+        return pairs.reshape(-1, 2)
+
+    def _decode_frames(self, data, frames):
+        """(flat raw pairs of the decodable frames, decodable flag per frame) for CRC-checked
+        (payload offset, header fields) frames; the default decodes them one by one"""
+        payloads = [self._frame_pairs(data, offset, fields) for offset, fields in frames]
+        decoded = [payload is not None for payload in payloads]
+        payloads = [payload for payload in payloads if payload is not None]
+        if not payloads:
+            return np.empty(0, dtype='<u2'), decoded
+        return (payloads[0] if len(payloads) == 1 else np.concatenate(payloads)), decoded
+
+    def _max_payload(self):
+        return 4 * FRAME_MAX_PAIRS
+
+    def _payload_size(self, fields):
+        """Payload bytes of a frame with these header fields, None if they are impossible"""
+        count = fields[2]
+        return 4 * count if count <= FRAME_MAX_PAIRS else None
+
+    def _frame_pairs(self, data, offset, fields):
+        """Flat raw1, raw2, raw1... values of a frame whose CRC checked out"""
+        return np.frombuffer(data, dtype='<u2', count=2 * fields[2], offset=offset)
+
+
+def _bits_value(bits):
+    """Unsigned values of the rows of an (n, width) array of bits, most significant first"""
+    width = bits.shape[1]
+    if width == 0:
+        return np.zeros(len(bits), dtype=np.int64)
+    return bits @ (1 << np.arange(width - 1, -1, -1, dtype=np.int64))
+
+
+def _gather_bits(octets, start, width):
+    """Unsigned values of the `width`-bit fields (most significant first, up to 17 bits) at
+    bit offsets `start` of a byte array padded with two zero bytes"""
+    byte = start >> 3
+    window = (octets[byte].astype(np.int64) << 16) | (octets[byte + 1].astype(np.int64) << 8) | octets[byte + 2]
+    return (window >> (24 - (start & 7) - width)) & ((1 << width) - 1)
+
+
+def rice_parameter(total, m):
+    """Rice k for m values summing to `total`: the largest k with m * 2**k <= total"""
+    k = 0
+    while k < RICE_MAX_K and (m << (k + 1)) <= total:
+        k += 1
+    return k
+
+
+def _rice_group(octets, zeros, fields, bit_start, bit_end, count):
+    """Decode Rice frames of `count` pairs each, all at once.
+
+    `octets` are the frames' payloads back to back (padded with zero bytes),
+    `zeros` the positions of their zero bits followed by a sentinel, and
+    bit_start/bit_end where each payload lies. Returns the (frames, count, 2)
+    raw pairs and a flag per frame that did not parse cleanly (a section
+    overrunning its payload, an impossible code, a sample out of range).
+    """
+    m = count - 1
+    k = fields[:, 4:6]
+    first = fields[:, 6:8]
+    # Low bits: channel 1's m fields, then channel 2's
+    low_start = (bit_start[:, np.newaxis, np.newaxis] + (m * k[:, :1] * [0, 1])[:, :, np.newaxis]
+                 + np.arange(m) * k[:, :, np.newaxis])
+    low = _gather_bits(octets, low_start, k[:, :, np.newaxis])
+    # Unary quotients: the gaps between the first 2 * m zeros of each unary section
+    unary_start = bit_start + m * k.sum(axis=1)
+    first_zero = np.searchsorted(zeros, unary_start)
+    closing = zeros[np.minimum(first_zero[:, np.newaxis] + np.arange(2 * m), len(zeros) - 1)]
+    q = np.diff(closing, prepend=(unary_start - 1)[:, np.newaxis]) - 1
+    last = closing[:, -1] if m else unary_start - 1
+    # Escaped deltas follow the unary codes, in code order
+    escaped = q == RICE_ESCAPE
+    escapes = escaped.sum(axis=1)
+    u = (q.reshape(len(fields), 2, m) << k[:, :, np.newaxis]) | low
+    if escapes.any():
+        rank = np.cumsum(escaped, axis=1) - 1
+        frame, code = np.nonzero(escaped)
+        u[frame, code // max(m, 1), code % max(m, 1)] = _gather_bits(
+            octets, last[frame] + 1 + RICE_RAW_BITS * rank[frame, code], RICE_RAW_BITS)
+    odd = ((q > RICE_ESCAPE).any(axis=1) | (unary_start > bit_end)
+           | (first_zero + 2 * m > len(zeros) - 1) | (last + 1 + RICE_RAW_BITS * escapes > bit_end))
+
+    pairs = np.empty((len(fields), count, 2), dtype=np.int64)
+    pairs[:, 0] = first
+    pairs[:, 1:] = ((u >> 1) ^ -(u & 1)).transpose(0, 2, 1)
+    np.cumsum(pairs, axis=1, out=pairs)
+    odd |= ((pairs < 0) | (pairs > ADC_FULL_SCALE)).any(axis=(1, 2))
+    return pairs, odd
+
+
+class RiceFrameDecoder(BinaryFrameDecoder):
+    """Decoder for main.c's delta + Rice coded frames (MODE RICE).
+
+    A frame carries its first pair raw; every later sample is sent as the
+    difference from the previous one on its channel, zig-zag mapped to
+    u >= 0 (0, -1, 1, -2... -> 0, 1, 2, 3...) and Rice coded with the frame's
+    k for that channel: the quotient u >> k in unary (ones closed by a
+    zero) and the k low bits as they are. The bitstream keeps the parts
+    apart so each is decoded in a few array operations instead of bit by
+    bit: first the low bits of channel 1 then channel 2 (fixed width per
+    frame), then the 2 * (count - 1) unary codes (located by their
+    terminating zeros), then a RICE_RAW_BITS field for every code whose
+    quotient hit RICE_ESCAPE. A cumulative sum restores the samples.
+    _decode_frames() does this for every frame of a chunk at once, with
+    per-frame offsets into one unpacked bitstream; only a frame that does
+    not parse cleanly goes through _frame_pairs() on its own. Slow signals code in 2-4 bits per sample instead of the
+    16 of binary frames and the 40 or so of ASCII; framing, CRC and the
+    loss counters are the binary decoder's.
+    """
+    sync = RICE_SYNC
+    header = RICE_HEADER
+
+    def _max_payload(self):
+        return RICE_MAX_BYTES
+
+    def _payload_size(self, fields):
+        _, _, count, size, k1, k2, _, _ = fields
+        if not 0 < count <= FRAME_MAX_PAIRS or size > RICE_MAX_BYTES or max(k1, k2) > RICE_MAX_K:
+            return None
+        return size
+
+    def _decode_frames(self, data, frames):
+        fields = np.array([header for _, header in frames], dtype=np.int64)
+        count, size = fields[:, 2], fields[:, 3]
+        payload = b''.join(data[offset:offset + n] for (offset, _), n in zip(frames, size.tolist()))
+        # Fixed-width fields are read from the bytes, the unary codes from the bits
+        octets = np.frombuffer(payload + bytes(3), dtype=np.uint8)
+        bits = np.unpackbits(octets[:len(payload)])
+        zeros = np.append(np.flatnonzero(bits == 0), len(bits))
+        bit_end = np.cumsum(8 * size)
+        bit_start = bit_end - 8 * size
+
+        # main.c sends RICE_PAIRS per frame, so there is usually one group
+        lengths = np.unique(count)
+        rows = np.cumsum(count) - count
+        if len(lengths) == 1:
+            pairs, odd = _rice_group(octets, zeros, fields, bit_start, bit_end, int(lengths[0]))
+            pairs = pairs.reshape(-1, 2)
+        else:
+            pairs = np.empty((int(count.sum()), 2), dtype=np.int64)
+            odd = np.empty(len(frames), dtype=bool)
+            for length in lengths.tolist():
+                group = np.flatnonzero(count == length)
+                values, odd[group] = _rice_group(octets, zeros, fields[group], bit_start[group],
+                                                 bit_end[group], length)
+                pairs[(rows[group, np.newaxis] + np.arange(length)).ravel()] = values.reshape(-1, 2)
+
+        if not odd.any():
+            return pairs.astype('<u2').ravel(), [True] * len(frames)
+        # Frames that did not parse cleanly are retried alone
+        payloads = []
+        decoded = []
+        for f, (offset, header) in enumerate(frames):
+            single = (pairs[rows[f]:rows[f] + count[f]].astype('<u2').ravel() if not odd[f]
+                      else self._frame_pairs(data, offset, header))
+            decoded.append(single is not None)
+            if single is not None:
+                payloads.append(single)
+        return (np.concatenate(payloads) if payloads else np.empty(0, dtype='<u2')), decoded
+
+    def _frame_pairs(self, data, offset, fields):
+        _, _, count, size, k1, k2, first1, first2 = fields
+        m = count - 1
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=size, offset=offset))
+        low_end = m * (k1 + k2)
+        if low_end > len(bits):
+            return None
+        low = np.concatenate((_bits_value(bits[:m * k1].reshape(m, k1)),
+                              _bits_value(bits[m * k1:low_end].reshape(m, k2))))
+        # Unary quotients: the gaps between the zeros that close them
+        zeros = np.flatnonzero(bits[low_end:] == 0)[:2 * m]
+        if len(zeros) < 2 * m:
+            return None
+        q = np.diff(zeros, prepend=-1) - 1
+        k = np.repeat(np.array([k1, k2], dtype=np.int64), m)
+        u = (q << k) | low
+        escaped = np.flatnonzero(q == RICE_ESCAPE)
+        if len(escaped):
+            raw_start = low_end + (int(zeros[-1]) + 1 if m else 0)
+            raw = bits[raw_start:raw_start + RICE_RAW_BITS * len(escaped)]
+            if len(raw) < RICE_RAW_BITS * len(escaped):
+                return None
+            u[escaped] = _bits_value(raw.reshape(-1, RICE_RAW_BITS))
+        deltas = (u >> 1) ^ -(u & 1)
+        pairs = np.empty((count, 2), dtype=np.int64)
+        pairs[0] = first1, first2
+        pairs[1:] = deltas.reshape(2, m).T
+        np.cumsum(pairs, axis=0, out=pairs)
+        if pairs.min() < 0 or pairs.max() > ADC_FULL_SCALE:
+            return None
+        return pairs.astype('<u2').ravel()
+
+
+def encode_frame(seq, raw1, raw2):
+    """Pack one binary frame the way main.c does (used by the loopback device)"""
+    pairs = np.empty((len(raw1), 2), dtype='<u2')
+    pairs[:, 0] = raw1
+    pairs[:, 1] = raw2
+    body = FRAME_HEADER.pack(0xA55A, seq & 0xFFFF, len(pairs))[2:] + pairs.tobytes()
+    return FRAME_SYNC + body + FRAME_CRC.pack(binascii.crc_hqx(body, CRC_INIT))
+
+
+def _unary(q):
+    """Bits of the unary codes of q: q[i] ones then a zero each"""
+    ends = np.cumsum(q + 1)
+    bits = np.ones(int(ends[-1]) if len(ends) else 0, dtype=np.uint8)
+    bits[ends - 1] = 0
+    return bits
+
+
+def _bits(values, width):
+    """(n * width) bits of values, most significant first"""
+    shifts = np.arange(width - 1, -1, -1, dtype=np.int64)
+    return ((np.asarray(values, dtype=np.int64)[:, np.newaxis] >> shifts) & 1).astype(np.uint8).ravel()
+
+
+def encode_rice_frame(seq, raw1, raw2):
+    """Pack one delta + Rice frame the way main.c does (the reference for the firmware encoder)"""
+    pairs = np.stack((raw1, raw2)).astype(np.int64)
+    count = pairs.shape[1]
+    m = count - 1
+    deltas = np.diff(pairs, axis=1)
+    u = np.where(deltas >= 0, 2 * deltas, -2 * deltas - 1)
+    k = [rice_parameter(int(row.sum()), m) for row in u]
+    q = u >> np.array(k)[:, np.newaxis]
+    escaped = q >= RICE_ESCAPE
+    low = [_bits(u[c] & ((1 << k[c]) - 1), k[c]) for c in range(2)]
+    bits = np.concatenate(low + [_unary(np.minimum(q, RICE_ESCAPE).ravel()),
+                                 _bits(u[escaped], RICE_RAW_BITS)])
+    payload = np.packbits(bits).tobytes()
+    body = RICE_HEADER.pack(0xC35A, seq & 0xFFFF, count, len(payload), k[0], k[1],
+                            int(pairs[0, 0]), int(pairs[1, 0]))[2:] + payload
+    return RICE_SYNC + body + FRAME_CRC.pack(binascii.crc_hqx(body, CRC_INIT))
+
+
+def _request_mode(port, command, ack, decoder_class, received, timeout):
+    """Send a MODE command; (decoder, b'') if acknowledged, else (None, bytes received)"""
+    port.write(command)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        received += port.read_all()
+        idx = received.find(ack)
+        if idx >= 0:
+            decoder = decoder_class()
+            decoder.pending = received[idx + len(ack):]
+            return decoder, b''
+        time.sleep(0.01)
+    return None, received
+
+
+def negotiate_protocol(port, protocol='auto', timeout=0.5):
+    """Pick the frame decoder for a freshly opened port.
+
+    'auto' asks the firmware for Rice frames, then for binary frames, and
+    falls back to ASCII when neither is acknowledged (older firmware simply
+    ignores the commands). Bytes received during the handshake are handed
+    to the chosen decoder.
+    """
+    if protocol == 'ascii':
+        port.write(CMD_ASCII)
+        return AsciiFrameDecoder()
+
+    received = b''
+    if protocol in ('auto', 'rice'):
+        decoder, received = _request_mode(port, CMD_RICE, ACK_RICE, RiceFrameDecoder, received, timeout)
+        if decoder is not None:
+            return decoder
+    decoder, received = _request_mode(port, CMD_BINARY, ACK_BINARY, BinaryFrameDecoder, received, timeout)
+    if decoder is not None:
+        return decoder
+
+    if protocol == 'binary':
+        return BinaryFrameDecoder()
+    decoder = AsciiFrameDecoder()
+    decoder.pending = received
+    return decoder
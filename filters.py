@@ -0,0 +1,92 @@
+import numpy as np
+
+LOWPASS = 'Low-pass'
+MOVING_AVERAGE = 'Moving Average'
+FILTER_TYPES = [LOWPASS, MOVING_AVERAGE]
+
+# Butterworth sections shared by every filter instance, keyed by design parameters
+_sos_cache = {}
+
+
+def lowpass_sos(cutoff, fs, order=5):
+    """Second-order sections of a Butterworth low-pass, designed once per setting"""
+    key = (LOWPASS, cutoff, order, fs)
+    sos = _sos_cache.get(key)
+    if sos is None:
+        # scipy.signal takes over a second to import; only pay for it once a filter is used
+        from scipy.signal import butter
+        nyq = 0.5 * fs
+        normal_cutoff = min(cutoff / nyq, 0.99)
+        sos = butter(order, normal_cutoff, btype='low', output='sos')
+        _sos_cache[key] = sos
+    return sos
+
+
+class StreamingFilter:
+    """Causal filter stage fed with samples as they come off SerialReader.
+
+    State is kept between calls (sosfilt `zi` for the low-pass, the last
+    `window` inputs and their sum for the moving average), so each chunk is
+    filtered once, in O(1) per sample, and consecutive chunks join seamlessly.
+    The state is seeded from the first sample, so there is no start-up
+    transient from zero.
+
+    Chunks may be (channels, n) blocks: every channel is filtered along the
+    last axis in the same call, each with its own state.
+    """
+
+    def __init__(self, kind=LOWPASS, param=20, fs=1000, order=5):
+        self.kind = kind
+        self.param = param      # cutoff in Hz (low-pass) or window in samples (moving average)
+        self.fs = fs
+        self.order = order
+        self.reset()
+
+    def reset(self):
+        """Drop filter state; the next sample starts a fresh settled filter"""
+        self._zi = None
+        self._history = None
+        self._sum = 0.0
+
+    def configure(self, kind, param, fs, order=5):
+        """Apply new settings, return True if they changed (state is reset)"""
+        settings = (kind, param, fs, order)
+        if settings == (self.kind, self.param, self.fs, self.order):
+            return False
+        self.kind, self.param, self.fs, self.order = settings
+        self.reset()
+        return True
+
+    def process(self, samples):
+        """Filter the next chunk of the stream"""
+        x = np.asarray(samples, dtype=np.float64)
+        if x.shape[-1] == 0:
+            return x
+        if self.kind == LOWPASS:
+            return self._lowpass(x)
+        return self._moving_average(x)
+
+    def _lowpass(self, x):
+        from scipy.signal import sosfilt, sosfilt_zi
+        sos = lowpass_sos(self.param, self.fs, self.order)
+        if self._zi is None:
+            # (sections, ..., 2): one state per channel, settled on its first sample
+            zi = sosfilt_zi(sos)
+            x0 = x[..., 0]
+            self._zi = zi.reshape(zi.shape[:1] + (1,) * x0.ndim + (2,)) * x0[..., np.newaxis]
+        y, self._zi = sosfilt(sos, x, axis=-1, zi=self._zi)
+        return y
+
+    def _moving_average(self, x):
+        window = max(int(self.param), 1)
+        if self._history is None:
+            self._history = np.repeat(x[..., :1], window, axis=-1)
+            self._sum = x[..., 0] * window
+        # Running sum: add the new sample, subtract the one leaving the window
+        n = x.shape[-1]
+        ext = np.concatenate((self._history, x), axis=-1)
+        sums = self._sum[..., np.newaxis] + np.cumsum(x - ext[..., :n], axis=-1)
+        self._history = ext[..., -window:]
+        # Re-anchor on the exact window sum so rounding never accumulates
+        self._sum = self._history.sum(axis=-1)
+        return sums / window
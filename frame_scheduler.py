@@ -0,0 +1,85 @@
+import time
+
+from measurements import RunningStats
+
+# Dirty flags: what changed since the last frame
+DATA = 1        # new samples arrived
+SETTINGS = 2    # a panel control changed
+VIEW = 4        # display mode, theme or plot geometry changed
+ALL = DATA | SETTINGS | VIEW
+
+TARGET_FPS = [5, 10, 20, 30, 60]
+DEFAULT_FPS = 20
+BUDGET = 0.5    # largest share of the GUI thread spent rendering frames
+COST_SMOOTHING = 0.2
+
+
+class FrameScheduler:
+    """Decides when the GUI redraws, and tells the frame what changed.
+
+    Producers mark() dirty flags instead of drawing. The first mark after a
+    frame requests one frame, no earlier than one frame interval after the
+    previous frame; later marks fold into that pending frame, so a burst of
+    chunks or control changes costs a single redraw. The interval is the
+    target FPS period, stretched while frames are expensive so rendering
+    never takes more than BUDGET of the GUI thread. A frame's cost is its
+    own work plus the repaints reported to painted(), since Qt paints after
+    the frame returns. Nothing dirty means no frame is requested at all, so
+    a stopped or idle scope uses no CPU.
+    """
+
+    def __init__(self, target_fps=DEFAULT_FPS):
+        self.target_fps = target_fps
+        self.dirty = 0
+        self.paused = False
+        self.pending = False
+        self.frames = 0
+        self.coalesced = 0                 # marks folded into an already pending frame
+        self.frame_time = RunningStats()   # seconds of work per frame
+        self.paint_time = RunningStats()   # seconds per repaint
+        self.cost = 0.0                    # recent frame cost with its repaints, exponentially averaged
+        self._last_frame = -float('inf')
+        self._frame_start = None
+
+    @property
+    def interval(self):
+        """Seconds between frames: the target period, or longer while frames are expensive"""
+        return max(1.0 / self.target_fps, self.cost / BUDGET)
+
+    def mark(self, flags):
+        """Record changes; returns the delay in seconds of a newly needed frame, or None"""
+        self.dirty |= flags
+        if self.pending:
+            self.coalesced += 1
+            return None
+        if self.paused:
+            return None
+        self.pending = True
+        return max(self._last_frame + self.interval - time.perf_counter(), 0.0)
+
+    def pause(self):
+        """Hold frames back; marks keep accumulating until resume()"""
+        self.paused = True
+        self.pending = False
+
+    def resume(self):
+        self.paused = False
+
+    def begin(self):
+        """Start a frame: returns the dirty flags and clears them"""
+        self.pending = False
+        flags, self.dirty = self.dirty, 0
+        self._frame_start = self._last_frame = time.perf_counter()
+        return flags
+
+    def end(self):
+        """Finish the frame started by begin() and account for its cost"""
+        elapsed = time.perf_counter() - self._frame_start
+        self.frames += 1
+        self.frame_time.add(elapsed)
+        self.cost += COST_SMOOTHING * (elapsed - self.cost)
+
+    def painted(self, elapsed):
+        """Add the time of a repaint to the cost of the frame that caused it"""
+        self.paint_time.add(elapsed)
+        self.cost += COST_SMOOTHING * elapsed
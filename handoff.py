@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+DROP_OLDEST = 'drop-oldest'     # a full queue loses its oldest block
+COALESCE = 'coalesce'           # a full queue merges the new block into the newest one
+BLOCK = 'block'                 # a full queue makes the reader wait
+HANDOFF_POLICIES = [DROP_OLDEST, COALESCE, BLOCK]
+DEFAULT_BLOCKS = 16             # about 0.3 s of 20 ms chunks
+
+
+class BlockQueue:
+    """Bounded hand-off of (channels, n) blocks from the reader thread to the GUI.
+
+    put() returns True only when it made the queue non-empty: the reader
+    then signals the GUI once, and the GUI's take() collects every block
+    queued meanwhile. However long the GUI stalls, one signal waits in the
+    Qt event queue and at most `max_blocks` blocks wait here.
+
+    What a put() to a full queue does is the policy:
+      DROP_OLDEST  the oldest block is discarded, so what is displayed
+                   stays within max_blocks of real time.
+      COALESCE     every queued block and the new one are merged into one
+                   block holding their newest `max_samples` (by default
+                   max_blocks blocks of the new block's size), so the GUI
+                   gets fewer, larger blocks and at most about twice that
+                   many samples ever wait: the lag stays bounded like
+                   DROP_OLDEST's while the newest data arrives whole.
+      BLOCK        the reader waits for room. Nothing is lost here, but
+                   the port's own buffer fills instead and, once that
+                   overflows, the link loses data.
+    Every case is counted; counters() is read by the status bar. take()
+    returns each block with the samples lost just before it, so the GUI
+    can step its sample index over the hole instead of splicing across it.
+    """
+
+    def __init__(self, max_blocks=DEFAULT_BLOCKS, policy=DROP_OLDEST, max_samples=None):
+        self.max_blocks = max_blocks
+        self.policy = policy
+        self.max_samples = max_samples
+        self._blocks = deque()      # [samples lost just before the block, block]
+        self._cond = threading.Condition()
+        self.closed = False
+        self.blocks_in = 0
+        self.blocks_dropped = 0
+        self.samples_dropped = 0
+        self.blocks_coalesced = 0
+        self.waits = 0
+        self.wait_time = 0.0        # seconds the reader spent waiting for room
+        self.high_water = 0         # most blocks queued at once
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def put(self, block):
+        """Queue a block; True if the consumer has to be woken up"""
+        with self._cond:
+            self.blocks_in += 1
+            if len(self._blocks) >= self.max_blocks and self.policy == BLOCK:
+                self.waits += 1
+                start = time.perf_counter()
+                while len(self._blocks) >= self.max_blocks and self.policy == BLOCK and not self.closed:
+                    self._cond.wait(0.1)
+                self.wait_time += time.perf_counter() - start
+            skipped = 0
+            # Still full: the policy changed while waiting, or nobody will take() any more
+            if len(self._blocks) >= self.max_blocks:
+                if self.policy == COALESCE:
+                    budget = self.max_samples or self.max_blocks * block.shape[1]
+                    # Only the oldest queued block can follow a gap (see take())
+                    skipped = self._blocks[0][0]
+                    block = np.hstack([queued for _, queued in self._blocks] + [block])
+                    self.blocks_coalesced += len(self._blocks)
+                    self._blocks.clear()
+                    excess = block.shape[1] - budget
+                    if excess > 0:
+                        self.samples_dropped += excess
+                        skipped += excess
+                        block = block[:, excess:]
+                else:
+                    lost, oldest = self._blocks.popleft()
+                    lost += oldest.shape[1]
+                    self.samples_dropped += oldest.shape[1]
+                    self.blocks_dropped += 1
+                    # The hole now sits before the oldest block still queued
+                    if self._blocks:
+                        self._blocks[0][0] += lost
+                    else:
+                        skipped = lost
+            wake = not self._blocks
+            self._blocks.append([skipped, block])
+            self.high_water = max(self.high_water, len(self._blocks))
+            return wake
+
+    def take(self):
+        """Every queued (samples lost just before it, block), oldest first"""
+        with self._cond:
+            blocks = [tuple(entry) for entry in self._blocks]
+            self._blocks.clear()
+            self._cond.notify_all()
+        return blocks
+
+    def set_policy(self, policy):
+        with self._cond:
+            self.policy = policy
+            # A reader waiting under BLOCK re-checks and carries on
+            self._cond.notify_all()
+
+    def close(self):
+        """Release a reader waiting for room; from now on a full queue drops its oldest block"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def counters(self):
+        return {'queued': len(self._blocks),
+                'high_water': self.high_water,
+                'blocks_in': self.blocks_in,
+                'blocks_dropped': self.blocks_dropped,
+                'samples_dropped': self.samples_dropped,
+                'blocks_coalesced': self.blocks_coalesced,
+                'waits': self.waits,
+                'wait_time': self.wait_time}
+
+
+def format_handoff(counters):
+    """One-line summary of BlockQueue counters for the status bar"""
+    text = (f"queue {counters['queued']} (max {counters['high_water']}), "
+            f"{counters['blocks_dropped']} dropped, {counters['blocks_coalesced']} coalesced")
+    if counters['waits']:
+        text += f", reader waited {counters['wait_time']:.1f} s"
+    return text
@@ -0,0 +1,321 @@
+import argparse
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+
+from acquisition import LOOPBACK_PORT, STATUS_STOPPED, AcquisitionProcess
+from channels import CHANNEL_NAMES, N_CHANNELS, ChannelView
+from filters import FILTER_TYPES, StreamingFilter
+from measurements import MEASUREMENTS, UNITS, MeasurementEngine, format_si
+from recorder import CaptureRecorder
+from ring_buffer import RingBuffer
+from segments import SegmentMemory
+from sources import ReplaySource, test_signal
+from spectrum import SEGMENT_SIZES, WINDOW_TYPES, SpectrumAnalyzer
+from stream_server import POLICIES, StreamServer, parse_address
+from trigger import TRIGGER_TYPES, TriggerEngine
+
+POLL_INTERVAL = 0.02    # seconds between polls of the acquisition ring while it is idle
+
+
+class HeadlessScope:
+    """The scope's processing chain without a GUI.
+
+    process() is the per-chunk path of OscilloscopeUI.process_new_samples:
+    each (channels, n) block is filtered once, its edges measured, scanned
+    for triggers, added to the spectrum and queued to the recorder as it
+    arrives. frame() then takes acquisitions of `window` samples for the
+    amplitude measurements: around the newest complete trigger when a
+    trigger is set, otherwise back-to-back windows of the stream.
+    """
+
+    def __init__(self, ring, sample_rate, window, channel=0, stream_filter=None, trigger=None,
+                 spectrum=None, recorder=None, server=None, segments=None):
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.window = window
+        self.channel = channel
+        self.stream_filter = stream_filter
+        self.filtered = RingBuffer(ring.capacity, item_shape=(N_CHANNELS,)) if stream_filter else None
+        self.trigger = trigger
+        self.spectrum = spectrum
+        self.recorder = recorder
+        self.server = server
+        self.segments = segments
+        self.measurements = MeasurementEngine(fs=sample_rate)
+        self.frames = 0
+        self._frame_start = None
+
+    @property
+    def stream(self):
+        """Ring of the measured stream: the filtered copy when a filter is set"""
+        return self.filtered if self.filtered is not None else self.ring
+
+    def process(self, block, start):
+        """Process a (channels, n) block whose first sample has absolute index `start`"""
+        stream = block
+        if self.stream_filter is not None:
+            if self.filtered.head != start:
+                # Samples were lost upstream: restart the copy at the new position
+                self.filtered.clear(start)
+            stream = self.stream_filter.process(block)
+            self.filtered.write(stream.T)
+        self.measurements.process(stream[self.channel], start)
+        if self.trigger is not None:
+            fired = self.trigger.process(block[self.channel], start)
+            if self.segments is not None:
+                self.segments.capture(self.stream, fired)
+        if self.spectrum is not None:
+            self.spectrum.update(ChannelView(self.stream, self.channel))
+        if self.recorder is not None:
+            self.recorder.write(block, start)
+        if self.server is not None:
+            self.server.publish(block, start)
+
+    def frame(self):
+        """Measure the next complete acquisition; returns False if there is none yet"""
+        ring = self.stream
+        head = ring.head
+        if self.trigger is not None:
+            position = self.trigger.latest_complete(head)
+            if position is None:
+                return False
+            start = position - self.trigger.pre_trigger
+            if start == self._frame_start or start < head - len(ring):
+                return False
+        else:
+            start = head - self.window
+            if len(ring) < self.window:
+                return False
+            if self._frame_start is not None and start < self._frame_start + self.window:
+                return False
+        trace = ring.latest(head - start)[:self.window, self.channel]
+        self._frame_start = start
+        self.measurements.measure_frame(trace, start)
+        self.frames += 1
+        return True
+
+    def report(self, elapsed):
+        """Latest value of every measurement, with the stream position"""
+        row = {'time_s': round(elapsed, 3), 'samples': self.ring.head, 'frames': self.frames,
+               'triggers': self.trigger.trigger_count if self.trigger is not None else 0}
+        for name in MEASUREMENTS:
+            row[f"{name}_{UNITS[name]}"] = self.measurements.value(name)
+        return row
+
+
+class ReportWriter:
+    """Measurement rows as CSV or JSON lines, to a file or stdout ('-')"""
+
+    def __init__(self, path, fmt):
+        self.file = sys.stdout if path == '-' else open(path, 'w', newline='')
+        self.fmt = fmt
+        self._csv = None
+
+    def write(self, row):
+        if self.fmt == 'json':
+            self.file.write(json.dumps(row) + '\n')
+        else:
+            if self._csv is None:
+                self._csv = csv.DictWriter(self.file, fieldnames=list(row))
+                self._csv.writeheader()
+            self._csv.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+def write_spectrum(path, spectrum):
+    result = spectrum.spectrum_db()
+    if result is None:
+        print("No spectrum: fewer samples than one FFT segment", file=sys.stderr)
+        return
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['frequency_hz', 'magnitude_dbv'])
+        writer.writerows(zip(*result))
+
+
+def write_segments(path, segments, sample_rate):
+    """Captured segments with their trigger times, as a NumPy .npz archive"""
+    count = segments.count
+    np.savez(path, segments=segments.data[:count], timestamps=segments.timestamps(sample_rate),
+             sample_rate=sample_rate, pre_trigger=segments.pre_trigger)
+    print(f"Saved {count} segments to {path} ({segments.missed} missed)", file=sys.stderr)
+
+
+def print_summary(scope, acquisition, elapsed):
+    """Running statistics of every measurement, on stderr so stdout stays machine-readable"""
+    print(f"{scope.ring.head} samples in {elapsed:.2f} s, {scope.frames} acquisitions, "
+          f"{acquisition.dropped} dropped", file=sys.stderr)
+    counters = acquisition.counters()
+    if counters.get('rate_locked'):
+        # Only the port is clocked; test and replay sources run at their own rate
+        print(f"Port delivered {counters['sample_rate']:.2f} S/s over {counters['blocks']} blocks "
+              f"(--rate {scope.sample_rate:g})", file=sys.stderr)
+    if scope.server is not None:
+        served = scope.server.counters()
+        print(f"Served {served['frames_published']} frames to {served['clients_served']} subscribers, "
+              f"{served['frames_dropped']} dropped in queues, {served['clients_dropped']} disconnected",
+              file=sys.stderr)
+    for name in MEASUREMENTS:
+        stats = scope.measurements.stats[name]
+        if stats.count:
+            unit = UNITS[name]
+            print(f"{name:>10}: mean {format_si(stats.mean, unit):>12}  std {format_si(stats.std, unit):>12}  "
+                  f"min {format_si(stats.min, unit):>12}  max {format_si(stats.max, unit):>12}  n {stats.count}",
+                  file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Acquire, process and record without the GUI.",
+        epilog="example: python headless.py --port COM3 --duration 10 --record run.osc --measure-out -")
+    src = parser.add_argument_group("source")
+    src.add_argument('--port', default='COM3', help=f"serial port, or '{LOOPBACK_PORT}' for the firmware stand-in")
+    src.add_argument('--baud', type=int, default=115200)
+    src.add_argument('--protocol', choices=['auto', 'rice', 'binary', 'ascii'], default='auto')
+    src.add_argument('--rate', type=float, default=1000, help="sample rate of the port, S/s")
+    src.add_argument('--resample', action='store_true',
+                     help="interpolate the port's samples onto --rate using its measured sample rate")
+    src.add_argument('--replay', metavar='FILE', help="play a capture instead of reading the port")
+    src.add_argument('--speed', type=float, default=1.0, help="replay speed, 0 = as fast as possible")
+    src.add_argument('--test', action='store_true', help="use the built-in test signals")
+    proc = parser.add_argument_group("processing")
+    proc.add_argument('--channel', choices=CHANNEL_NAMES, default=CHANNEL_NAMES[0],
+                      help="channel measured, triggered on and analysed")
+    proc.add_argument('--window', type=int, default=1000, help="samples per acquisition")
+    proc.add_argument('--filter', choices=FILTER_TYPES)
+    proc.add_argument('--filter-param', type=float, default=20,
+                      help="cutoff in Hz (low-pass) or window in samples (moving average)")
+    proc.add_argument('--trigger-level', type=float, help="volts; acquisitions follow the trigger when set")
+    proc.add_argument('--trigger-edge', choices=['Rising', 'Falling'], default='Rising')
+    proc.add_argument('--trigger-type', choices=TRIGGER_TYPES, default=TRIGGER_TYPES[0])
+    proc.add_argument('--segments', type=int, metavar='N',
+                      help="capture every trigger into N preallocated segments (needs --trigger-level)")
+    proc.add_argument('--fft-segment', type=int, choices=SEGMENT_SIZES, default=1024)
+    proc.add_argument('--fft-window', choices=WINDOW_TYPES, default=WINDOW_TYPES[0])
+    out = parser.add_argument_group("output")
+    out.add_argument('--record', metavar='FILE', help="write a capture file")
+    out.add_argument('--measure-out', metavar='FILE', help="measurement rows, '-' for stdout")
+    out.add_argument('--format', choices=['csv', 'json'], default='csv')
+    out.add_argument('--report', type=float, default=1.0, help="seconds between measurement rows")
+    out.add_argument('--fft-out', metavar='FILE', help="averaged spectrum as CSV at the end")
+    out.add_argument('--segments-out', metavar='FILE', default='segments.npz',
+                     help="where --segments are saved at the end (.npz)")
+    out.add_argument('--serve', metavar='ADDRESS', type=parse_address,
+                     help="publish the live samples on host:port (or :port) or a Unix socket path")
+    out.add_argument('--serve-queue', type=int, default=64, help="frames queued per subscriber")
+    out.add_argument('--serve-policy', choices=POLICIES, default=POLICIES[0],
+                     help="what a subscriber's full queue does with new frames")
+    out.add_argument('--websocket', action='store_true', help="serve WebSocket instead of raw frames")
+    stop = parser.add_argument_group("stop")
+    stop.add_argument('--duration', type=float, help="seconds to run (default: until the source ends or Ctrl-C)")
+    stop.add_argument('--samples', type=int, help="stop after this many samples")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    source = None
+    sample_rate = args.rate
+    if args.replay:
+        source = ReplaySource(args.replay, speed=args.speed or None)
+        sample_rate = source.sample_rate
+    elif args.test:
+        source = test_signal(sample_rate)
+
+    capacity = max(4 * args.window, 4 * args.fft_segment, int(10 * sample_rate))
+    acquisition = AcquisitionProcess(port=args.port, baudrate=args.baud, protocol=args.protocol,
+                                     capacity=capacity, sample_rate=sample_rate, source=source,
+                                     resample=args.resample)
+    channel = CHANNEL_NAMES.index(args.channel)
+    stream_filter = StreamingFilter(args.filter, args.filter_param, sample_rate) if args.filter else None
+    trigger = None
+    if args.trigger_level is not None:
+        pre_trigger = args.window // 2
+        trigger = TriggerEngine(level=args.trigger_level, edge=args.trigger_edge, kind=args.trigger_type,
+                                hysteresis=0.1, pre_trigger=pre_trigger,
+                                post_trigger=args.window - pre_trigger)
+    segments = None
+    if args.segments:
+        if trigger is None:
+            sys.exit("--segments needs a trigger: set --trigger-level")
+        segments = SegmentMemory()
+        segments.arm(args.segments, args.window, trigger.pre_trigger, N_CHANNELS)
+    spectrum = None
+    if args.fft_out:
+        spectrum = SpectrumAnalyzer(segment=args.fft_segment, window=args.fft_window, fs=sample_rate)
+    recorder = None
+    if args.record:
+        recorder = CaptureRecorder()
+        recorder.start(args.record, sample_rate, channels=N_CHANNELS)
+    writer = ReportWriter(args.measure_out, args.format) if args.measure_out else None
+    server = None
+    if args.serve is not None:
+        server = StreamServer(args.serve, sample_rate, max_queue=args.serve_queue,
+                              policy=args.serve_policy, websocket=args.websocket)
+        server.start()
+        print(f"Serving samples on {server.address}", file=sys.stderr)
+
+    if stream_filter is not None or spectrum is not None:
+        # Load the deferred scipy modules now rather than stall on the first chunk
+        import scipy.fft  # noqa: F401
+        import scipy.signal  # noqa: F401
+
+    acquisition.start()
+    scope = HeadlessScope(acquisition.ring, sample_rate, args.window, channel, stream_filter,
+                          trigger, spectrum, recorder, server, segments)
+    t0 = time.perf_counter()
+    next_report = t0 + args.report
+    try:
+        while True:
+            # The status is read first: samples published before the child stopped are still taken
+            stopped = acquisition.status == STATUS_STOPPED
+            values, start = acquisition.ring.read_new()
+            if len(values):
+                scope.process(values.T, start)
+                scope.frame()
+            elif stopped:
+                break
+            now = time.perf_counter()
+            if writer is not None and now >= next_report:
+                writer.write(scope.report(now - t0))
+                next_report += args.report
+            if args.duration is not None and now - t0 >= args.duration:
+                break
+            if args.samples is not None and scope.ring.head >= args.samples:
+                break
+            if segments is not None and segments.full:
+                break
+            if not len(values):
+                time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.perf_counter() - t0
+        print_summary(scope, acquisition, elapsed)
+        if writer is not None:
+            writer.write(scope.report(elapsed))
+            writer.close()
+        if server is not None:
+            server.stop()
+        # Views into the shared ring must go before the segment is released
+        values = scope.ring = None
+        acquisition.stop()
+        if recorder is not None:
+            path = recorder.stop()
+            print(f"Saved {recorder.samples_written} samples to {path}", file=sys.stderr)
+        if spectrum is not None:
+            write_spectrum(args.fft_out, spectrum)
+        if segments is not None:
+            write_segments(args.segments_out, segments, sample_rate)
+
+
+if __name__ == "__main__":
+    main()
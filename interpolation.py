@@ -0,0 +1,63 @@
+import numpy as np
+
+HALF_WIDTH = 8          # samples each side of an output point that the kernel reads
+MAX_FACTOR = 32
+SEARCH = 4              # samples before the trigger sample searched for the level crossing
+
+
+def upsample_factor(n, columns):
+    """Largest power of two (up to MAX_FACTOR) that keeps n samples within `columns` points; 1 = none"""
+    factor = 1
+    while factor < MAX_FACTOR and 2 * factor * n <= columns:
+        factor *= 2
+    return factor
+
+
+class SincInterpolator:
+    """Band-limited (sin(x)/x) reconstruction of a short window of samples.
+
+    upsample() evaluates the signal at `factor` points per sample interval
+    with a Lanczos-windowed sinc kernel of 2 * half_width taps. The kernel
+    is stored polyphase, one row of taps per output phase, and cached per
+    factor, so a frame costs one (n, taps) x (taps, factor) product per
+    channel: proportional to the samples on screen, not to memory depth.
+    """
+
+    def __init__(self, half_width=HALF_WIDTH):
+        self.half_width = half_width
+        self._taps = {}
+
+    def taps(self, factor):
+        """(factor, 2 * half_width) kernel: row p interpolates at p / factor past a sample"""
+        taps = self._taps.get(factor)
+        if taps is None:
+            k = np.arange(-self.half_width + 1, self.half_width + 1)
+            offset = np.arange(factor)[:, np.newaxis] / factor - k
+            taps = np.sinc(offset) * np.sinc(offset / self.half_width)
+            # Each phase passes DC unchanged
+            taps /= taps.sum(axis=1, keepdims=True)
+            self._taps[factor] = taps
+        return taps
+
+    def upsample(self, padded, factor):
+        """Interpolate a (channels, n + 2 * half_width) block whose first and last
+        half_width samples are context; returns (channels, (n - 1) * factor + 1) points,
+        the first and last on the first and last samples of the window"""
+        half = self.half_width
+        n = padded.shape[-1] - 2 * half
+        windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * half, axis=-1)[..., 1:n + 1, :]
+        values = windows @ self.taps(factor).T
+        return values.reshape(padded.shape[:-1] + (n * factor,))[..., :(n - 1) * factor + 1]
+
+
+def crossing(trace, first, last, level):
+    """Fractional index of the last crossing of `level` (either way) in trace[first:last + 1], or None"""
+    first = max(first, 0)
+    segment = np.asarray(trace[first:last + 1]) - level
+    above = segment >= 0
+    changes = np.flatnonzero(above[1:] != above[:-1])
+    if len(changes) == 0:
+        return None
+    j = changes[-1]
+    a, b = segment[j], segment[j + 1]
+    return first + j + a / (a - b)
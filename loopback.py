@@ -0,0 +1,191 @@
+import time
+
+import numpy as np
+
+from decoder import (ACK_ASCII, ACK_BINARY, ACK_RICE, CMD_ASCII, CMD_BINARY, CMD_RICE, RICE_PAIRS,
+                     encode_frame, encode_rice_frame, raw_from_volts)
+
+IDLE_COUNTS = 20
+
+
+class LoopbackDevice:
+    """Pure-Python stand-in for the STM32 firmware behind a serial port.
+
+    Implements the subset of serial.Serial used by SerialReader (write,
+    read, read_all, in_waiting, timeout, reset_input_buffer, close) and answers the
+    MODE RICE / MODE BIN / MODE ASCII handshake like main.c. In realtime mode the output
+    is paced by the sample rate and limited by the baud rate; otherwise every
+    read_all() returns `chunk_samples` samples immediately, for max-speed
+    benchmarks. Frames or lines can be dropped or corrupted on purpose, and
+    the counters record what was actually sent so loss can be checked.
+    """
+
+    def __init__(self, port='LOOPBACK', baudrate=115200, sample_rate=1000,
+                 signal_freq=50.0, amplitude=2.0, noise=0.01, frame_pairs=32,
+                 corrupt_rate=0.0, drop_rate=0.0, realtime=True,
+                 chunk_samples=1000, legacy=False, seed=None):
+        self.port = port
+        self.baudrate = baudrate
+        self.sample_rate = sample_rate
+        self.signal_freq = signal_freq
+        self.amplitude = amplitude
+        self.noise = noise
+        self.frame_pairs = frame_pairs
+        self.corrupt_rate = corrupt_rate
+        self.drop_rate = drop_rate
+        self.realtime = realtime
+        self.chunk_samples = chunk_samples
+        self.legacy = legacy          # old firmware: ignores the handshake
+        self.rng = np.random.default_rng(seed)
+        self.is_open = True
+        self.binary = False
+        self.rice = False             # binary frames delta + Rice coded, RICE_PAIRS per frame
+        self.timeout = 0.1            # seconds read() waits for `size` bytes, as in serial.Serial
+
+        self.samples_sent = 0
+        self.units_sent = 0           # frames in binary mode, lines in ASCII mode
+        self.units_dropped = 0
+        self.units_corrupted = 0
+
+        self._rx = b''
+        self._tx = bytearray()
+        self._pending_pairs = np.empty((0, 2), dtype=np.uint16)
+        self._sample_index = 0
+        self._seq = 0
+        self._t0 = time.perf_counter()
+        self._t_last = self._t0
+        self._tx_credit = 0.0
+        self._tx_limit = max(baudrate // 10 // 20, 64)   # ~50 ms of UART backlog
+        self._rice_bytes = 4.0        # bytes per sample of the last Rice frames
+
+    @property
+    def in_waiting(self):
+        self._produce()
+        return len(self._tx)
+
+    def write(self, data):
+        """Receive host commands"""
+        self._rx += bytes(data)
+        while b'\n' in self._rx:
+            line, self._rx = self._rx.split(b'\n', 1)
+            command = line + b'\n'
+            if self.legacy:
+                continue
+            if command in (CMD_BINARY, CMD_RICE):
+                self._tx += ACK_BINARY if command == CMD_BINARY else ACK_RICE
+                self.binary = True
+                self.rice = command == CMD_RICE
+                self._pending_pairs = self._pending_pairs[:0]
+            elif command == CMD_ASCII:
+                self._tx += ACK_ASCII
+                self.binary = self.rice = False
+                self._pending_pairs = self._pending_pairs[:0]
+        return len(data)
+
+    def read_all(self):
+        """Return everything the device has transmitted since the last read"""
+        self._produce()
+        if not self.realtime:
+            out = bytes(self._tx)
+            self._tx.clear()
+            return out
+        now = time.perf_counter()
+        self._tx_credit = min(self._tx_credit + (now - self._t_last) * self.baudrate / 10,
+                              self._tx_limit)
+        self._t_last = now
+        n = min(int(self._tx_credit), len(self._tx))
+        self._tx_credit -= n
+        out = bytes(self._tx[:n])
+        del self._tx[:n]
+        return out
+
+    def read(self, size=1):
+        """Up to `size` bytes, waiting at most `timeout` seconds for all of them"""
+        deadline = time.perf_counter() + (self.timeout or 0)
+        data = self.read_all()
+        while len(data) < size and self.is_open and self.realtime:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.001))
+            data += self.read_all()
+        # Bytes handed back were not transmitted yet: return their baud-rate credit too
+        self._tx[0:0] = data[size:]
+        if self.realtime:
+            self._tx_credit += len(data[size:])
+        return data[:size]
+
+    def reset_input_buffer(self):
+        self._tx.clear()
+
+    def close(self):
+        self.is_open = False
+
+    def _signal(self, n):
+        """Raw ADC pairs for the next n samples of a bipolar sine"""
+        t = (self._sample_index + np.arange(n)) / self.sample_rate
+        v = self.amplitude * np.sin(2 * np.pi * self.signal_freq * t)
+        if self.noise:
+            v += self.rng.normal(0, self.noise, n)
+        return raw_from_volts(v, IDLE_COUNTS)
+
+    def _produce(self):
+        """Sample and encode whatever the firmware loop would have by now"""
+        if not self.is_open:
+            return
+        if self.realtime:
+            due = int((time.perf_counter() - self._t0) * self.sample_rate) - self._sample_index
+            # While the UART backlog is full the firmware sits in HAL_UART_Transmit
+            # and those sample instants are simply never converted
+            bytes_per_sample = self._rice_bytes if self.rice else 4 if self.binary else 10
+            room = int(max(self._tx_limit - len(self._tx), 0) // bytes_per_sample)
+            n = min(due, room)
+        else:
+            due = n = self.chunk_samples
+        if due <= 0:
+            return
+        pairs = self._signal(n)
+        self._sample_index += due
+        if self.binary:
+            self._encode_frames(pairs)
+        else:
+            self._encode_lines(pairs)
+
+    def _encode_lines(self, pairs):
+        for raw1, raw2 in pairs.tolist():
+            self.units_sent += 1
+            if self.drop_rate and self.rng.random() < self.drop_rate:
+                self.units_dropped += 1
+                continue
+            line = b'%d#%d\n' % (raw1, raw2)
+            if self.corrupt_rate and self.rng.random() < self.corrupt_rate:
+                self.units_corrupted += 1
+                self._tx += b'x' + line[1:]
+                continue
+            self._tx += line
+            self.samples_sent += 1
+
+    def _encode_frames(self, pairs):
+        pairs = np.concatenate((self._pending_pairs, pairs))
+        frame_pairs = RICE_PAIRS if self.rice else self.frame_pairs
+        encode = encode_rice_frame if self.rice else encode_frame
+        n_frames = len(pairs) // frame_pairs
+        self._pending_pairs = pairs[n_frames * frame_pairs:]
+        for i in range(n_frames):
+            block = pairs[i * frame_pairs:(i + 1) * frame_pairs]
+            frame = encode(self._seq, block[:, 0], block[:, 1])
+            if self.rice:
+                self._rice_bytes = len(frame) / len(block)
+            self._seq = (self._seq + 1) & 0xFFFF
+            self.units_sent += 1
+            if self.drop_rate and self.rng.random() < self.drop_rate:
+                self.units_dropped += 1
+                continue
+            if self.corrupt_rate and self.rng.random() < self.corrupt_rate:
+                self.units_corrupted += 1
+                frame = bytearray(frame)
+                frame[int(self.rng.integers(2, len(frame)))] ^= 0x10
+                self._tx += frame
+                continue
+            self._tx += frame
+            self.samples_sent += len(block)
@@ -32,7 +32,26 @@
 
 /* Private define ------------------------------------------------------------*/
 /* USER CODE BEGIN PD */
-
+/* Binary frame: sync, seq, count, count x (value1, value2), CRC-16/CCITT.
+   Every field is a little-endian uint16; the CRC covers seq through payload. */
+#define FRAME_SYNC        0xA55Au
+#define FRAME_PAIRS       32u
+#define FRAME_HEADER_LEN  6u
+#define FRAME_LEN         (FRAME_HEADER_LEN + 4u * FRAME_PAIRS + 2u)
+/* Rice frame: sync, seq, count, payload bytes, k1, k2 (uint8), first value1, value2,
+   payload, CRC-16/CCITT over seq through payload. The payload holds, MSB first: the k1
+   low bits of every channel 1 delta, the k2 low bits of every channel 2 delta, the
+   quotients in unary (q ones, then a zero; channel 1 then channel 2), and a 13-bit raw
+   field for each quotient that reached RICE_ESCAPE. Deltas are zig-zag mapped. */
+#define RICE_SYNC         0xC35Au
+#define RICE_PAIRS        64u
+#define RICE_HEADER_LEN   14u
+#define RICE_MAX_K        12u
+#define RICE_ESCAPE       16u
+#define RICE_RAW_BITS     13u
+#define RICE_MAX_BYTES    ((2u * (RICE_PAIRS - 1u) * (RICE_MAX_K + RICE_ESCAPE + 1u + RICE_RAW_BITS) + 7u) / 8u)
+#define RICE_FRAME_LEN    (RICE_HEADER_LEN + RICE_MAX_BYTES + 2u)
+#define CMD_LEN           16u
 /* USER CODE END PD */
 
 /* Private macro -------------------------------------------------------------*/
@@ -52,6 +71,17 @@ uint16_t value2=0;
 uint16_t rawValues[2];
 
 char msg[20];
+
+uint8_t binaryMode = 0;
+uint16_t frameSeq = 0;
+uint16_t framePairs = 0;
+uint8_t frame[FRAME_LEN];
+uint8_t riceMode = 0;
+uint16_t ricePairs[RICE_PAIRS][2];
+uint8_t riceFrame[RICE_FRAME_LEN];
+uint16_t riceBit = 0;
+char cmd[CMD_LEN];
+uint8_t cmdLen = 0;
 /* USER CODE END PV */
 
 /* Private function prototypes -----------------------------------------------*/
@@ -60,7 +90,10 @@ static void MX_GPIO_Init(void);
 static void MX_ADC1_Init(void);
 static void MX_USART2_UART_Init(void);
 /* USER CODE BEGIN PFP */
-
+static uint16_t Crc16_Ccitt(const uint8_t *data, uint16_t len);
+static void Poll_Command(void);
+static void Send_Sample(uint16_t v1, uint16_t v2);
+static void Send_Rice_Frame(void);
 /* USER CODE END PFP */
 
 /* Private user code ---------------------------------------------------------*/
@@ -131,8 +164,8 @@ int main(void)
 
 
 
-	  sprintf(msg,"%hu#%hu\n",value1,value2);
-	  HAL_UART_Transmit(&huart2,(uint8_t *) msg ,strlen(msg),HAL_MAX_DELAY);
+	  Send_Sample(value1, value2);
+	  Poll_Command();
 	  HAL_Delay(0.01);
 
 
@@ -333,7 +366,227 @@ static void MX_GPIO_Init(void)
 }
 
 /* USER CODE BEGIN 4 */
+/**
+  * @brief  CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), same as Python's binascii.crc_hqx
+  * @retval CRC of the buffer
+  */
+static uint16_t Crc16_Ccitt(const uint8_t *data, uint16_t len)
+{
+  uint16_t crc = 0xFFFF;
+  for (uint16_t i = 0; i < len; i++)
+  {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t b = 0; b < 8; b++)
+    {
+      crc = (crc & 0x8000) ? (uint16_t)((crc << 1) ^ 0x1021) : (uint16_t)(crc << 1);
+    }
+  }
+  return crc;
+}
+
+/**
+  * @brief  Send one sample pair, as ASCII text or packed into the current binary frame
+  * @retval None
+  */
+static void Send_Sample(uint16_t v1, uint16_t v2)
+{
+  if (!binaryMode)
+  {
+    sprintf(msg,"%hu#%hu\n",v1,v2);
+    HAL_UART_Transmit(&huart2,(uint8_t *) msg ,strlen(msg),HAL_MAX_DELAY);
+    return;
+  }
+
+  if (riceMode)
+  {
+    ricePairs[framePairs][0] = v1;
+    ricePairs[framePairs][1] = v2;
+    if (++framePairs == RICE_PAIRS)
+    {
+      Send_Rice_Frame();
+    }
+    return;
+  }
+
+  uint8_t *p = &frame[FRAME_HEADER_LEN + 4u * framePairs];
+  p[0] = (uint8_t)(v1 & 0xFF);
+  p[1] = (uint8_t)(v1 >> 8);
+  p[2] = (uint8_t)(v2 & 0xFF);
+  p[3] = (uint8_t)(v2 >> 8);
+  if (++framePairs < FRAME_PAIRS)
+  {
+    return;
+  }
+
+  frame[0] = (uint8_t)(FRAME_SYNC & 0xFF);
+  frame[1] = (uint8_t)(FRAME_SYNC >> 8);
+  frame[2] = (uint8_t)(frameSeq & 0xFF);
+  frame[3] = (uint8_t)(frameSeq >> 8);
+  frame[4] = (uint8_t)(framePairs & 0xFF);
+  frame[5] = (uint8_t)(framePairs >> 8);
+  uint16_t crc = Crc16_Ccitt(&frame[2], FRAME_LEN - 4u);
+  frame[FRAME_LEN - 2u] = (uint8_t)(crc & 0xFF);
+  frame[FRAME_LEN - 1u] = (uint8_t)(crc >> 8);
+  HAL_UART_Transmit(&huart2, frame, FRAME_LEN, HAL_MAX_DELAY);
+  frameSeq++;
+  framePairs = 0;
+}
+
+/**
+  * @brief  Append the low n bits of value to the Rice payload, most significant first
+  * @retval None
+  */
+static void Put_Bits(uint32_t value, uint8_t n)
+{
+  while (n-- > 0u)
+  {
+    uint8_t *byte = &riceFrame[RICE_HEADER_LEN + (riceBit >> 3)];
+    if ((riceBit & 7u) == 0u)
+    {
+      *byte = 0u;
+    }
+    if ((value >> n) & 1u)
+    {
+      *byte |= (uint8_t)(0x80u >> (riceBit & 7u));
+    }
+    riceBit++;
+  }
+}
+
+/**
+  * @brief  Zig-zag mapped difference of two samples: 0, -1, 1, -2... -> 0, 1, 2, 3...
+  * @retval Mapped delta
+  */
+static uint16_t Rice_Delta(uint8_t c, uint16_t i)
+{
+  int32_t d = (int32_t)ricePairs[i][c] - (int32_t)ricePairs[i - 1u][c];
+  return (uint16_t)((d >= 0) ? 2 * d : -2 * d - 1);
+}
+
+/**
+  * @brief  Delta + Rice code the buffered pairs into one frame and send it
+  * @retval None
+  */
+static void Send_Rice_Frame(void)
+{
+  uint8_t k[2];
+  uint16_t m = framePairs - 1u;
+
+  /* Per channel, the largest k with m * 2^k <= sum of the mapped deltas */
+  for (uint8_t c = 0; c < 2u; c++)
+  {
+    uint32_t total = 0;
+    for (uint16_t i = 1; i < framePairs; i++)
+    {
+      total += Rice_Delta(c, i);
+    }
+    k[c] = 0;
+    while (k[c] < RICE_MAX_K && ((uint32_t)m << (k[c] + 1u)) <= total)
+    {
+      k[c]++;
+    }
+  }
 
+  riceBit = 0;
+  for (uint8_t c = 0; c < 2u; c++)
+  {
+    for (uint16_t i = 1; i < framePairs; i++)
+    {
+      Put_Bits(Rice_Delta(c, i), k[c]);
+    }
+  }
+  for (uint8_t c = 0; c < 2u; c++)
+  {
+    for (uint16_t i = 1; i < framePairs; i++)
+    {
+      uint16_t q = Rice_Delta(c, i) >> k[c];
+      if (q > RICE_ESCAPE)
+      {
+        q = RICE_ESCAPE;
+      }
+      Put_Bits(((1u << q) - 1u) << 1, (uint8_t)(q + 1u));
+    }
+  }
+  for (uint8_t c = 0; c < 2u; c++)
+  {
+    for (uint16_t i = 1; i < framePairs; i++)
+    {
+      uint16_t u = Rice_Delta(c, i);
+      if ((uint16_t)(u >> k[c]) >= RICE_ESCAPE)
+      {
+        Put_Bits(u, RICE_RAW_BITS);
+      }
+    }
+  }
+
+  uint16_t size = (uint16_t)((riceBit + 7u) >> 3);
+  uint16_t len = RICE_HEADER_LEN + size;
+  riceFrame[0] = (uint8_t)(RICE_SYNC & 0xFF);
+  riceFrame[1] = (uint8_t)(RICE_SYNC >> 8);
+  riceFrame[2] = (uint8_t)(frameSeq & 0xFF);
+  riceFrame[3] = (uint8_t)(frameSeq >> 8);
+  riceFrame[4] = (uint8_t)(framePairs & 0xFF);
+  riceFrame[5] = (uint8_t)(framePairs >> 8);
+  riceFrame[6] = (uint8_t)(size & 0xFF);
+  riceFrame[7] = (uint8_t)(size >> 8);
+  riceFrame[8] = k[0];
+  riceFrame[9] = k[1];
+  riceFrame[10] = (uint8_t)(ricePairs[0][0] & 0xFF);
+  riceFrame[11] = (uint8_t)(ricePairs[0][0] >> 8);
+  riceFrame[12] = (uint8_t)(ricePairs[0][1] & 0xFF);
+  riceFrame[13] = (uint8_t)(ricePairs[0][1] >> 8);
+  uint16_t crc = Crc16_Ccitt(&riceFrame[2], len - 2u);
+  riceFrame[len] = (uint8_t)(crc & 0xFF);
+  riceFrame[len + 1u] = (uint8_t)(crc >> 8);
+  HAL_UART_Transmit(&huart2, riceFrame, len + 2u, HAL_MAX_DELAY);
+  frameSeq++;
+  framePairs = 0;
+}
+
+/**
+  * @brief  Handle "MODE RICE" / "MODE BIN" / "MODE ASCII" handshake commands from the host
+  * @retval None
+  */
+static void Poll_Command(void)
+{
+  uint8_t c;
+
+  __HAL_UART_CLEAR_OREFLAG(&huart2);
+  while (HAL_UART_Receive(&huart2, &c, 1, 0) == HAL_OK)
+  {
+    if (c != '\n')
+    {
+      if (cmdLen < CMD_LEN - 1u)
+      {
+        cmd[cmdLen++] = (char)c;
+      }
+      continue;
+    }
+    cmd[cmdLen] = '\0';
+    cmdLen = 0;
+
+    if (strcmp(cmd, "MODE BIN") == 0)
+    {
+      HAL_UART_Transmit(&huart2, (uint8_t *)"ACK BIN\n", 8, HAL_MAX_DELAY);
+      binaryMode = 1;
+      riceMode = 0;
+      framePairs = 0;
+    }
+    else if (strcmp(cmd, "MODE RICE") == 0)
+    {
+      HAL_UART_Transmit(&huart2, (uint8_t *)"ACK RICE\n", 9, HAL_MAX_DELAY);
+      binaryMode = 1;
+      riceMode = 1;
+      framePairs = 0;
+    }
+    else if (strcmp(cmd, "MODE ASCII") == 0)
+    {
+      HAL_UART_Transmit(&huart2, (uint8_t *)"ACK ASCII\n", 10, HAL_MAX_DELAY);
+      binaryMode = 0;
+      riceMode = 0;
+    }
+  }
+}
 /* USER CODE END 4 */
 
 /**
@@ -1,18 +1,42 @@
 import sys
+import os
 import numpy as np
 import serial
 import time
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel, QPushButton,
                              QVBoxLayout, QHBoxLayout, QGroupBox, QDial, QComboBox,
                              QSlider, QRadioButton, QButtonGroup, QFrame, QSizePolicy, 
-                             QCheckBox, QDoubleSpinBox,QSplitter,QGridLayout,QMessageBox)
+                             QCheckBox, QDoubleSpinBox,QSplitter,QGridLayout,QMessageBox,
+                             QFileDialog, QSpinBox)
 from PyQt5.QtCore import Qt, QTimer, QSize,pyqtSignal,QObject
 from PyQt5.QtGui import QPainter, QFontMetrics, QFont, QColor, QPalette, QIcon
 import pyqtgraph as pg
-from scipy.fft import fft, fftfreq
-from scipy.signal import find_peaks
 import threading
 from collections import deque
+from decoder import AsciiFrameDecoder, BinaryFrameDecoder, RiceFrameDecoder, negotiate_protocol
+from ring_buffer import RingBuffer
+from trigger import TRIGGER_TYPES, TriggerEngine
+from filters import FILTER_TYPES, StreamingFilter
+from acquisition import AcquisitionProcess
+from decimation import MinMaxDecimator
+from spectrum import SEGMENT_SIZES, WINDOW_TYPES, SpectrumAnalyzer
+from recorder import CAPTURE_EXT, CaptureRecorder
+from capture_view import CaptureView
+from sources import ReplaySource, test_signal
+from channels import (CHANNEL_NAMES, N_CHANNELS, PROBE_GAINS, ChannelSettings, ChannelView,
+                      as_block)
+from serial_link import DEFAULT_LATENCY, LATENCY_TARGETS, LinkReader, format_link
+from stream_server import StreamServer, parse_address
+from segments import ENVELOPE, SEGMENT, SEGMENT_COUNTS, SEGMENT_MODES, SegmentGatherer, SegmentMemory
+from persistence import DEFAULT_PERSISTENCE, PERSISTENCE_TIMES, PersistenceMap
+from interpolation import SEARCH, SincInterpolator, crossing, upsample_factor
+from handoff import DROP_OLDEST, HANDOFF_POLICIES, BlockQueue, format_handoff
+from sample_clock import CLOCK_MODES, MEASURED, RATE_TOLERANCE, RESAMPLE, SampleClock, UniformResampler
+from frame_scheduler import ALL, DATA, DEFAULT_FPS, SETTINGS, TARGET_FPS, VIEW, FrameScheduler
+from profiler import (DECODE, DRAW, FFT, FILTER, FRAME, INSERT, LINK, MEASURE, PAINT, PERSIST,
+                      READ, TRIGGER, Profiler)
+from measurements import (LEVEL_MEASUREMENTS, MEAN, MEASUREMENTS, UNITS, VOLTAGE_MEASUREMENTS, VPP,
+                          MeasurementEngine, format_si)
 # Custom color palettes with professional colors
 DARK_PALETTE = {
     'background': QColor(45, 45, 48),
@@ -32,6 +56,7 @@ DARK_PALETTE = {
     'cursor1': QColor(0, 200, 83),
     'cursor2': QColor(255, 82, 82),
     'signal': QColor(253, 234, 4  ),        # Yellow signal color
+    'signal2': QColor(0, 230, 118),         # Green for CH2
     'fft': QColor(0, 105, 217)            # Blue for FFT
 }
 
@@ -53,8 +78,11 @@ LIGHT_PALETTE = {
     'cursor1': QColor(25, 130, 60),       # Dark green cursor
     'cursor2': QColor(180, 40, 40),       # Dark red cursor
     'signal': QColor(217, 83, 25),        # Orange signal color
+    'signal2': QColor(25, 130, 60),       # Dark green for CH2
     'fft': QColor(0, 105, 217)            # Blue for FFT
 }
+# Palette entry of each channel's trace
+CHANNEL_COLORS = ['signal', 'signal2']
 class LabeledDial(QDial):
     def __init__(self, labels=None, parent=None):
         super().__init__(parent)
@@ -90,6 +118,20 @@ class LabeledDial(QDial):
             painter.drawText(int(x - text_width/2), int(y + text_height/2), label)
 
 
+class TimedPlotWidget(pg.PlotWidget):
+    """PlotWidget that reports how long each repaint took to `painted`"""
+
+    def __init__(self, painted=None, **kwargs):
+        super().__init__(**kwargs)
+        self.painted = painted
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        super().paintEvent(event)
+        if self.painted is not None:
+            self.painted(time.perf_counter() - start)
+
+
 import serial
 import threading
 import time
@@ -97,32 +139,56 @@ import numpy as np
 from PyQt5.QtCore import QObject, pyqtSignal
 
 class SerialReader(QObject):
-    data_ready = pyqtSignal(list)
+    data_ready = pyqtSignal()  # (channels, n) blocks of voltages are waiting in `queue`
     
-    def __init__(self, scope, port='COM3', baudrate=115200, buffer_size=10000):
+    def __init__(self, scope, port='COM3', baudrate=115200, buffer_size=10000, protocol='auto',
+                 source=None, latency=DEFAULT_LATENCY, profiler=None, resample=False,
+                 handoff=DROP_OLDEST, sample_rate=None):
         super().__init__()
-        self.port = port
+        self.port = port  # a port name, or an already open port-like object (LoopbackDevice)
+        self.source = source  # a SampleSource (synthetic or replay) used instead of the port
         self.baudrate = baudrate
+        self.protocol = protocol  # 'auto' (Rice, else binary if the firmware acknowledges), 'rice', 'binary' or 'ascii'
         self.buffer_size = buffer_size
+        self.latency = latency  # seconds a read waits for its chunk before returning what came
         self.running = False
         self.serial_port = None
+        self.link = None
+        self.profiler = profiler or Profiler(enabled=False)  # times the read and decode stages
         self.lock = threading.Lock()
         self.test_mode = False
         self.scope = scope
-        self.last_valid_value = None  # Use 0.0 or another default starting value
+        self.decoder = AsciiFrameDecoder()
+        # Nominal rate: the scope's unless given (a reader without a scope needs it)
+        self.sample_rate = sample_rate or scope.SAMPLE_RATE
+        # Arrival stamps of the port's blocks, and the rate they add up to
+        self.clock = SampleClock(self.sample_rate)
+        self.resampler = UniformResampler(self.sample_rate) if resample else None
+        self._missing = 0
+        # Bounded hand-off to the GUI; one signal however many blocks wait
+        self.queue = BlockQueue(policy=handoff)
 
     def run(self):
         self.running = True
-        try:
-            self.serial_port = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                timeout=0.1
-            )
-            print(f"Connected to {self.serial_port.port} at {self.serial_port.baudrate} baud")
-        except Exception as e:
-            print(f"Serial connection failed: {e}, entering test mode")
+        if self.source is not None:
             self.test_mode = True
+        else:
+            try:
+                if isinstance(self.port, str):
+                    self.serial_port = serial.Serial(
+                        port=self.port,
+                        baudrate=self.baudrate,
+                        timeout=0.1
+                    )
+                else:
+                    self.serial_port = self.port
+                self.decoder = negotiate_protocol(self.serial_port, self.protocol)
+                mode = ('Rice' if isinstance(self.decoder, RiceFrameDecoder) else
+                        'binary' if isinstance(self.decoder, BinaryFrameDecoder) else 'ASCII')
+                print(f"Connected to {self.serial_port.port} at {self.serial_port.baudrate} baud ({mode} frames)")
+            except Exception as e:
+                print(f"Serial connection failed: {e}, entering test mode")
+                self.test_mode = True
         
         if self.test_mode:
             self._run_test_mode()
@@ -130,98 +196,96 @@ class SerialReader(QObject):
             self._run_serial_mode()
 
     def _run_test_mode(self):
-        test_freq = 100  # Hz
-        test_amp = 5
-        t = np.linspace(0, self.scope.DIVISIONS_X * self.scope.time_per_div, 
-                        self.scope.max_points, endpoint=False)
-        test_data = test_amp * np.sign(np.sin(2 * np.pi * test_freq * t))
-
-        while self.running:
-            self.data_ready.emit(test_data.tolist())
-            time.sleep(self.scope.DIVISIONS_X * self.scope.time_per_div)
+        # Without a port: the test signals, paced at the scope's sample rate
+        source = self.source or test_signal(self.sample_rate)
+        source.start()
+        try:
+            while self.running and not source.exhausted:
+                chunk = as_block(source.next_chunk())
+                if chunk.shape[1]:
+                    self.deliver(chunk)
+        finally:
+            source.stop()
 
     def _run_serial_mode(self):
-        last_values = [self.last_valid_value, self.last_valid_value]  # Store last two valid values
-        interval = 0.1 # seconds (adjust to your desired sampling rate)
-        next_time = time.perf_counter() + interval
-
+        # Reads block until a chunk arrives or the latency target passes, no fixed polling
+        self.link = LinkReader(self.serial_port, self.latency)
         while self.running:
             try:
-                now = time.perf_counter()
-                if now < next_time:
-                    time.sleep(next_time - now)  # precise wait
-                next_time += interval  # schedule next read
-
-                raw_data = self.serial_port.read_all().decode('ascii', errors='ignore')
-                
-                if not raw_data or len(raw_data.strip()) < 5:
+                with self.profiler.stage(READ):
+                    raw_data = self.link.read()
+                if not raw_data:
                     continue
+                arrival = time.perf_counter()
+
+                # Whole chunk decoded at once, one row per ADC channel; partial lines wait
+                with self.profiler.stage(DECODE):
+                    values = self.decoder.feed_channels(raw_data)
+                if values.shape[1]:
+                    missing = getattr(self.decoder, 'frames_missing', 0)
+                    self.clock.stamp(values.shape[1], arrival, gap=missing - self._missing)
+                    self._missing = missing
+                    if self.resampler is not None:
+                        values = self.resampler.process(values, self.clock.rate)
+                    self.deliver(values)
+                    latency = self.link.delivered()
+                    if latency is not None:
+                        self.profiler.record(LINK, latency)
 
-                values = []
-                lines = raw_data.strip().split('\n')
-
-                for line in lines:
-                    try:
-                        parts = line.strip().split('#')
-                        if len(parts) < 2 or len(parts[0]) < 2 or len(parts[1]) < 2:
-                            raise ValueError("Incomplete data")
-
-                        raw1 = float(parts[0])
-                        raw2 = float(parts[1])
-
-                        value1 = raw1 * 3.3 / 4095
-                        value2 = raw2 * (-3.3) / 4095
-
-                        if raw1 <= 51:
-                            value1 = 0
-                        if raw2 <= 51:
-                            value2 = 0
-
-                        combined = value1 + value2
-
-                        
-                        threshold = 0.7
+            except Exception as e:
+                if self.running:  # closing the port under a blocked read is how stop() ends it
+                    print(f"Serial error: {e}")
+                break
 
-                        # Initialize on first valid value
-                        if self.last_valid_value is None:
-                            self.last_valid_value = combined
-                            print(self.last_valid_value)
-                            last_values = [combined, combined]
-                        else:
-                            diff1 = abs(combined - last_values[-1])
-                            diff2 = abs(combined - last_values[-2])
+    def deliver(self, values):
+        """Queue a block for the GUI, waking it if the queue was empty"""
+        if self.queue.put(values):
+            self.data_ready.emit()
 
-                            if diff1 < threshold or diff2 < threshold:
-                                self.last_valid_value = combined
-                            else:
-                                combined = self.last_valid_value
+    def set_latency(self, seconds):
+        self.latency = seconds
+        if self.link is not None:
+            self.link.latency = seconds
 
-                            last_values.append(self.last_valid_value)
-                            last_values = last_values[-2:]
+    def counters(self):
+        """Link and sample clock counters of the serial port (empty in test mode)"""
+        if self.link is None:
+            return {}
+        return {**self.link.counters(), **self.clock.counters()}
 
-                        values.append(combined)
 
-                    except Exception:
-                        values.append(self.last_valid_value)
+    def stop(self):
+        self.running = False
+        self.queue.close()
+        if self.serial_port and self.serial_port.is_open:
+            self.serial_port.close()
 
-                if values:
-                    self.data_ready.emit(values)
 
-            except Exception as e:
-                print(f"Serial error: {e}")
-                break
+class PyramidWorker(QObject):
+    """Builds a capture's min/max pyramid off the GUI thread"""
+    progress = pyqtSignal(float)   # fraction done
+    finished = pyqtSignal(bool)    # False if cancelled or failed
 
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+        self.cancelled = threading.Event()
 
+    def run(self):
+        try:
+            ok = self.view.build_pyramid(self.progress.emit, self.cancelled)
+        except OSError as e:
+            print(f"Capture index failed: {e}")
+            ok = False
+        self.finished.emit(ok)
 
     def stop(self):
-        self.running = False
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
-
+        self.cancelled.set()
 
 
 class OscilloscopeUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, acquisition='thread', source=None, profile_path=None, serve_address=None,
+                 websocket=False, clock=MEASURED):
         super().__init__()
         self.setWindowTitle("Digital Oscilloscope")
         self.setGeometry(100, 100, 1200, 800)
@@ -237,15 +301,24 @@ class OscilloscopeUI(QMainWindow):
         self.GRID_MAX_V = 4
         self.GRID_MIN_V = -4
         self.SAMPLE_RATE = 1000  # Samples per second
+        self.POLL_MS = 20          # acquisition process poll period while data flows
+        self.IDLE_POLL_MS = 200    # longest poll period once it stops
         self.MAX_VOLTS_DIV = 5.0
         self.MIN_VOLTS_DIV = 0.1
         self.MAX_TIME_DIV = 2.0
         self.MIN_TIME_DIV = 0.1
         # Initialize trigger state variables
+        self.trigger = TriggerEngine()
         self.trigger_armed = True
         self.last_sample = 0.0
         self.trigger_position = 0
         self.time_offset = 0.0
+        # Segmented acquisition: every trigger into the next row of a preallocated memory
+        self.segments = SegmentMemory()
+        self._segment_key = None
+        # Automatic measurements of the trigger source channel, with running statistics
+        self.measurements = MeasurementEngine(fs=self.SAMPLE_RATE)
+        self._measurement_key = None
         # Initialize critical variables
         self.volts_per_div = 1.0
         self.time_per_div = 0.1
@@ -253,19 +326,71 @@ class OscilloscopeUI(QMainWindow):
         self.x = np.array([])
         self.y = np.array([])
         self.curve = None
+        self.curves = []     # one trace per channel; self.curve is CH1's
+        self.xy_curve = None
+        # Per-channel probe gain, offset and enable flag, synced from the panel
+        self.channels = ChannelSettings()
         self.fft_curve = None
+        self.waterfall_image = None
         self.peak_markers = []
+        # Digital phosphor: every acquisition accumulated per channel, drawn under the traces
+        self.persistence = [PersistenceMap() for _ in range(N_CHANNELS)]
+        self.persistence_gatherer = SegmentGatherer()
+        self.persistence_images = []
+        self._persistence_key = None
+        self._persistence_next = 0
+        self._persistence_time = None
+        # Streams raw samples to disk while "Save Data" is pressed
+        self.recorder = CaptureRecorder()
+        self.capture_dir = 'captures'
+        # Offline viewer: a capture file shown instead of the live trace
+        self.capture_view = None
+        self.pyramid_worker = None
+        self.MIN_VIEW_SAMPLES = 100
+        # Welch-averaged spectrum, updated with the segments completed each tick
+        self.spectrum = SpectrumAnalyzer(fs=self.SAMPLE_RATE)
+        self._spectrum_ring = None
         
         # Serial communication setup
+        # 'thread': SerialReader in this process; 'process': AcquisitionProcess
+        self.acquisition_mode = acquisition
+        self.source = source  # SampleSource replacing the serial port (e.g. --replay)
+        # NOMINAL, MEASURED (follow the port's measured rate) or RESAMPLE (onto SAMPLE_RATE)
+        self.clock_mode = clock
+        self.acquisition = None
+        self.acquisition_timer = None
         self.serial_reader = None
         self.serial_thread = None
         self.serial_port = None
         self.serial_buffer = []
         self.max_points = int(self.DIVISIONS_X * self.time_per_div * self.SAMPLE_RATE)
-        self.data_buffer = np.zeros(self.max_points)
-        self.time_buffer = np.linspace(0, self.DIVISIONS_X * self.time_per_div, self.max_points)
-        self.last_update_time = 0
+        # Sized for the slowest timebase so dial changes never reallocate; one
+        # (N_CHANNELS,) row per sample instant, ring.latest(n).T is a channel block
+        self.ring_buffer = RingBuffer(max(self.max_points,
+                                          int(self.DIVISIONS_X * self.MAX_TIME_DIV * self.SAMPLE_RATE)),
+                                      item_shape=(N_CHANNELS,))
+        self.filtered_buffer = RingBuffer(self.ring_buffer.capacity, item_shape=(N_CHANNELS,))
+        self.stream_filter = StreamingFilter()
+        self.filter_active = False
+        self.time_buffer = None
+        self._time_axis_key = None
+        # Reduces the trace to min/max pairs per plot pixel column before drawing
+        self.decimator = MinMaxDecimator()
+        # Sin(x)/x reconstruction of sparse views, and where the drawn frame's trigger is (sample index)
+        self.interpolator = SincInterpolator()
+        self.display_trigger = None
+        self.display_data = np.empty((N_CHANNELS, 0))
+        self.display_start = 0
+        self.update_time_axis()
         self.samples_since_last_update = 0
+        # Frames are drawn when something changed, coalesced and paced to the frame cost
+        self.scheduler = FrameScheduler()
+        # scipy stays out of startup but is loaded in the background once the first frame is up
+        self.scipy_preloaded = False
+        # Stage latency histograms from serial read to paint; dumped every PROFILE_DUMP_S
+        self.profiler = Profiler()
+        self.profile_path = profile_path
+        self.PROFILE_DUMP_S = 10
 
         # Main UI Setup
         self.central_widget = QWidget()
@@ -288,16 +413,46 @@ class OscilloscopeUI(QMainWindow):
         self.setup_theme()
         # Connect signals
         self.fft_btn.clicked.connect(self.toggle_fft)
+        self.save_btn.toggled.connect(self.toggle_recording)
+        self.open_btn.clicked.connect(self.toggle_capture_view)
         self.autoscale_btn.clicked.connect(self.autoscale)
         self.theme_btn.clicked.connect(self.toggle_theme)
+        self.watch_controls()
         
-        # Start update timer
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_waveform)
-        self.timer.start(100)  
+        # One-shot frame timer, started by request_frame() when something is dirty
+        self.frame_timer = QTimer()
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.timeout.connect(self.render_frame)
+        self.request_frame(ALL)
         
         # Initialize serial connection
         self.init_serial()
+
+        # Optional fan-out of the live samples to local subscribers (logging, analysis daemons)
+        self.stream_server = None
+        if serve_address is not None:
+            self.stream_server = StreamServer(serve_address, self.SAMPLE_RATE, websocket=websocket)
+            try:
+                self.stream_server.start()
+            except OSError as e:
+                print(f"Stream server error: {e}")
+                self.stream_server = None
+
+        # Serial link and frame statistics, refreshed once a second
+        self.link_label = QLabel()
+        self.frame_label = QLabel()
+        self.statusBar().addPermanentWidget(self.link_label)
+        self.statusBar().addPermanentWidget(self.frame_label)
+        self.status_timer = QTimer()
+        self.status_timer.timeout.connect(self.update_link_status)
+        self.status_timer.timeout.connect(self.update_frame_status)
+        self.status_timer.timeout.connect(self.update_hud)
+        self.status_timer.start(1000)
+
+        if self.profile_path:
+            self.profile_timer = QTimer()
+            self.profile_timer.timeout.connect(self.dump_profile)
+            self.profile_timer.start(self.PROFILE_DUMP_S * 1000)
   
 
 
@@ -402,11 +557,17 @@ class OscilloscopeUI(QMainWindow):
         self.plot_widget.addItem(self.volts_div_text)
      
         # Update curve colors
-        if hasattr(self, 'curve'):
-            self.curve.setPen(pg.mkPen(self.colors['signal'], width=2))
+        for curve, color in zip(self.curves, CHANNEL_COLORS):
+            curve.setPen(pg.mkPen(self.colors[color], width=2))
+        if self.xy_curve is not None:
+            self.xy_curve.setPen(pg.mkPen(self.colors['signal'], width=1))
         if hasattr(self, 'fft_curve'):
             if self.fft_curve is not None:
                 self.fft_curve.setPen(pg.mkPen(self.colors['fft'], width=1))
+        # Persistence images are made again, in the new channel colours, on the next frame
+        for image in self.persistence_images:
+            self.plot_widget.removeItem(image)
+        self.persistence_images = []
         
         # Update text items
         if hasattr(self, 'timebase_text') and hasattr(self, 'volts_div_text'):
@@ -496,21 +657,25 @@ class OscilloscopeUI(QMainWindow):
         self.setup_theme()
         
         # Update plot display
-        if self.showing_fft:
-            self.show_fft()
-        else:
-            self.update_waveform()
+        self.request_frame(VIEW)
 
     def init_serial(self):
         """Initialize serial connection with error dialog"""
+        if self.acquisition_mode == 'process':
+            self.init_acquisition_process()
+            return
         try:
             # Initialize serial reader thread
-            self.serial_reader = SerialReader(self,port='COM3', baudrate=115200)
+            self.serial_reader = SerialReader(self,port='COM3', baudrate=115200, source=self.source,
+                                              latency=self.latency_combo.currentData(),
+                                              profiler=self.profiler,
+                                              resample=self.clock_mode == RESAMPLE,
+                                              handoff=self.handoff_combo.currentText())
             self.serial_thread = threading.Thread(target=self.serial_reader.run)
             self.serial_thread.daemon = True  # Thread will exit when main program exits
             
             # Connect signals
-            self.serial_reader.data_ready.connect(self.on_serial_data)
+            self.serial_reader.data_ready.connect(self.drain_serial_data)
             
             # Start the serial thread
             self.serial_thread.start()
@@ -528,9 +693,161 @@ class OscilloscopeUI(QMainWindow):
 
 
 
+    def init_acquisition_process(self):
+        """Acquire in a child process and read its shared ring from a poll timer"""
+        # Deep enough to ride out a long UI stall (dialog, resize, FFT) without loss
+        capacity = max(4 * self.ring_buffer.capacity, 10 * self.SAMPLE_RATE)
+        self.acquisition = AcquisitionProcess(port='COM3', baudrate=115200, capacity=capacity,
+                                              sample_rate=self.SAMPLE_RATE, source=self.source,
+                                              latency=self.latency_combo.currentData(),
+                                              resample=self.clock_mode == RESAMPLE)
+        self.acquisition.start()
+        # The display reads straight from shared memory; the filtered copy stays local,
+        # as deep as the shared ring so both streams offer the same window
+        self.ring_buffer = self.acquisition.ring
+        self.filtered_buffer = RingBuffer(self.ring_buffer.capacity, item_shape=(N_CHANNELS,))
+        # Overflow is the shared ring's: the GUI skips what was overwritten (drop oldest)
+        self.handoff_combo.setEnabled(False)
+
+        self.acquisition_timer = QTimer()
+        self.acquisition_timer.timeout.connect(self.poll_acquisition)
+        self.acquisition_timer.start(self.POLL_MS)
+
+    def poll_acquisition(self):
+        """Pick up the samples the acquisition process published since the last poll"""
+        with self.profiler.stage(INSERT):
+            values, start = self.acquisition.ring.read_new()
+        if len(values):
+            self.follow_window_size()
+            self.process_new_samples(values.T, start)
+            self.request_frame(DATA)
+            self.acquisition_timer.setInterval(self.POLL_MS)
+        else:
+            # Nothing published: back off so an idle link costs next to no CPU
+            self.acquisition_timer.setInterval(min(2 * self.acquisition_timer.interval(), self.IDLE_POLL_MS))
+        dropped = self.acquisition.dropped
+        if dropped:
+            self.statusBar().showMessage(f"Dropped samples: {dropped}")
+
+    def update_handoff_policy(self):
+        if self.serial_reader is not None:
+            self.serial_reader.queue.set_policy(self.handoff_combo.currentText())
+
+    def update_link_latency(self):
+        """Apply the latency target to whichever reader owns the port"""
+        seconds = self.latency_combo.currentData()
+        if self.acquisition is not None:
+            self.acquisition.set_latency(seconds)
+        elif self.serial_reader is not None:
+            self.serial_reader.set_latency(seconds)
+
+    def update_link_status(self):
+        reader = self.acquisition if self.acquisition is not None else self.serial_reader
+        counters = reader.counters() if reader is not None else {}
+        # Nothing to show in test mode, where no port is read
+        parts = [format_link(counters)] if counters.get('reads') else []
+        # What was given up between acquisition and display to stay live
+        if self.acquisition is not None:
+            parts.append(f"{self.acquisition.dropped} samples dropped")
+        elif self.serial_reader is not None:
+            parts.append(format_handoff(self.serial_reader.queue.counters()))
+        if counters.get('rate_locked'):
+            parts.append(f"{counters['sample_rate']:.1f} S/s measured")
+            if self.clock_mode == MEASURED:
+                self.set_sample_rate(counters['sample_rate'])
+        if self.stream_server is not None:
+            served = self.stream_server.counters()
+            parts.append(f"{served['subscribers']} subscribers, {served['frames_dropped']} frames dropped")
+        self.link_label.setText("  |  ".join(parts))
+
+    def set_sample_rate(self, rate):
+        """Retune the time axis, filters, FFT and measurements to `rate` samples/s"""
+        if abs(rate / self.SAMPLE_RATE - 1) < RATE_TOLERANCE:
+            return
+        # Rounded so jitter in the estimate does not rebuild the caches keyed on the rate
+        self.SAMPLE_RATE = round(rate, 1)
+        # Window length and time axis follow in follow_window_size, the filter in update_filter
+        # and the spectrum in show_fft; periods already measured were in the old units
+        self.measurements.fs = self.SAMPLE_RATE
+        self.measurements.reset()
+        if self.stream_server is not None:
+            self.stream_server.sample_rate = self.SAMPLE_RATE
+        self.follow_window_size()
+        self.request_frame(SETTINGS)
+        self.statusBar().showMessage(f"Sample rate set to the measured {self.SAMPLE_RATE:.1f} S/s")
+
+    def update_frame_status(self):
+        stats = self.scheduler.frame_time
+        if stats.count == 0:
+            return
+        self.frame_label.setText(f"{1 / self.scheduler.interval:.0f} fps max, "
+                                 f"frame {stats.mean * 1e3:.1f} ms (max {stats.max * 1e3:.1f} ms), "
+                                 f"paint {self.scheduler.paint_time.mean * 1e3:.1f} ms")
+
+    def watch_controls(self):
+        """Mark the frame dirty whenever a control that affects the display changes"""
+        changed = lambda *args: self.request_frame(SETTINGS)
+        for widget in [self.ch1_volts_div, self.ch1_offset, self.ch2_offset, self.timebase_dial,
+                       self.time_pos, self.trigger_level, self.trigger_holdoff, self.trigger_width,
+                       self.trigger_runt_level, self.filter_param_slider, self.segment_index]:
+            widget.valueChanged.connect(changed)
+        for widget in [self.trigger_mode, self.trigger_source, self.trigger_edge, self.trigger_type,
+                       self.filter_type, self.fft_window, self.fft_segment,
+                       self.segment_mode] + self.channel_probe:
+            widget.currentIndexChanged.connect(changed)
+        for widget in [self.filter_enable, self.waterfall_enable, self.xy_enable, self.sinc_enable,
+                       self.segment_enable, self.persist_enable] + self.channel_enable:
+            widget.toggled.connect(changed)
+
+    def update_hud(self):
+        if self.hud_enable.isChecked():
+            self.hud.setText(self.profiler.format())
+            self.hud.adjustSize()
+
+    def toggle_hud(self, checked):
+        """Show the per-stage latency table over the plot"""
+        self.hud.setVisible(checked)
+        self.update_hud()
+
+    def dump_profile(self):
+        try:
+            self.profiler.dump(self.profile_path)
+        except OSError as e:
+            print(f"Profile dump failed: {e}")
+
+    def on_plot_painted(self, elapsed):
+        self.scheduler.painted(elapsed)
+        self.profiler.record(PAINT, elapsed)
+
+    def request_frame(self, flags):
+        """Mark what changed; a frame is scheduled unless one is already pending"""
+        delay = self.scheduler.mark(flags)
+        if delay is not None:
+            self.frame_timer.start(int(delay * 1000))
+
+    def render_frame(self):
+        flags = self.scheduler.begin()
+        try:
+            with self.profiler.stage(FRAME):
+                self.update_waveform(flags)
+        finally:
+            self.scheduler.end()
+        if not self.scipy_preloaded:
+            self.scipy_preloaded = True
+            threading.Thread(target=self.preload_scipy, daemon=True).start()
+
+    def preload_scipy(self):
+        """Import the deferred scipy modules off the GUI thread, so the first filter or FFT does not stall it"""
+        import scipy.fft  # noqa: F401
+        import scipy.signal  # noqa: F401
+
+    def update_frame_rate(self):
+        self.scheduler.target_fps = self.fps_combo.currentData()
+
     def create_plot_area(self):
         """Create the main oscilloscope display area"""
-        self.plot_widget = pg.PlotWidget()
+        # Repaints happen after the frame returns; their cost counts towards the frame rate
+        self.plot_widget = TimedPlotWidget(painted=self.on_plot_painted)
         self.plot_widget.setMinimumSize(400, 300)
         self.plot_widget.setBackground(self.colors['plot_background'])
         self.plot_widget.setMouseEnabled(x=False, y=False)
@@ -543,12 +860,118 @@ class OscilloscopeUI(QMainWindow):
         
         # Add to layout with some stretch factor
         self.main_layout.addWidget(self.plot_widget, 5)
+        self.plot_widget.getViewBox().sigResized.connect(self.on_plot_resized)
+
+        # Profiler overlay in the plot's top-left corner, off until enabled in Settings
+        self.hud = QLabel(self.plot_widget)
+        self.hud.setFont(QFont('Monospace', 8))
+        self.hud.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: white; padding: 4px;")
+        self.hud.move(60, 10)
+        self.hud.hide()
+
+    def on_plot_resized(self):
+        """Re-decimate the current trace for the new plot width"""
+        if self.decimator.resize(self.plot_widget.getViewBox().width()) and not self.showing_fft:
+            if self.display_data.shape[1] == len(self.time_buffer):
+                self.draw_trace(self.display_data, self.display_start)
+
+    def draw_trace(self, display_data, start, stream=None):
+        """Plot a (channels, n) window of samples whose first one has absolute index `start`"""
+        if self.xy_enable.isChecked():
+            self.draw_xy(display_data)
+            return
+        self.xy_curve.hide()
+        n = display_data.shape[-1]
+        factor = upsample_factor(n, self.decimator.columns) if self.sinc_enable.isChecked() else 1
+        if factor > 1 and n > 1:
+            # Sparse view: reconstruct between the samples, from the visible window only
+            values = self.interpolator.upsample(self.interpolation_block(display_data, start, stream), factor)
+            shift = self.trigger_offset(values, factor) if stream is None else 0.0
+            dt = self.time_buffer[1] - self.time_buffer[0]
+            times = self.time_buffer[0] + (np.arange(values.shape[-1]) / factor - shift) * dt
+        else:
+            if stream is None:
+                stream = (id(self.filtered_buffer if self.filter_active else self.ring_buffer),
+                          self.channels.key())
+            # All channels are reduced in one pass and share the column positions
+            positions, values = self.decimator.decimate(display_data, start, stream)
+            times = self.time_buffer[positions]
+        for curve, trace, enabled in zip(self.curves, values, self.channels.enabled):
+            curve.setVisible(bool(enabled))
+            if enabled:
+                curve.setData(times, trace)
+
+    def interpolation_block(self, display_data, start, stream):
+        """display_data with the interpolator's context samples each side, from the ring where it still has them"""
+        half = self.interpolator.half_width
+        n = display_data.shape[-1]
+        before = after = display_data[:, :0]
+        if stream is None:
+            ring = self.filtered_buffer if self.filter_active else self.ring_buffer
+            first = max(start - half, ring.head - len(ring))
+            last = min(start + n + half, ring.head)
+            if first <= start and last >= start + n:
+                context = ring.latest(ring.head - first)[:last - first].T
+                before = self.channels.apply(context[:, :start - first])
+                after = self.channels.apply(context[:, start + n - first:])
+        block = np.concatenate((before, display_data, after), axis=-1)
+        # Context the ring cannot supply (the newest samples, or a segment) repeats the end samples
+        return np.pad(block, ((0, 0), (half - before.shape[-1], half - after.shape[-1])), mode='edge')
+
+    def trigger_offset(self, values, factor):
+        """Samples from the trigger sample back to where the interpolated trace crosses the level"""
+        if self.display_trigger is None:
+            return 0.0
+        # The trigger fires on the first sample past the hysteresis band, at or after the level crossing
+        i = self.display_trigger * factor
+        position = crossing(values[self.trigger_source.currentIndex()], i - SEARCH * factor, i,
+                            self.trigger_level.value())
+        return 0.0 if position is None else position / factor - self.display_trigger
+
+    def draw_envelope(self, low, high, stream):
+        """Plot the band between two (channels, n) traces, min/max per column like a peak-detect trace"""
+        self.xy_curve.hide()
+        channels = len(low)
+        positions, values = self.decimator.decimate(np.concatenate((low, high)), 0, stream)
+        if len(positions) == low.shape[-1]:
+            # Few enough samples to pass through: zig-zag between min and max of every sample
+            positions = np.repeat(positions, 2)
+            values = np.stack((values[:channels], values[channels:]), axis=-1).reshape(channels, -1)
+        else:
+            # Columns alternate min, max: take the mins of `low` and the maxes of `high`
+            values = np.concatenate((values[:channels, 0::2, None], values[channels:, 1::2, None]),
+                                    axis=-1).reshape(channels, -1)
+        times = self.time_buffer[positions]
+        for curve, trace, enabled in zip(self.curves, values, self.channels.enabled):
+            curve.setVisible(bool(enabled))
+            if enabled:
+                curve.setData(times, trace)
+
+    def draw_xy(self, display_data):
+        """Plot CH2 against CH1 (Lissajous) from the same window of samples"""
+        self.show_traces(False)
+        # XY has no time axis to decimate along; thin to a few points per pixel column
+        step = max(display_data.shape[1] // (4 * self.decimator.columns), 1)
+        self.xy_curve.setData(display_data[0, ::step], display_data[1, ::step])
+        self.xy_curve.show()
+
+    def show_traces(self, visible):
+        """Show the enabled channels' traces, or hide every trace"""
+        for curve, enabled in zip(self.curves, self.channels.enabled):
+            curve.setVisible(visible and bool(enabled))
+        if not visible and self.xy_curve is not None:
+            self.xy_curve.hide()
 
     def setup_plot_curve(self):
-        """Initialize or reset the plot curve"""
-        if self.curve is not None:
-            self.plot_widget.removeItem(self.curve)
-        self.curve = self.plot_widget.plot([], [], pen=pg.mkPen(self.colors['signal'], width=2))
+        """Initialize or reset the plot curves"""
+        for curve in self.curves + [self.xy_curve]:
+            if curve is not None:
+                self.plot_widget.removeItem(curve)
+        self.curves = [self.plot_widget.plot([], [], pen=pg.mkPen(self.colors[color], width=2))
+                       for color in CHANNEL_COLORS]
+        self.curve = self.curves[0]
+        self.xy_curve = self.plot_widget.plot([], [], pen=pg.mkPen(self.colors['signal'], width=1))
+        self.xy_curve.hide()
         
         # Initialize text items for sensitivity display
         self.timebase_text = pg.TextItem(text="", 
@@ -628,6 +1051,31 @@ class OscilloscopeUI(QMainWindow):
         self.ch1_offset.valueChanged.connect(self.update_axes)
         vert_layout.addWidget(self.ch1_offset)
 
+        ch2_offset_label = QLabel("CH2 Offset (V)")
+        ch2_offset_label.setAlignment(Qt.AlignCenter)
+        vert_layout.addWidget(ch2_offset_label)
+
+        self.ch2_offset = QDoubleSpinBox()
+        self.ch2_offset.setRange(-10, 10)
+        self.ch2_offset.setSingleStep(0.1)
+        self.ch2_offset.setValue(0)
+        vert_layout.addWidget(self.ch2_offset)
+
+        # Channel enable and probe attenuation; Volts/Div is shared by the channels
+        channel_layout = QGridLayout()
+        self.channel_enable = []
+        self.channel_probe = []
+        for row, name in enumerate(CHANNEL_NAMES):
+            enable = QCheckBox(name)
+            enable.setChecked(True)
+            probe = QComboBox()
+            probe.addItems(list(PROBE_GAINS))
+            channel_layout.addWidget(enable, row, 0)
+            channel_layout.addWidget(probe, row, 1)
+            self.channel_enable.append(enable)
+            self.channel_probe.append(probe)
+        vert_layout.addLayout(channel_layout)
+
         # Horizontal controls
         horiz_group = QGroupBox("HORIZONTAL")
         horiz_layout = QVBoxLayout(horiz_group)
@@ -668,6 +1116,13 @@ class OscilloscopeUI(QMainWindow):
         trigger_layout.addWidget(QLabel("Mode:"))
         trigger_layout.addWidget(self.trigger_mode)
 
+        # Trigger source; the spectrum and measurements follow the same channel
+        self.trigger_source = QComboBox()
+        self.trigger_source.addItems(CHANNEL_NAMES)
+        self.trigger_source.currentIndexChanged.connect(lambda index: self.trigger.reset())
+        trigger_layout.addWidget(QLabel("Source:"))
+        trigger_layout.addWidget(self.trigger_source)
+
         # Trigger edge
         self.trigger_edge = QComboBox()
         self.trigger_edge.addItems(["Rising", "Falling"])
@@ -681,6 +1136,34 @@ class OscilloscopeUI(QMainWindow):
         trigger_layout.addWidget(QLabel("Level (V):"))
         trigger_layout.addWidget(self.trigger_level)
 
+        # Trigger type and its qualifiers
+        self.trigger_type = QComboBox()
+        self.trigger_type.addItems(TRIGGER_TYPES)
+        trigger_layout.addWidget(QLabel("Type:"))
+        trigger_layout.addWidget(self.trigger_type)
+
+        self.trigger_holdoff = QDoubleSpinBox()
+        self.trigger_holdoff.setRange(0, 10000)
+        self.trigger_holdoff.setSingleStep(10)
+        trigger_layout.addWidget(QLabel("Holdoff (ms):"))
+        trigger_layout.addWidget(self.trigger_holdoff)
+
+        # Pulse Width fires on pulses narrower than this
+        self.trigger_width = QDoubleSpinBox()
+        self.trigger_width.setRange(0, 10000)
+        self.trigger_width.setSingleStep(1)
+        self.trigger_width.setValue(10)
+        trigger_layout.addWidget(QLabel("Width < (ms):"))
+        trigger_layout.addWidget(self.trigger_width)
+
+        # Runt fires on pulses crossing Level that never reach this level
+        self.trigger_runt_level = QDoubleSpinBox()
+        self.trigger_runt_level.setRange(-10, 10)
+        self.trigger_runt_level.setSingleStep(0.1)
+        self.trigger_runt_level.setValue(1.0)
+        trigger_layout.addWidget(QLabel("Runt level (V):"))
+        trigger_layout.addWidget(self.trigger_runt_level)
+
         # Run/Stop button
         self.run_stop_btn = QPushButton("RUN")
         self.run_stop_btn.setCheckable(True)
@@ -694,20 +1177,54 @@ class OscilloscopeUI(QMainWindow):
         control_layout.addWidget(trigger_group, 1)
         
         self.main_layout.addWidget(control_panel)
-    def apply_lowpass_filter(self, data, cutoff_freq=50, fs=1000, order=5):
-        """Apply a low-pass Butterworth filter to remove high-frequency noise"""
-        from scipy.signal import butter, lfilter
-        
-        nyq = 0.5 * fs
-        normal_cutoff = cutoff_freq / nyq
-        b, a = butter(order, normal_cutoff, btype='low', analog=False)
-        filtered_data = lfilter(b, a, data)
-        return filtered_data
-
-    def apply_moving_average(self, data, window_size=5):
-        """Apply simple moving average filter"""
-        window = np.ones(window_size) / window_size
-        return np.convolve(data, window, mode='same')
+    def update_filter(self):
+        """Sync the streaming filter with the panel, refiltering stored samples on changes"""
+        enabled = self.filter_enable.isChecked()
+        changed = self.stream_filter.configure(self.filter_type.currentText(),
+                                               self.filter_param_slider.value(),
+                                               self.SAMPLE_RATE)
+        if enabled and (changed or not self.filter_active):
+            # Filter what is already stored once; new chunks are filtered on arrival
+            self.stream_filter.reset()
+            n = len(self.ring_buffer)
+            self.filtered_buffer.clear(self.ring_buffer.head - n)
+            self.filtered_buffer.write(self.stream_filter.process(self.ring_buffer.latest(n).T).T)
+            self.decimator.reset()
+            self.spectrum.reset()
+        self.filter_active = enabled
+
+    def update_measurement_source(self):
+        """Restart the automatic measurements when the measured stream changes"""
+        key = (self.trigger_source.currentIndex(), self.filter_active)
+        if key != self._measurement_key:
+            self._measurement_key = key
+            self.measurements.reset()
+
+    def update_auto_measurements(self):
+        """Show the latest value and the running statistics of every measurement"""
+        channel = self.trigger_source.currentIndex()
+        gain = self.channels.gain[channel]
+        for name in MEASUREMENTS:
+            stats = self.measurements.stats[name]
+            # The engine works in acquired volts; voltages are shown through the probe,
+            # and levels through the channel offset as well (the spread is not shifted)
+            scale = gain if name in VOLTAGE_MEASUREMENTS else 1.0
+            shift = self.channels.offset[channel] if name in LEVEL_MEASUREMENTS else 0.0
+            values = (stats.last * scale + shift, stats.mean * scale + shift, stats.std * scale,
+                      stats.min * scale + shift, stats.max * scale + shift)
+            if stats.count == 0:
+                values = (None,) * len(values)
+            for label, value in zip(self.auto_labels[name], values):
+                label.setText(format_si(value, UNITS[name]))
+        count = self.measurements.stats[MEAN].count
+        self.stats_count_label.setText(f"n = {count}")
+
+    def sync_channels(self):
+        """Copy the per-channel panel settings into the channel arrays"""
+        self.channels.offset[:] = (self.ch1_offset.value(), self.ch2_offset.value())
+        self.channels.gain[:] = [PROBE_GAINS[probe.currentText()] for probe in self.channel_probe]
+        self.channels.enabled[:] = [enable.isChecked() for enable in self.channel_enable]
+
     def create_measurement_panel(self):
         """Create measurement display panel"""
         self.measure_panel = QWidget()
@@ -798,6 +1315,34 @@ class OscilloscopeUI(QMainWindow):
 
         layout.addWidget(volt_group, 1)
 
+        # Automatic measurements: one column per measurement, value then statistics
+        auto_group = QGroupBox("Automatic Measurements")
+        auto_layout = QGridLayout(auto_group)
+        auto_layout.setHorizontalSpacing(10)
+        auto_layout.setVerticalSpacing(2)
+        auto_layout.setContentsMargins(5, 10, 5, 10)
+        self.stat_rows = ["Value", "Mean", "σ", "Min", "Max"]
+        for row, name in enumerate(self.stat_rows, 1):
+            auto_layout.addWidget(QLabel(name), row, 0)
+        self.auto_labels = {}
+        for column, name in enumerate(MEASUREMENTS, 1):
+            header = QLabel(name)
+            header.setAlignment(Qt.AlignCenter)
+            auto_layout.addWidget(header, 0, column)
+            self.auto_labels[name] = []
+            for row in range(1, len(self.stat_rows) + 1):
+                label = QLabel("--")
+                label.setAlignment(Qt.AlignCenter)
+                auto_layout.addWidget(label, row, column)
+                self.auto_labels[name].append(label)
+        self.stats_count_label = QLabel("n = 0")
+        auto_layout.addWidget(self.stats_count_label, len(self.stat_rows) + 1, 0, 1, 2)
+        self.stats_reset_btn = QPushButton("Reset Statistics")
+        self.stats_reset_btn.clicked.connect(lambda: self.measurements.reset())
+        auto_layout.addWidget(self.stats_reset_btn, len(self.stat_rows) + 1, 2, 1, 3)
+
+        layout.addWidget(auto_group, 3)
+
         # Measurement controls
         measure_group = QGroupBox("Cursors")
         measure_layout = QVBoxLayout(measure_group)
@@ -842,7 +1387,7 @@ class OscilloscopeUI(QMainWindow):
         filter_row1.addWidget(self.filter_enable)
         
         self.filter_type = QComboBox()
-        self.filter_type.addItems(["Low-pass", "Moving Average"])
+        self.filter_type.addItems(FILTER_TYPES)
         filter_row1.addWidget(self.filter_type)
         filter_layout.addLayout(filter_row1)
         
@@ -877,9 +1422,80 @@ class OscilloscopeUI(QMainWindow):
         self.fft_btn.setCheckable(True)
         self.fft_btn.setFixedHeight(30)
         display_layout.addWidget(self.fft_btn)
+
+        # Spectrum settings: window, segment length, waterfall view
+        fft_row = QHBoxLayout()
+        self.fft_window = QComboBox()
+        self.fft_window.addItems(WINDOW_TYPES)
+        fft_row.addWidget(self.fft_window)
+        self.fft_segment = QComboBox()
+        self.fft_segment.addItems([str(n) for n in SEGMENT_SIZES])
+        self.fft_segment.setCurrentText(str(self.spectrum.segment))
+        fft_row.addWidget(self.fft_segment)
+        self.waterfall_enable = QCheckBox("Waterfall")
+        self.waterfall_enable.toggled.connect(lambda checked: self.update_axes())
+        fft_row.addWidget(self.waterfall_enable)
+        display_layout.addLayout(fft_row)
+
+        # XY: CH2 against CH1 instead of both against time
+        xy_row = QHBoxLayout()
+        self.xy_enable = QCheckBox("XY")
+        self.xy_enable.toggled.connect(lambda checked: self.update_axes())
+        xy_row.addWidget(self.xy_enable)
+        # Sin(x)/x: band-limited reconstruction between samples when few are on screen
+        self.sinc_enable = QCheckBox("Sin(x)/x")
+        xy_row.addWidget(self.sinc_enable)
+        display_layout.addLayout(xy_row)
+
+        # Persistence: every acquisition intensity-graded under the trace, fading with a time constant
+        persist_row = QHBoxLayout()
+        self.persist_enable = QCheckBox("Persistence")
+        self.persist_enable.toggled.connect(lambda checked: self.clear_persistence())
+        persist_row.addWidget(self.persist_enable)
+        self.persist_time = QComboBox()
+        for seconds in PERSISTENCE_TIMES:
+            self.persist_time.addItem("Infinite" if seconds == float('inf') else f"{seconds:g} s", seconds)
+        self.persist_time.setCurrentIndex(PERSISTENCE_TIMES.index(DEFAULT_PERSISTENCE))
+        persist_row.addWidget(self.persist_time)
+        self.persist_clear_btn = QPushButton("Clear")
+        self.persist_clear_btn.clicked.connect(self.clear_persistence)
+        persist_row.addWidget(self.persist_clear_btn)
+        display_layout.addLayout(persist_row)
         
         advanced_layout.addWidget(display_group)
 
+        # Segmented memory: one segment per trigger, browsed, averaged or enveloped
+        segment_group = QGroupBox("Segmented Memory")
+        segment_layout = QVBoxLayout(segment_group)
+
+        segment_row1 = QHBoxLayout()
+        self.segment_enable = QCheckBox("Enable")
+        segment_row1.addWidget(self.segment_enable)
+        self.segment_count = QComboBox()
+        for n in SEGMENT_COUNTS:
+            self.segment_count.addItem(f"{n} segments", n)
+        self.segment_count.setCurrentIndex(SEGMENT_COUNTS.index(1000))
+        segment_row1.addWidget(self.segment_count)
+        segment_layout.addLayout(segment_row1)
+
+        segment_row2 = QHBoxLayout()
+        self.segment_mode = QComboBox()
+        self.segment_mode.addItems(SEGMENT_MODES)
+        segment_row2.addWidget(self.segment_mode)
+        self.segment_index = QSpinBox()
+        self.segment_index.setPrefix("#")
+        self.segment_index.setRange(1, 1)
+        segment_row2.addWidget(self.segment_index)
+        self.segment_clear_btn = QPushButton("Clear")
+        self.segment_clear_btn.clicked.connect(self.clear_segments)
+        segment_row2.addWidget(self.segment_clear_btn)
+        segment_layout.addLayout(segment_row2)
+
+        self.segment_label = QLabel("0 captured")
+        segment_layout.addWidget(self.segment_label)
+
+        advanced_layout.addWidget(segment_group)
+
         # Right side: Theme and other controls
         control_group = QGroupBox("Settings")
         control_layout = QVBoxLayout(control_group)
@@ -890,19 +1506,69 @@ class OscilloscopeUI(QMainWindow):
         control_layout.addWidget(self.theme_btn)
         
         self.save_btn = QPushButton("Save Data")
+        self.save_btn.setCheckable(True)
         self.save_btn.setFixedHeight(30)
         control_layout.addWidget(self.save_btn)
+
+        self.open_btn = QPushButton("Open Capture")
+        self.open_btn.setFixedHeight(30)
+        control_layout.addWidget(self.open_btn)
+
+        # Longest a serial read waits for its chunk: lower is snappier, higher costs less CPU
+        latency_layout = QHBoxLayout()
+        latency_layout.addWidget(QLabel("Latency:"))
+        self.latency_combo = QComboBox()
+        for seconds in LATENCY_TARGETS:
+            self.latency_combo.addItem(f"{seconds * 1e3:g} ms", seconds)
+        self.latency_combo.setCurrentIndex(LATENCY_TARGETS.index(DEFAULT_LATENCY))
+        self.latency_combo.currentIndexChanged.connect(self.update_link_latency)
+        latency_layout.addWidget(self.latency_combo)
+        control_layout.addLayout(latency_layout)
+
+        # What a full reader-to-display queue gives up when the display falls behind
+        handoff_layout = QHBoxLayout()
+        handoff_layout.addWidget(QLabel("Overflow:"))
+        self.handoff_combo = QComboBox()
+        self.handoff_combo.addItems(HANDOFF_POLICIES)
+        self.handoff_combo.currentIndexChanged.connect(self.update_handoff_policy)
+        handoff_layout.addWidget(self.handoff_combo)
+        control_layout.addLayout(handoff_layout)
+
+        # Highest redraw rate; expensive frames lower it further
+        fps_layout = QHBoxLayout()
+        fps_layout.addWidget(QLabel("Frame rate:"))
+        self.fps_combo = QComboBox()
+        for fps in TARGET_FPS:
+            self.fps_combo.addItem(f"{fps} fps", fps)
+        self.fps_combo.setCurrentIndex(TARGET_FPS.index(DEFAULT_FPS))
+        self.fps_combo.currentIndexChanged.connect(self.update_frame_rate)
+        fps_layout.addWidget(self.fps_combo)
+        control_layout.addLayout(fps_layout)
+
+        # Pipeline profiler overlay: latency per stage, from serial read to paint
+        hud_layout = QHBoxLayout()
+        self.hud_enable = QCheckBox("Profiler HUD")
+        self.hud_enable.toggled.connect(self.toggle_hud)
+        hud_layout.addWidget(self.hud_enable)
+        self.profile_reset_btn = QPushButton("Reset")
+        self.profile_reset_btn.clicked.connect(lambda: (self.profiler.reset(), self.update_hud()))
+        hud_layout.addWidget(self.profile_reset_btn)
+        control_layout.addLayout(hud_layout)
         
         advanced_layout.addWidget(control_group)
 
         # Apply consistent styling
-        for btn in [self.autoscale_btn, self.fft_btn, self.theme_btn, self.save_btn]:
+        for btn in [self.autoscale_btn, self.fft_btn, self.theme_btn, self.save_btn, self.open_btn]:
             btn.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         
         self.main_layout.addWidget(advanced_panel)
 
     def update_timebase(self):
         """Update timebase settings and recalculate buffers"""
+        if self.capture_view is not None:
+            # The dial and position pan/zoom through the capture instead
+            self.show_capture()
+            return
         new_time_per_div = self.timebase_dial.value() / 10
         if abs(new_time_per_div - self.time_per_div) < 0.01 and not self.time_pos.hasFocus():
             return
@@ -911,118 +1577,463 @@ class OscilloscopeUI(QMainWindow):
         total_time = self.DIVISIONS_X * self.time_per_div
         self.max_points = int(total_time * self.SAMPLE_RATE)
         
-        # Resize buffers while preserving existing data
-        old_data = self.data_buffer
-        self.data_buffer = np.zeros(self.max_points)
-        copy_len = min(len(old_data), len(self.data_buffer))
-        self.data_buffer[-copy_len:] = old_data[-copy_len:]
+        # The ring buffers keep existing samples and only grow past their capacity
+        self.ring_buffer.reserve(self.max_points)
+        self.filtered_buffer.reserve(self.max_points)
         
         # Update time axis
         self.time_offset = self.time_pos.value()
-        self.time_buffer = np.linspace(0, self.time_offset + total_time, self.max_points)
+        self.update_time_axis()
         self.update_axes()
+
+    def update_time_axis(self):
+        """Rebuild the cached time axis when the window length or span changed"""
+        total_time = self.DIVISIONS_X * self.time_per_div
+        key = (self.max_points, total_time, self.SAMPLE_RATE)
+        if key != self._time_axis_key:
+            self._time_axis_key = key
+            self.time_buffer = np.linspace(0, total_time, self.max_points)
+
+    @property
+    def data_buffer(self):
+        """Newest max_points samples as a (channels, n) block, oldest first (a view into the ring buffer)"""
+        return self.ring_buffer.latest(self.max_points).T
+
+    def drain_serial_data(self):
+        """Take every block the reader queued since it last woke us"""
+        for skipped, block in self.serial_reader.queue.take():
+            if skipped:
+                # Lost in the hand-off: the index jumps, so filter, measurements, trigger
+                # and recorder all see the hole
+                self.ring_buffer.skip(skipped)
+            self.on_serial_data(block)
+
     def on_serial_data(self, new_values):
         """Handle incoming serial data with dynamic buffer sizing"""
-        if not new_values:
+        new_values = as_block(new_values)
+        if new_values.shape[1] == 0:
             return
 
-        # Get current buffer parameters
+        self.follow_window_size()
+        start = self.ring_buffer.head
+        with self.profiler.stage(INSERT):
+            self.ring_buffer.write(new_values.T)
+        self.process_new_samples(new_values, start)
+        self.request_frame(DATA)
+
+    def follow_window_size(self):
+        """Follow window changes without touching the stored samples"""
         current_max_points = int(self.DIVISIONS_X * self.time_per_div * self.SAMPLE_RATE)
-        
-        # Resize buffer if needed
-        if len(self.data_buffer) != current_max_points:
-            self.data_buffer = np.zeros(current_max_points)
-            self.time_buffer = np.linspace(0, self.DIVISIONS_X * self.time_per_div, current_max_points)
+        if current_max_points != self.max_points:
             self.max_points = current_max_points
+            self.ring_buffer.reserve(self.max_points)
+            self.filtered_buffer.reserve(self.max_points)
+            self.update_time_axis()
+
+    def process_new_samples(self, new_values, start):
+        """Filter, trigger and measure a (channels, n) block just stored in the ring, starting at index `start`"""
+        self.update_filter()
+        stream = new_values
+        if self.filter_active:
+            with self.profiler.stage(FILTER):
+                if self.filtered_buffer.head != start:
+                    # Samples were skipped: restart the filtered copy at the new index
+                    self.stream_filter.reset()
+                    self.filtered_buffer.clear(start)
+                stream = self.stream_filter.process(new_values)
+                self.filtered_buffer.write(stream.T)
+
+        # Edges are measured once, as they arrive, on the displayed stream
+        self.update_measurement_source()
+        with self.profiler.stage(MEASURE):
+            self.measurements.process(stream[self.trigger_source.currentIndex()], start)
+
+        # Trigger on every chunk as it arrives so no edge between redraws is missed
+        fired = None
+        segmented = self.segment_enable.isChecked()
+        if self.trigger_mode.currentText() != "Auto" or segmented:
+            self.configure_trigger()
+            with self.profiler.stage(TRIGGER):
+                fired = self.trigger.process(new_values[self.trigger_source.currentIndex()], start)
+            self.update_segments()
+            if self.segments.armed and self.segments.capture(self.filtered_buffer if self.filter_active
+                                                             else self.ring_buffer, fired):
+                if self.segments.full:
+                    self.statusBar().showMessage(f"Segment memory full: {self.segments.count} segments")
+        elif self.segments.data is not None:
+            self.update_segments()
+
+        # Persistence takes every acquisition as it completes, not just the ones drawn
+        if self.persist_enable.isChecked() and self.run_stop_btn.isChecked():
+            with self.profiler.stage(PERSIST):
+                self.accumulate_persistence(fired)
+
+        # Only queued here; the recorder's thread does the disk writes
+        if self.recorder.recording:
+            self.recorder.write(new_values, start)
+        # Likewise only queued; the server's thread does the socket writes
+        if self.stream_server is not None:
+            self.stream_server.publish(new_values, start)
+
+    def toggle_capture_view(self):
+        """Open a capture file in the offline viewer, or return to the live trace"""
+        if self.capture_view is not None:
+            self.close_capture()
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Open Capture", self.capture_dir,
+                                              f"Captures (*{CAPTURE_EXT})")
+        if path:
+            self.open_capture_file(path)
 
-        # Convert to numpy array and clip to buffer size
-        new_data = np.array(new_values[-self.max_points:])
-        
-        # Handle buffer update
-        if len(new_data) >= self.max_points:
-            # If new data is larger than buffer, take the latest samples
-            self.data_buffer[:] = new_data[-self.max_points:]
+    def open_capture_file(self, path):
+        """Show a capture file; its pyramid index is loaded from disk or built in a worker"""
+        try:
+            view = CaptureView(path)
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.warning(self, "Open Capture", f"Cannot open {path}:\n{e}")
+            return
+        self.close_capture()
+        self.capture_view = view
+        self._capture_range = None
+        self.open_btn.setText("Live View")
+        if view.load_pyramid():
+            self.statusBar().showMessage(f"{path}: {view.count} samples, {view.duration:.3f} s")
         else:
-            # Roll buffer and add new data
-            shift = len(new_data)
-            self.data_buffer = np.roll(self.data_buffer, -shift)
-            self.data_buffer[-shift:] = new_data
-
-        # Update time buffer based on current settings
-        self.time_buffer = np.linspace(0, self.DIVISIONS_X * self.time_per_div, self.max_points)
-        
-    def update_waveform(self):
-        """Main update function - processes data and updates display"""
-        # Update timebase if changed
-        new_time_per_div = self.timebase_dial.value() / 10
-        if abs(new_time_per_div - self.time_per_div) > 0.01:
-            self.update_timebase()
-        
-        # Update vertical scale if changed
-        new_volts_per_div = self.ch1_volts_div.value() / 10
-        if abs(new_volts_per_div - self.volts_per_div) > 0.01:
-            self.volts_per_div = new_volts_per_div
-            self.update_axes()
+            self.pyramid_worker = PyramidWorker(view)
+            self.pyramid_worker.progress.connect(
+                lambda f: self.statusBar().showMessage(f"Indexing {path}: {f:.0%}"))
+            self.pyramid_worker.finished.connect(self.on_pyramid_finished)
+            threading.Thread(target=self.pyramid_worker.run, daemon=True).start()
+
+        # Position is the window start in seconds within the capture
+        self.time_pos.blockSignals(True)
+        self.time_pos.setRange(0, view.duration)
+        self.time_pos.setValue(0)
+        self.time_pos.blockSignals(False)
+        self.show_capture()
 
-        # Process current data buffer
-        offset_volts = self.ch1_offset.value()
-        
-        # Apply filters if enabled
-        if self.filter_enable.isChecked():
-            if self.filter_type.currentText() == "Low-pass":
-                cutoff = self.filter_param_slider.value()
-                filtered_data = self.apply_lowpass_filter(
-                    self.data_buffer, 
-                    cutoff_freq=cutoff, 
-                    fs=self.SAMPLE_RATE
-                )
-            else:  # Moving Average
-                window_size = self.filter_param_slider.value()
-                filtered_data = self.apply_moving_average(
-                    self.data_buffer, 
-                    window_size=window_size
-                )
-            display_data = filtered_data + offset_volts
+    def on_pyramid_finished(self, ok):
+        view = self.capture_view
+        if view is None or self.pyramid_worker is None:
+            return
+        self.pyramid_worker = None
+        if ok:
+            self.statusBar().showMessage(f"{view.path}: {view.count} samples, {view.duration:.3f} s")
+            self._capture_range = None
+            self.show_capture()
+        else:
+            self.statusBar().showMessage(f"{view.path}: index not built, zoom in to view")
+
+    def close_capture(self):
+        """Leave the offline viewer and go back to the live trace"""
+        if self.pyramid_worker is not None:
+            self.pyramid_worker.stop()
+            self.pyramid_worker = None
+        if self.capture_view is None:
+            return
+        self.capture_view = None
+        self.open_btn.setText("Open Capture")
+        self.statusBar().clearMessage()
+        self.time_pos.blockSignals(True)
+        self.time_pos.setRange(-10, 10)
+        self.time_pos.setValue(self.time_offset)
+        self.time_pos.blockSignals(False)
+        self.update_time_axis()
+        self.update_axes()
+        if self.display_data.shape[1] == len(self.time_buffer):
+            self.draw_trace(self.display_data, self.display_start)
+
+    def capture_window(self):
+        """(first sample, sample count) of the capture window set by the dial and position"""
+        view = self.capture_view
+        # The dial zooms logarithmically from MIN_VIEW_SAMPLES up to the whole capture
+        low, high = self.timebase_dial.minimum(), self.timebase_dial.maximum()
+        fraction = (self.timebase_dial.value() - low) / max(high - low, 1)
+        shortest = min(self.MIN_VIEW_SAMPLES, view.count)
+        n = int(round(shortest * (max(view.count, 1) / max(shortest, 1)) ** fraction))
+        start = int(self.time_pos.value() * view.sample_rate)
+        start = max(min(start, view.count - n), 0)
+        return start, n
+
+    def show_capture(self):
+        """Draw the current capture window from the pyramid; cost does not depend on its length"""
+        view = self.capture_view
+        start, n = self.capture_window()
+        columns = self.decimator.columns
+        self.sync_channels()
+        key = (start, n, columns, self.channels.key(), view.pyramid is not None)
+        if key == self._capture_range:
+            return
+        result = view.envelope(start, n, columns)
+        if result is None:
+            return
+        self._capture_range = key
+        positions, values = result
+        fs = view.sample_rate
+        # The viewer shows the capture's first channel with CH1's settings
+        self.show_traces(False)
+        self.curve.show()
+        self.curve.setData(positions / fs, values * self.channels.gain[0] + self.channels.offset[0])
+        self.plot_widget.setXRange(start / fs, (start + n) / fs, padding=0)
+        self.time_pos.setSingleStep(max(n / fs / 10, 1 / fs))
+        if hasattr(self, 'timebase_text'):
+            self.timebase_text.setText(f"{n / fs / 10:.3g} s/div")
+            self.timebase_text.setPos((start + 0.98 * n) / fs, self.GRID_MIN_V * 0.98)
+            self.volts_div_text.setPos((start + 0.02 * n) / fs, self.GRID_MAX_V * 0.98)
+        self.plot_widget.setTitle(f"Capture {os.path.basename(view.path)}", size='12pt')
+
+    def toggle_recording(self, checked):
+        """Start/stop streaming the acquired samples to a capture file"""
+        if checked:
+            os.makedirs(self.capture_dir, exist_ok=True)
+            name = time.strftime('capture_%Y%m%d_%H%M%S') + CAPTURE_EXT
+            path = os.path.join(self.capture_dir, name)
+            try:
+                self.recorder.start(path, self.SAMPLE_RATE, start_index=self.ring_buffer.head,
+                                    channels=N_CHANNELS)
+            except OSError as e:
+                QMessageBox.warning(self, "Recording", f"Cannot create {path}:\n{e}")
+                self.save_btn.setChecked(False)
+                return
+            self.save_btn.setText("Stop Recording")
+            self.statusBar().showMessage(f"Recording to {path}")
+        else:
+            self.save_btn.setText("Save Data")
+            path = self.recorder.stop()
+            if path is None:
+                return
+            message = f"Saved {self.recorder.samples_written} samples to {path}"
+            if self.recorder.samples_dropped:
+                message += f" ({self.recorder.samples_dropped} dropped)"
+            if self.recorder.error is not None:
+                message += f" - write error: {self.recorder.error}"
+            self.statusBar().showMessage(message)
+
+    def configure_trigger(self):
+        """Push the trigger panel settings to the trigger engine"""
+        # The engine sees acquired samples of the source channel, the levels are
+        # set on its displayed (probe-scaled, offset) trace
+        self.sync_channels()
+        channel = self.trigger_source.currentIndex()
+        samples_per_ms = self.SAMPLE_RATE / 1000
+        pre_trigger = self.max_points // 2
+        self.trigger.configure(
+            level=self.channels.to_acquired(channel, self.trigger_level.value()),
+            edge=self.trigger_edge.currentText(),
+            kind=self.trigger_type.currentText(),
+            hysteresis=0.1 * self.volts_per_div / self.channels.gain[channel],
+            holdoff=int(self.trigger_holdoff.value() * samples_per_ms),
+            width_max=int(self.trigger_width.value() * samples_per_ms),
+            runt_level=self.channels.to_acquired(channel, self.trigger_runt_level.value()),
+            pre_trigger=pre_trigger,
+            post_trigger=self.max_points - pre_trigger)
+
+    def accumulate_persistence(self, fired):
+        """Add the acquisitions this chunk completed to the persistence maps"""
+        ring = self.filtered_buffer if self.filter_active else self.ring_buffer
+        triggered = self.trigger_mode.currentText() != "Auto"
+        pre_trigger = self.trigger.pre_trigger if triggered else 0
+        self.sync_channels()
+        # Maps are in screen volts: anything that moves the traces starts them again
+        key = (triggered, self.max_points, pre_trigger, self.GRID_MIN_V, self.GRID_MAX_V,
+               self.channels.key(), self.filter_active)
+        if key != self._persistence_key:
+            self._persistence_key = key
+            self.persistence_gatherer.configure(self.max_points, pre_trigger)
+            self.persistence_gatherer.clear()
+            for persistence in self.persistence:
+                persistence.configure(self.max_points, self.GRID_MIN_V, self.GRID_MAX_V)
+                persistence.clear()
+            self._persistence_next = ring.head
+
+        if triggered:
+            triggers = fired if fired is not None else ()
+        else:
+            # Untriggered acquisitions are back-to-back screen-wide windows of the stream
+            first = max(self._persistence_next, ring.head - len(ring))
+            triggers = np.arange(first, ring.head - self.max_points + 1, self.max_points)
+            if len(triggers):
+                self._persistence_next = int(triggers[-1]) + self.max_points
+        positions, acquisitions = self.persistence_gatherer.gather(ring, triggers)
+        if len(positions) == 0:
+            return
+        volts = acquisitions * self.channels.gain[:, np.newaxis] + self.channels.offset[:, np.newaxis]
+        for channel, (persistence, enabled) in enumerate(zip(self.persistence, self.channels.enabled)):
+            if enabled:
+                persistence.add(volts[:, channel])
+
+    def clear_persistence(self):
+        """Start the persistence maps again from the next acquisition"""
+        self._persistence_key = None
+        self._persistence_time = None
+        self.request_frame(VIEW)
+
+    def draw_persistence(self):
+        """Fade the persistence maps by the time since the last frame and show them under the traces"""
+        now = time.perf_counter()
+        elapsed = now - self._persistence_time if self._persistence_time is not None else 0.0
+        self._persistence_time = now
+        if (not self.persist_enable.isChecked() or self.xy_enable.isChecked()
+                or self._persistence_key is None):
+            self.hide_persistence()
+            return
+        if not self.persistence_images:
+            for color in CHANNEL_COLORS:
+                image = pg.ImageItem()
+                image.setLookupTable(self.phosphor_lut(self.colors[color]))
+                image.setZValue(-1)
+                self.plot_widget.addItem(image)
+                self.persistence_images.append(image)
+        width = self.DIVISIONS_X * self.time_per_div
+        for image, persistence, enabled in zip(self.persistence_images, self.persistence,
+                                               self.channels.enabled):
+            persistence.persistence = self.persist_time.currentData()
+            persistence.decay(elapsed)
+            image.setVisible(bool(enabled))
+            if enabled:
+                image.setImage(persistence.intensity(), autoLevels=False, levels=(0, 1))
+                image.setRect(0, persistence.low, width, persistence.high - persistence.low)
+
+    def hide_persistence(self):
+        for image in self.persistence_images:
+            image.hide()
+
+    def phosphor_lut(self, color):
+        """Colour map of a persistence image: transparent, the channel colour, white at the most hits"""
+        r, g, b = color.red(), color.green(), color.blue()
+        cmap = pg.ColorMap([0.0, 0.5, 1.0], [(r, g, b, 0), (r, g, b, 255), (255, 255, 255, 255)])
+        return cmap.getLookupTable(nPts=256, alpha=True)
+
+    def update_segments(self):
+        """Arm the segment memory for the current settings, or release it when disabled"""
+        enabled = self.segment_enable.isChecked()
+        key = (enabled, self.segment_count.currentData(), self.max_points, self.trigger.pre_trigger)
+        if key == self._segment_key:
+            return
+        self._segment_key = key
+        if enabled:
+            # Segments are one screen long, with the trigger where the live trace has it
+            self.segments.arm(self.segment_count.currentData(), self.max_points,
+                              self.trigger.pre_trigger, N_CHANNELS)
+        else:
+            self.segments.disarm()
+
+    def clear_segments(self):
+        self.segments.clear()
+        self.request_frame(SETTINGS)
+
+    def show_segments(self):
+        """Draw the selected segment, the average or the envelope of the segment memory"""
+        memory = self.segments
+        self.segment_index.setMaximum(memory.count)
+        i = self.segment_index.value() - 1
+        mode = self.segment_mode.currentText()
+        stream = ('segments', mode, memory.count, i if mode == SEGMENT else None, self.channels.key())
+        if mode == ENVELOPE and not self.xy_enable.isChecked():
+            low, high = memory.envelope()
+            display_data = self.channels.apply(high)
+            self.draw_envelope(self.channels.apply(low), display_data, stream)
         else:
-            display_data = self.data_buffer + offset_volts
+            display_data = self.channels.apply(memory.segment(i) if mode == SEGMENT else memory.average())
+            self.draw_trace(display_data, 0, stream)
+
+        text = f"{memory.count}/{len(memory.data)} captured"
+        if memory.missed:
+            text += f", {memory.missed} missed"
+        if mode == SEGMENT:
+            # Trigger time on the stream's clock, and since the previous segment's trigger
+            times = memory.timestamps(self.SAMPLE_RATE)
+            text += f"\n#{i + 1}: t = {times[i]:.4f} s"
+            if i:
+                text += f", Δt = {format_si(times[i] - times[i - 1], 's')}"
+        self.segment_label.setText(text)
+        self.display_data = display_data
+        self.display_start = memory.positions[i] - memory.pre_trigger
+
+    def triggered_frame(self, ring):
+        """((samples, channels) of `ring`, start index) around the newest complete trigger not displayed yet, or None"""
+        head = ring.head
+        position = self.trigger.latest_complete(head)
+        if position is None or position == self.trigger_position:
+            return None
+        start = position - self.trigger.pre_trigger
+        if start < 0 or head - start > len(ring):
+            return None
+        self.trigger_position = position
+        return ring.latest(head - start)[:self.max_points], start
+        
+    def update_waveform(self, flags=ALL):
+        """Draw one frame; `flags` says what changed since the last one (DATA, SETTINGS, VIEW)"""
+        if flags & SETTINGS:
+            # Update timebase if changed
+            new_time_per_div = self.timebase_dial.value() / 10
+            if abs(new_time_per_div - self.time_per_div) > 0.01:
+                self.update_timebase()
+
+            # Update vertical scale if changed
+            new_volts_per_div = self.ch1_volts_div.value() / 10
+            if abs(new_volts_per_div - self.volts_per_div) > 0.01:
+                self.volts_per_div = new_volts_per_div
+                self.update_axes()
+
+        if self.capture_view is not None and not self.showing_fft:
+            self.hide_persistence()
+            self.show_capture()
+            return
+
+        # Segmented memory replaces the live trace once it holds a segment of the current length
+        if (self.segment_enable.isChecked() and self.segments.count and not self.showing_fft
+                and self.segments.length == len(self.time_buffer)):
+            self.sync_channels()
+            self.hide_persistence()
+            with self.profiler.stage(DRAW):
+                self.show_segments()
+            return
+
+        # Samples are filtered as they arrive; pick the stream to display
+        self.sync_channels()
+        self.update_filter()
+        ring = self.filtered_buffer if self.filter_active else self.ring_buffer
+        source = ring.latest(self.max_points)
+        start = ring.head - self.max_points
+
+        # Normal/Single show the window around the newest trigger; without a new
+        # trigger the last triggered frame stays on screen
+        mode = self.trigger_mode.currentText()
+        trigger_index = None
+        if self.run_stop_btn.isChecked() and mode != "Auto":
+            if mode == "Single" and not self.trigger_armed:
+                return
+            self.configure_trigger()
+            frame = self.triggered_frame(ring)
+            if frame is None:
+                return
+            source, start = frame
+            trigger_index = self.trigger.pre_trigger
+            if mode == "Single":
+                self.trigger_armed = False
+        # Sub-sample alignment of interpolated traces puts the level crossing on the trigger point
+        self.display_trigger = trigger_index
+
+        # Probe gain and offset for every channel at once
+        display_data = self.channels.apply(source.T)
+
+        # A new acquisition: amplitude measurements and their statistics (once the window is full)
+        self.update_measurement_source()
+        channel = self.trigger_source.currentIndex()
+        if len(ring) >= self.max_points and self.measurements.measure_frame(source[:, channel], start):
+            self.update_auto_measurements()
 
         # Update plot display
         if self.showing_fft:
-            self.curve.hide()
-            self.show_fft()
+            self.show_traces(False)
+            self.hide_persistence()
+            with self.profiler.stage(FFT):
+                self.show_fft()
         else:
-            self.curve.show()
-            self.curve.setData(self.time_buffer, display_data)
-
-        # Trigger handling
-        if self.run_stop_btn.isChecked() and self.trigger_mode.currentText() != "Auto":
-            trigger_level = self.trigger_level.value()
-            edge = self.trigger_edge.currentText()
-            triggered = False
-            
-            # Check entire buffer for trigger condition
-            for i in range(1, len(display_data)):
-                prev = display_data[i-1]
-                current = display_data[i]
-                
-                if edge == "Rising" and prev < trigger_level <= current:
-                    triggered = True
-                    self.trigger_position = i
-                    break
-                elif edge == "Falling" and prev > trigger_level >= current:
-                    triggered = True
-                    self.trigger_position = i
-                    break
-
-            if self.trigger_mode.currentText() == "Single":
-                if triggered and self.trigger_armed:
-                    self.trigger_armed = False
-                    # Capture single trigger
-                    self.display_data = display_data[self.trigger_position:]
-                elif not self.trigger_armed:
-                    return
-            elif not triggered:
-                return
+            with self.profiler.stage(DRAW):
+                self.draw_trace(display_data, start)
+                self.draw_persistence()
 
         # Update measurements if cursors are active
         if hasattr(self, 'measure_btn') and self.measure_btn.isChecked():
@@ -1030,7 +2041,8 @@ class OscilloscopeUI(QMainWindow):
         
         # Store display data for measurements
         self.display_data = display_data
-        self.last_update_time += self.timer.interval()
+        self.display_start = start
+
     def update_axes(self):
         """Update axis ranges and labels"""
         # Calculate the vertical range based on volts/div and number of divisions
@@ -1038,7 +2050,17 @@ class OscilloscopeUI(QMainWindow):
         self.GRID_MAX_V = vertical_span / 2
         self.GRID_MIN_V = -vertical_span / 2
         
-        if not self.showing_fft:
+        if not self.showing_fft and self.xy_enable.isChecked():
+            # Both axes in volts, same scale
+            self.plot_widget.setYRange(self.GRID_MIN_V, self.GRID_MAX_V)
+            self.plot_widget.setXRange(self.GRID_MIN_V, self.GRID_MAX_V)
+            if hasattr(self, 'timebase_text') and hasattr(self, 'volts_div_text'):
+                self.timebase_text.hide()
+                self.volts_div_text.hide()
+            self.plot_widget.setLabel('left', f"{CHANNEL_NAMES[1]} (V)")
+            self.plot_widget.setLabel('bottom', f"{CHANNEL_NAMES[0]} (V)")
+            self.plot_widget.setTitle("XY", size='12pt')
+        elif not self.showing_fft:
             self.plot_widget.setYRange(self.GRID_MIN_V, self.GRID_MAX_V)
             self.plot_widget.setXRange(0, self.DIVISIONS_X * self.time_per_div)
             
@@ -1046,6 +2068,8 @@ class OscilloscopeUI(QMainWindow):
             if hasattr(self, 'timebase_text') and hasattr(self, 'volts_div_text'):
                 self.timebase_text.setText(f"{self.time_per_div:.1f} s/div")
                 self.volts_div_text.setText(f"{self.volts_per_div:.1f} V/div")
+                self.timebase_text.show()
+                self.volts_div_text.show()
                 self.update_text_positions()
             
             # Hide axis labels since we're showing them on the plot
@@ -1053,31 +2077,55 @@ class OscilloscopeUI(QMainWindow):
             self.plot_widget.setLabel('bottom', "Time (S)")
             self.plot_widget.setTitle("Signal scope", size='12pt')
         else:
-            self.plot_widget.setYRange(-60, 60)
-            self.plot_widget.setXRange(0, 500)
-            self.plot_widget.setLabel('left', "Magnitude (dB)")
+            self.plot_widget.setXRange(0, self.SAMPLE_RATE / 2)
             self.plot_widget.setLabel('bottom', "Frequency (Hz)")
-            self.plot_widget.setTitle("Frequency Spectrum", size='12pt')
+            if self.waterfall_enable.isChecked():
+                history = self.spectrum.waterfall_rows * self.spectrum.step / self.SAMPLE_RATE
+                self.plot_widget.setYRange(-history, 0)
+                self.plot_widget.setLabel('left', "Time (s)")
+                self.plot_widget.setTitle("Spectrogram", size='12pt')
+            else:
+                self.plot_widget.setYRange(-120, 20)
+                self.plot_widget.setLabel('left', "Magnitude (dBV)")
+                self.plot_widget.setTitle("Frequency Spectrum", size='12pt')
             
             # Hide the text items in FFT mode
             if hasattr(self, 'timebase_text') and hasattr(self, 'volts_div_text'):
                 self.timebase_text.hide()
                 self.volts_div_text.hide()
 
+        if self.capture_view is not None and not self.showing_fft:
+            # Restore the capture window over the live ranges set above
+            self._capture_range = None
+            self.show_capture()
+
     def show_fft(self):
-        """Compute and display FFT of the current buffer"""
-        if len(self.data_buffer) == 0:
+        """Update the spectrum with the segments completed since the last tick and display it"""
+        # Same stream as the time-domain trace, on the trigger source channel
+        ring = self.filtered_buffer if self.filter_active else self.ring_buffer
+        channel = self.trigger_source.currentIndex()
+        if (ring, channel) != self._spectrum_ring:
+            self._spectrum_ring = (ring, channel)
+            self.spectrum.reset()
+        if self.spectrum.configure(segment=int(self.fft_segment.currentText()),
+                                   window=self.fft_window.currentText(),
+                                   fs=self.SAMPLE_RATE):
+            self.update_axes()
+        self.ring_buffer.reserve(self.spectrum.segment)
+        self.filtered_buffer.reserve(self.spectrum.segment)
+        self.spectrum.update(ChannelView(ring, channel))
+
+        if self.waterfall_enable.isChecked():
+            self.show_waterfall()
             return
-        
-        n = len(self.data_buffer)
-        yf = fft(self.data_buffer - np.mean(self.data_buffer))  # Remove DC offset
-        xf = fftfreq(n, 1/self.SAMPLE_RATE)[:n//2]
-        
-        # Safe log calculation with minimum value
-        min_val = 1e-12
-        yf_abs = np.maximum(np.abs(yf[0:n//2]), min_val)
-        yf_db = 20 * np.log10(yf_abs)
-        
+        if self.waterfall_image is not None:
+            self.waterfall_image.hide()
+
+        result = self.spectrum.spectrum_db()
+        if result is None:
+            return
+        xf, yf_db = result
+
         # Remove DC component
         xf = xf[1:]
         yf_db = yf_db[1:]
@@ -1087,6 +2135,7 @@ class OscilloscopeUI(QMainWindow):
             self.fft_curve = self.plot_widget.plot(xf, yf_db, pen=pg.mkPen(self.colors['fft'], width=1))
         else:
             self.fft_curve.setData(xf, yf_db)
+        self.fft_curve.show()
         
         # Clear previous markers
         for marker in self.peak_markers:
@@ -1094,7 +2143,8 @@ class OscilloscopeUI(QMainWindow):
         self.peak_markers = []
         
         # Find and mark the fundamental frequency
-        peaks, _ = find_peaks(yf_db, height=10)  # Only consider peaks above 10dB
+        from scipy.signal import find_peaks  # deferred with the rest of scipy until FFT view
+        peaks, _ = find_peaks(yf_db, prominence=20)  # Only consider peaks 20 dB above their skirts
         if len(peaks) > 0:
             peak_idx = peaks[0]
             freq = xf[peak_idx]
@@ -1107,15 +2157,36 @@ class OscilloscopeUI(QMainWindow):
             
             # Add text label at top
             text = pg.TextItem(text=f"{freq:.2f} Hz", color=self.colors['text'], anchor=(0.5, 1))
-            text.setPos(freq, 55)
+            text.setPos(freq, 15)
             self.plot_widget.addItem(text)
             self.peak_markers.append(text)
 
+    def show_waterfall(self):
+        """Display the spectrogram, newest spectrum at the top"""
+        if self.fft_curve is not None:
+            self.fft_curve.hide()
+        for marker in self.peak_markers:
+            self.plot_widget.removeItem(marker)
+        self.peak_markers = []
+        if self.waterfall_image is None:
+            self.waterfall_image = pg.ImageItem()
+            self.waterfall_image.setLookupTable(pg.colormap.get('viridis').getLookupTable())
+            self.plot_widget.addItem(self.waterfall_image)
+        self.waterfall_image.show()
+
+        rows = self.spectrum.waterfall_rows
+        history = rows * self.spectrum.step / self.SAMPLE_RATE
+        # ImageItem indexes [x, y]: frequency along x, time along y
+        self.waterfall_image.setImage(self.spectrum.waterfall.latest(rows).T,
+                                      autoLevels=False, levels=(-120, 20))
+        self.waterfall_image.setRect(0, -history, self.SAMPLE_RATE / 2, history)
+
     def toggle_fft(self, checked):
         """Toggle FFT view"""
         self.showing_fft = checked
         if checked:
             self.fft_btn.setText("Signal scope")
+            self.hide_persistence()
             if hasattr(self, 'timebase_text') and hasattr(self, 'volts_div_text'):
                 self.timebase_text.hide()
                 self.volts_div_text.hide()
@@ -1125,22 +2196,29 @@ class OscilloscopeUI(QMainWindow):
             if self.fft_curve is not None:
                 self.plot_widget.removeItem(self.fft_curve)
                 self.fft_curve = None
-                if hasattr(self,"peak_marker"):
-                    self.plot_widget.removeItem(self.peak_marker)
+            if self.waterfall_image is not None:
+                self.plot_widget.removeItem(self.waterfall_image)
+                self.waterfall_image = None
+            for marker in self.peak_markers:
+                self.plot_widget.removeItem(marker)
+            self.peak_markers = []
             if hasattr(self, 'timebase_text') and hasattr(self, 'volts_div_text'):
                 self.timebase_text.show()
                 self.volts_div_text.show()
-            self.curve.setData(self.time_buffer, self.data_buffer + self.ch1_offset.value())
+            if self.display_data.shape[1] == len(self.time_buffer):
+                self.draw_trace(self.display_data, self.display_start)
         
         self.update_axes()
       
     def autoscale(self):
         """Auto-scale vertical display"""
-        if len(self.data_buffer) == 0:
+        # Volts/Div and the offset are fitted to CH1 as displayed
+        data = self.data_buffer[0] * self.channels.gain[0]
+        if len(data) == 0:
             return
             
         # Find peak value in the buffer
-        peak = max(abs(self.data_buffer))
+        peak = max(abs(data))
         
         # Calculate required volts/div to fit the signal
         required_volts_div = peak / (self.DIVISIONS_Y / 2)  # Use half divisions to give some margin
@@ -1151,8 +2229,8 @@ class OscilloscopeUI(QMainWindow):
         volts_div = max(self.MIN_VOLTS_DIV, min(self.MAX_VOLTS_DIV, volts_div))
         
         # Calculate optimal offset to center the signal
-        if len(self.data_buffer) > 0:
-            mean_val = np.mean(self.data_buffer)
+        if len(data) > 0:
+            mean_val = np.mean(data)
             optimal_offset = -mean_val
             optimal_offset = max(-10, min(10, optimal_offset))
             self.ch1_offset.setValue(optimal_offset)
@@ -1223,23 +2301,47 @@ class OscilloscopeUI(QMainWindow):
             self.cursor1_volt_label.setText(f"Cursor 1: {v1:.3f} V")
             self.cursor2_volt_label.setText(f"Cursor 2: {v2:.3f} V")
             # Update global measurements
-            if hasattr(self, 'display_data'):
-                self.v_avg_label.setText(f"Avg: {np.mean(self.display_data):.3f} V")
-                self.v_pp_label.setText(f"Vpp: {np.ptp(self.display_data):.3f} V")
-                self.v_max_label.setText(f"Max: {self.display_data.max():.3f} V")
-                self.v_min_label.setText(f"Min: {self.display_data.min():.3f} V")
+            # Global measurements of the trigger source channel, measured once per acquisition
+            trace = self.display_data[self.trigger_source.currentIndex()]
+            if len(trace):
+                channel = self.trigger_source.currentIndex()
+                gain = self.channels.gain[channel]
+                offset = self.channels.offset[channel]
+                self.v_avg_label.setText(f"Avg: {self.measurements.value(MEAN) * gain + offset:.3f} V")
+                self.v_pp_label.setText(f"Vpp: {self.measurements.value(VPP) * gain:.3f} V")
+                self.v_max_label.setText(f"Max: {self.measurements.peak_max * gain + offset:.3f} V")
+                self.v_min_label.setText(f"Min: {self.measurements.peak_min * gain + offset:.3f} V")
     def toggle_run(self, checked):
         """Start/stop waveform updates"""
         if checked:
             self.run_stop_btn.setText("STOP")
             self.trigger_armed = True
-            self.timer.start()
+            self.scheduler.resume()
+            self.request_frame(ALL)
         else:
             self.run_stop_btn.setText("RUN")
-            self.timer.stop()
+            # Changes still accumulate; nothing is drawn until RUN
+            self.scheduler.pause()
+            self.frame_timer.stop()
 
     def closeEvent(self, event):
             """Clean up when closing the window"""
+            # Finish the capture file before the sources go away
+            self.recorder.stop()
+            if self.stream_server is not None:
+                self.stream_server.stop()
+            if self.profile_path:
+                self.dump_profile()
+            self.close_capture()
+            if self.acquisition is not None:
+                # Stop the acquisition process and release its shared memory
+                self.acquisition_timer.stop()
+                self.ring_buffer = RingBuffer(self.ring_buffer.capacity, item_shape=(N_CHANNELS,))
+                self.acquisition.stop()
+                self.acquisition = None
+                event.accept()
+                return
+
             # Stop the serial thread
             self.serial_reader.stop()
             self.serial_thread.join(timeout=1)
@@ -1274,6 +2376,30 @@ if __name__ == "__main__":
     palette.setColor(QPalette.HighlightedText, Qt.black)
     app.setPalette(palette)
     
-    osc = OscilloscopeUI()
+    # --replay FILE [--speed N] plays a capture instead of reading the port (--speed 0: max)
+    source = None
+    if '--replay' in sys.argv[:-1]:
+        speed = float(sys.argv[sys.argv.index('--speed') + 1]) if '--speed' in sys.argv[:-1] else 1.0
+        source = ReplaySource(sys.argv[sys.argv.index('--replay') + 1], speed=speed or None)
+
+    # --profile FILE dumps the pipeline stage latencies periodically (.json snapshot or .csv log)
+    profile_path = sys.argv[sys.argv.index('--profile') + 1] if '--profile' in sys.argv[:-1] else None
+
+    # --serve ADDRESS publishes the live samples on host:port or a Unix socket path (--websocket: as WebSocket)
+    serve_address = parse_address(sys.argv[sys.argv.index('--serve') + 1]) if '--serve' in sys.argv[:-1] else None
+
+    # --clock MODE: 'measured' (default) follows the port's measured sample rate, 'nominal' keeps
+    # SAMPLE_RATE, 'resample' interpolates the port's samples onto SAMPLE_RATE
+    clock = sys.argv[sys.argv.index('--clock') + 1] if '--clock' in sys.argv[:-1] else MEASURED
+    if clock not in CLOCK_MODES:
+        sys.exit(f"--clock must be one of {', '.join(CLOCK_MODES)}")
+
+    # --process moves serial acquisition out of the GUI process
+    osc = OscilloscopeUI(acquisition='process' if '--process' in sys.argv else 'thread',
+                         source=source, profile_path=profile_path, serve_address=serve_address,
+                         websocket='--websocket' in sys.argv, clock=clock)
     osc.show()
+    # --view FILE opens a capture in the offline viewer
+    if '--view' in sys.argv[:-1]:
+        osc.open_capture_file(sys.argv[sys.argv.index('--view') + 1])
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,298 @@
+import numpy as np
+
+from trigger import _schmitt
+
+FREQUENCY = 'Freq'
+PERIOD = 'Period'
+DUTY = 'Duty'
+RISE = 'Rise'
+FALL = 'Fall'
+RMS = 'RMS'
+MEAN = 'Mean'
+VPP = 'Vpp'
+OVERSHOOT = 'Overshoot'
+MEASUREMENTS = [FREQUENCY, PERIOD, DUTY, RISE, FALL, RMS, MEAN, VPP, OVERSHOOT]
+UNITS = {FREQUENCY: 'Hz', PERIOD: 's', DUTY: '%', RISE: 's', FALL: 's',
+         RMS: 'V', MEAN: 'V', VPP: 'V', OVERSHOOT: '%'}
+VOLTAGE_MEASUREMENTS = [RMS, MEAN, VPP]
+LEVEL_MEASUREMENTS = [MEAN]     # absolute levels, which the channel offset shifts too
+
+# Reference levels as fractions of base -> top
+LOW_REF = 0.1
+MID_REF = 0.5
+HIGH_REF = 0.9
+
+EDGE_HISTORY = 32   # samples kept from earlier chunks to time edges that straddle a chunk boundary
+
+_SI_PREFIXES = [(1e6, 'M'), (1e3, 'k'), (1.0, ''), (1e-3, 'm'), (1e-6, 'µ'), (1e-9, 'n')]
+
+
+def format_si(value, unit):
+    """'12.3 ms' style text for a measurement value ('--' when undefined)"""
+    if value is None or not np.isfinite(value):
+        return f"-- {unit}"
+    if unit == '%':
+        return f"{value:.1f} %"
+    magnitude = abs(value)
+    for scale, prefix in _SI_PREFIXES:
+        if magnitude >= scale:
+            break
+    else:
+        # Below the smallest prefix: rounding noise of a zero result
+        value, scale, prefix = 0.0, 1.0, ''
+    return f"{value / scale:.4g} {prefix}{unit}"
+
+
+def _crossings(x, level, rising):
+    """Fractional sample positions where x crosses `level` upwards (rising) or downwards"""
+    a = x[:-1]
+    b = x[1:]
+    if rising:
+        hit = np.flatnonzero((a < level) & (b >= level))
+    else:
+        hit = np.flatnonzero((a > level) & (b <= level))
+    return hit + (level - a[hit]) / (b[hit] - a[hit])
+
+
+def top_base(x, bins=64):
+    """(top, base) levels of a trace: the histogram modes of its upper and lower halves.
+
+    When the mode is the outermost bin, or no level is common (sine,
+    triangle), the extreme is used instead, so such signals read no overshoot.
+    """
+    low, high = float(x.min()), float(x.max())
+    if high <= low:
+        return high, low
+    bins = int(np.clip(len(x) // 16, 8, bins))     # enough samples per bin for a mode
+    counts, edges = np.histogram(x, bins=bins, range=(low, high))
+    centers = 0.5 * (edges[:-1] + edges[1:])
+    half = bins // 2
+    significant = 0.05 * len(x)
+    lower = np.argmax(counts[:half])
+    upper = half + np.argmax(counts[half:])
+    base = centers[lower] if lower > 0 and counts[lower] >= significant else low
+    top = centers[upper] if upper < bins - 1 and counts[upper] >= significant else high
+    return float(top), float(base)
+
+
+class RunningStats:
+    """Count, mean, standard deviation, min and max of a value stream in O(1) memory.
+
+    add() merges a whole batch with the parallel form of Welford's update,
+    so it is one vectorized reduction per batch and stays numerically stable
+    over any number of values.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.last = np.nan
+
+    @property
+    def std(self):
+        return float(np.sqrt(self._m2 / (self.count - 1))) if self.count > 1 else 0.0
+
+    def add(self, values):
+        """Add a value or an array of values; non-finite ones are ignored"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        values = values[np.isfinite(values)]
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = np.square(values - mean).sum()
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.last = float(values[-1])
+
+
+class MeasurementEngine:
+    """Automatic measurements of one channel, with running statistics.
+
+    Edge measurements (period, frequency, duty cycle, 10-90 % rise and
+    90-10 % fall time) come from process(), which is fed every chunk as it
+    arrives. Edges are found with a hysteresis comparator at the mid level
+    and timed at the linearly interpolated level crossings; the comparator
+    state and the last crossings carry over between chunks, as in
+    TriggerEngine, so every cycle is measured exactly once and no chunk is
+    scanned twice. Amplitude measurements (RMS, mean, Vpp, overshoot) come
+    from measure_frame(), once per displayed acquisition, which also sets the
+    top/base levels the edge thresholds derive from.
+
+    Every measurement keeps a RunningStats, so statistics over thousands of
+    cycles or acquisitions need constant memory. Times are in seconds,
+    voltages in the units of the samples.
+    """
+
+    def __init__(self, fs=1000, hysteresis=0.1):
+        self.fs = fs
+        self.hysteresis = hysteresis    # comparator band, as a fraction of top - base
+        self.stats = {name: RunningStats() for name in MEASUREMENTS}
+        self.reset()
+
+    def reset(self):
+        """Drop statistics, levels and edge state"""
+        for stats in self.stats.values():
+            stats.reset()
+        self.levels = None      # (base, top) of the last measured acquisition
+        self.peak_max = np.nan  # extremes of the last measured acquisition
+        self.peak_min = np.nan
+        self._frame = None
+        self._reset_edges()
+
+    def _reset_edges(self):
+        self._tail = None       # last EDGE_HISTORY samples seen by process()
+        self._tail_end = None   # index one past them
+        self._state = -1
+        self._mid = {True: None, False: None}   # last mid-level crossing time per direction
+        self._rise = None       # time of the last rising / falling edge
+        self._fall = None
+        self._transition = {RISE: (None, None), FALL: (None, None)}   # (last start, last end)
+
+    def value(self, name):
+        """Latest value of a measurement (NaN until measured)"""
+        return self.stats[name].last
+
+    def measure_frame(self, trace, start):
+        """Amplitude measurements of the acquisition starting at sample `start`.
+
+        Each acquisition is measured once; repeated calls for the same frame
+        (redraws, cursor moves) return False without rescanning it.
+        """
+        x = np.asarray(trace, dtype=np.float64)
+        if start == self._frame or len(x) < 2:
+            return False
+        self._frame = start
+        top, base = top_base(x)
+        if top > base:
+            self.levels = (base, top)
+        self.peak_max = high = float(x.max())
+        self.peak_min = float(x.min())
+        self.stats[RMS].add(np.sqrt(np.mean(np.square(x))))
+        self.stats[MEAN].add(x.mean())
+        self.stats[VPP].add(high - self.peak_min)
+        if top > base:
+            self.stats[OVERSHOOT].add(100 * (high - top) / (top - base))
+        return True
+
+    def process(self, samples, start):
+        """Measure the edges in the next chunk of the stream, whose first sample is index `start`"""
+        x = np.asarray(samples, dtype=np.float64)
+        n = len(x)
+        if n == 0:
+            return
+        if self._tail is not None and self._tail_end == start:
+            history = np.concatenate((self._tail, x))
+        else:
+            self._reset_edges()
+            history = x
+        self._tail = history[-EDGE_HISTORY:].copy()   # not a view into the caller's (maybe shared) buffer
+        self._tail_end = start + n
+        if self.levels is None:
+            return
+        t_history = start + n - len(history)
+        # The comparator and the 10/90 % crossings continue from the previous sample
+        x = history[-(n + 1):]
+        t0 = start + n - len(x)
+        base, top = self.levels
+        amplitude = top - base
+        mid = base + MID_REF * amplitude
+        band = 0.5 * self.hysteresis * amplitude
+
+        state = _schmitt(x, mid + band, mid - band, True, self._state)
+        before = np.empty_like(state)
+        before[0] = self._state
+        before[1:] = state[:-1]
+        self._state = int(state[-1])
+        rises = self._edge_times(history, t_history, mid, True,
+                                 t0 + np.flatnonzero((before == 0) & (state == 1)))
+        falls = self._edge_times(history, t_history, mid, False,
+                                 t0 + np.flatnonzero((before == 1) & (state == 0)))
+        self._cycles(rises, falls)
+
+        low = base + LOW_REF * amplitude
+        high = base + HIGH_REF * amplitude
+        self.stats[RISE].add(self._transitions(
+            RISE, t0 + _crossings(x, low, True), t0 + _crossings(x, high, True)) / self.fs)
+        self.stats[FALL].add(self._transitions(
+            FALL, t0 + _crossings(x, high, False), t0 + _crossings(x, low, False)) / self.fs)
+
+    def _edge_times(self, x, t0, level, rising, at):
+        """Times of the comparator edges at indices `at`: the last `level` crossing at or before each.
+
+        `x` starts at index `t0` and includes recent samples of earlier chunks.
+        """
+        at = at.astype(np.float64)
+        times = t0 + _crossings(x, level, rising)
+        if self._mid[rising] is not None:
+            times = np.concatenate(([self._mid[rising]], times))
+        if len(times) == 0:
+            return at
+        self._mid[rising] = times[-1]
+        k = np.searchsorted(times, at, side='right') - 1
+        crossing = times[np.maximum(k, 0)]
+        # A crossing already used by the previous edge (its level has moved since):
+        # fall back to the comparator sample rather than lose the edge
+        last = self._rise if rising else self._fall
+        found = (k >= 0) & (crossing > (last if last is not None else -np.inf))
+        edges = np.where(found, crossing, at)
+        # Two comparator edges can still share one crossing; keep the first
+        return edges[np.diff(edges, prepend=-np.inf) > 0]
+
+    def _cycles(self, rises, falls):
+        """Period, frequency and duty cycle of the cycles completed by `rises`"""
+        if self._rise is not None:
+            rises = np.concatenate(([self._rise], rises))
+        if self._fall is not None:
+            falls = np.concatenate(([self._fall], falls))
+        if len(falls):
+            self._fall = falls[-1]
+        # An edge at the time of the carried one was already counted
+        rises = rises[np.diff(rises, prepend=-np.inf) > 0]
+        if len(rises) == 0:
+            return
+        self._rise = rises[-1]
+        periods = np.diff(rises)
+        if len(periods) == 0:
+            return
+        self.stats[PERIOD].add(periods / self.fs)
+        self.stats[FREQUENCY].add(self.fs / periods)
+        # High time: the falling edge inside each cycle
+        k = np.searchsorted(falls, rises[1:]) - 1
+        fall = falls[np.maximum(k, 0)] if len(falls) else np.zeros(len(periods))
+        inside = (k >= 0) & (fall > rises[:-1])
+        self.stats[DUTY].add(100 * (fall - rises[:-1])[inside] / periods[inside])
+
+    def _transitions(self, name, starts, ends):
+        """Durations from the last start crossing to each end crossing, one per edge.
+
+        An end crossing counts only if a start crossing lies between it and the
+        previous end, so ringing around a reference level is not counted twice.
+        """
+        last_start, last_end = self._transition[name]
+        if last_start is not None:
+            starts = np.concatenate(([last_start], starts))
+        if len(starts):
+            last_start = starts[-1]
+        if len(ends) == 0:
+            self._transition[name] = (last_start, last_end)
+            return np.empty(0)
+        previous = np.concatenate(([last_end if last_end is not None else -np.inf], ends[:-1]))
+        self._transition[name] = (last_start, ends[-1])
+        k = np.searchsorted(starts, ends) - 1
+        began = starts[np.maximum(k, 0)] if len(starts) else np.full(len(ends), -np.inf)
+        edge = (k >= 0) & (began > previous)
+        return (ends - began)[edge]
@@ -0,0 +1,111 @@
+import math
+
+import numpy as np
+
+PERSISTENCE_TIMES = [0.1, 0.3, 1.0, 3.0, 10.0, math.inf]   # decay time constants, seconds
+DEFAULT_PERSISTENCE = 1.0
+COLUMNS = 500       # time bins across the screen
+ROWS = 256          # voltage bins over the vertical range
+
+
+class PersistenceMap:
+    """Digital phosphor: every acquired waveform drawn into a time x voltage hit histogram.
+
+    add() takes a batch of (k, n) waveforms, each n samples across the
+    screen. Each pair of consecutive samples lights the span of rows
+    between them in the column of the first one, so edges are connected
+    lines rather than dots and a column gains one hit per sample it holds.
+    add() only computes where each span starts and ends, which is linear
+    in samples whatever the span heights. flush() folds everything added
+    since the last flush into the counts at once: two bincounts (+1 at the
+    bottom of a span, -1 above its top) and one cumulative sum along the
+    voltage axis. The whole-map work is paid once per frame rather than
+    once per chunk, so accumulation keeps up with the acquisition rate.
+
+    decay() fades the counts exponentially with the `persistence` time
+    constant (inf keeps everything), then flushes; it runs once per frame.
+    intensity() is the log-scaled 0..1 image for display, with hits[x, y]
+    in the column-major order ImageItem expects.
+    """
+
+    def __init__(self, columns=COLUMNS, rows=ROWS, persistence=DEFAULT_PERSISTENCE):
+        self.max_columns = columns
+        self.rows = rows
+        self.persistence = persistence
+        self.n = 0
+        self.low, self.high = -1.0, 1.0
+        self.hits = np.zeros((0, rows), dtype=np.float32)
+        self.waveforms = 0
+        self._first_row = None
+        self._bottoms = []      # flat (columns, rows + 1) indices of span starts not yet flushed
+        self._tops = []         # ... and of the rows just above their ends
+        self._pending = 0
+
+    @property
+    def columns(self):
+        return self.hits.shape[0]
+
+    def configure(self, n, low, high):
+        """Map n samples across the screen and low..high volts over the rows; clears on change"""
+        if (n, low, high) == (self.n, self.low, self.high):
+            return
+        self.n, self.low, self.high = n, low, high
+        # Never more columns than samples, so a column is never left without a hit
+        columns = max(min(self.max_columns, n), 1)
+        self.hits = np.zeros((columns, self.rows), dtype=np.float32)
+        # Flat index of row 0 in the column of each sample pair, in a (columns, rows + 1) grid
+        self._first_row = np.arange(max(n - 1, 0)) * columns // max(n, 1) * (self.rows + 1)
+        self.clear()
+
+    def clear(self):
+        self.hits[:] = 0
+        self.waveforms = 0
+        self._bottoms = []
+        self._tops = []
+        self._pending = 0
+
+    def add(self, waveforms):
+        """Accumulate a (k, n) batch of waveforms in volts"""
+        w = np.asarray(waveforms).reshape(-1, self.n)
+        if self.n < 2 or len(w) == 0:
+            return
+        # Row of every sample; off-screen samples land just outside the grid
+        scale = self.rows / (self.high - self.low)
+        row = np.clip(np.floor((w - self.low) * scale), -1, self.rows).astype(np.int64)
+        a, b = row[:, :-1], row[:, 1:]
+        bottom = np.maximum(np.minimum(a, b), 0)
+        top = np.minimum(np.maximum(a, b), self.rows - 1)
+        visible = bottom <= top
+        self._bottoms.append((self._first_row + bottom)[visible])
+        self._tops.append((self._first_row + top + 1)[visible])
+        self.waveforms += len(w)
+        self._pending += len(self._bottoms[-1])
+        if self._pending > self.hits.size:
+            # Bound the memory held while nothing is drawn
+            self.flush()
+
+    def flush(self):
+        """Fold the spans added since the last flush into the hit counts"""
+        if not self._pending:
+            return
+        size = self.columns * (self.rows + 1)
+        delta = np.bincount(np.concatenate(self._bottoms), minlength=size)
+        delta -= np.bincount(np.concatenate(self._tops), minlength=size)
+        self.hits += np.cumsum(delta.reshape(self.columns, self.rows + 1)[:, :-1], axis=1)
+        self._bottoms = []
+        self._tops = []
+        self._pending = 0
+
+    def decay(self, elapsed):
+        """Fade the hits by `elapsed` seconds of persistence, then add the new waveforms"""
+        if self.persistence != math.inf and elapsed > 0:
+            self.hits *= math.exp(-elapsed / self.persistence)
+        self.flush()
+
+    def intensity(self):
+        """Hits on a log scale, 0..1 relative to the brightest bin"""
+        self.flush()
+        peak = float(self.hits.max()) if self.hits.size else 0.0
+        if peak <= 0:
+            return np.zeros_like(self.hits)
+        return np.log1p(self.hits) / math.log1p(peak)
@@ -0,0 +1,145 @@
+import csv
+import json
+import math
+import os
+import time
+
+# Pipeline stages, from serial bytes to pixels
+READ = 'read'          # waiting in the port read
+DECODE = 'decode'
+LINK = 'link'          # oldest byte of a chunk arriving -> chunk handed to the GUI
+INSERT = 'insert'      # ring buffer write (or shared ring snapshot)
+FILTER = 'filter'
+MEASURE = 'measure'
+TRIGGER = 'trigger'
+PERSIST = 'persist'    # accumulating acquisitions into the persistence maps
+FFT = 'fft'
+DRAW = 'draw'          # decimation and setData
+PAINT = 'paint'
+FRAME = 'frame'        # one whole scheduled frame, paint excluded
+STAGES = [READ, DECODE, LINK, INSERT, FILTER, MEASURE, TRIGGER, PERSIST, FFT, DRAW, PAINT, FRAME]
+
+MIN_LATENCY = 1e-6         # upper edge of the first histogram bucket, seconds
+BUCKETS_PER_OCTAVE = 4
+N_BUCKETS = 24 * BUCKETS_PER_OCTAVE    # 1 µs .. ~16 s
+
+CSV_FIELDS = ['time', 'stage', 'count', 'mean_ms', 'p50_ms', 'p99_ms', 'max_ms', 'total_s']
+
+
+class LatencyHistogram:
+    """Durations in logarithmic buckets (four per octave), with count, total and max.
+
+    add() is a log2 and a list increment, so it can sit in per-chunk paths;
+    percentiles are read from the buckets, within 19 % of the true value.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        k = int(math.log2(seconds / MIN_LATENCY) * BUCKETS_PER_OCTAVE) + 1 if seconds > MIN_LATENCY else 0
+        self.counts[min(k, N_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile (q in 0..100), capped at max"""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for k, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(MIN_LATENCY * 2 ** (k / BUCKETS_PER_OCTAVE), self.max)
+        return self.max
+
+
+class _Stage:
+    """Reusable timing context of one stage: `with profiler.stage(FILTER): ...`"""
+    __slots__ = ('histogram', 'profiler', 'start')
+
+    def __init__(self, profiler, histogram):
+        self.profiler = profiler
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        if self.profiler.enabled:
+            self.histogram.add(time.perf_counter() - self.start)
+
+
+class Profiler:
+    """Latency histograms of every pipeline stage, from serial read to paint.
+
+    Stages are timed with `with profiler.stage(name):` or record(), each from
+    one thread (read and decode run in SerialReader's thread, the rest in the
+    GUI thread). summary() gives count, mean, p50, p99 and max per stage;
+    dump() writes it to a JSON snapshot or appends it to a CSV log.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {name: LatencyHistogram() for name in STAGES}
+        self._stages = {name: _Stage(self, h) for name, h in self.histograms.items()}
+
+    def stage(self, name):
+        return self._stages[name]
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self.histograms[name].add(seconds)
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def summary(self):
+        """One row per stage that has been timed"""
+        rows = []
+        for name in STAGES:
+            h = self.histograms[name]
+            if h.count:
+                rows.append({'stage': name, 'count': h.count, 'mean_ms': h.mean * 1e3,
+                             'p50_ms': h.percentile(50) * 1e3, 'p99_ms': h.percentile(99) * 1e3,
+                             'max_ms': h.max * 1e3, 'total_s': h.total})
+        return rows
+
+    def format(self):
+        """Fixed-width table of summary() for the on-plot HUD"""
+        lines = [f"{'stage':<8}{'n':>8}{'mean':>8}{'p50':>8}{'p99':>8}{'max':>8}  ms"]
+        for row in self.summary():
+            lines.append(f"{row['stage']:<8}{row['count']:>8}{row['mean_ms']:>8.2f}{row['p50_ms']:>8.2f}"
+                         f"{row['p99_ms']:>8.2f}{row['max_ms']:>8.2f}")
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        """Write the summary to `path`: a .json snapshot, or rows appended to a .csv log"""
+        now = time.strftime('%Y-%m-%dT%H:%M:%S')
+        rows = self.summary()
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump({'time': now, 'stages': rows}, f, indent=1)
+            return
+        new = not os.path.exists(path)
+        with open(path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            if new:
+                writer.writeheader()
+            for row in rows:
+                writer.writerow(dict(row, time=now))
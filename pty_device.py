@@ -0,0 +1,164 @@
+import multiprocessing as mp
+import os
+import time
+import tty
+
+import numpy as np
+
+from decoder import raw_from_volts
+from loopback import IDLE_COUNTS
+from sources import SINE, SyntheticSource
+
+# Shared counters (int64 slots)
+LINES_SENT = 0         # lines fully handed to the pty, including damaged ones
+LINES_CORRUPTED = 1
+BYTES_DROPPED = 2
+SAMPLES_SKIPPED = 3    # sample instants lost while the host was not reading
+BURSTS = 4
+N_COUNTERS = 5
+
+BURST_LOG = 1 << 17     # (lines sent so far, time) of the most recent bursts
+MAX_BACKLOG = 1 << 16   # bytes queued towards the pty before samples are skipped
+
+
+def encode_lines(raw):
+    """Raw ADC pairs -> the firmware's "%hu#%hu\\n" lines"""
+    return ('\n'.join(map('%d#%d'.__mod__, map(tuple, raw.tolist()))) + '\n').encode('ascii')
+
+
+def _emulate(master, sample_rate, burst, corrupt_rate, drop_byte_rate, source, seed,
+             counters, log, stop_event):
+    """Child process: pace bursts of lines into the pty master like main.c's loop"""
+    rng = np.random.default_rng(seed)
+    os.set_blocking(master, False)
+    source.start()
+    backlog = b''
+    t0 = time.monotonic()
+    sent = 0        # sample instants handled (sent or skipped)
+    while not stop_event.is_set():
+        deadline = t0 + (sent + burst) / sample_rate
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        # Commands from the host are read and ignored, like the legacy firmware
+        try:
+            os.read(master, 4096)
+        except (BlockingIOError, OSError):
+            pass
+
+        due = int((time.monotonic() - t0) * sample_rate) - sent
+        n = min(max(due, burst), burst * 64)
+        if len(backlog) > MAX_BACKLOG:
+            # The UART would sit in HAL_UART_Transmit: these samples are never converted
+            counters[SAMPLES_SKIPPED] += n
+            sent += n
+        else:
+            values = source.generate(n)
+            lines = encode_lines(raw_from_volts(values, IDLE_COUNTS))
+            if corrupt_rate:
+                lines, damaged = _corrupt(lines, corrupt_rate, rng)
+                counters[LINES_CORRUPTED] += damaged
+            if drop_byte_rate:
+                keep = rng.random(len(lines)) >= drop_byte_rate
+                counters[BYTES_DROPPED] += len(lines) - int(keep.sum())
+                lines = np.frombuffer(lines, dtype=np.uint8)[keep].tobytes()
+            backlog += lines
+            sent += n
+            counters[LINES_SENT] += n
+            k = counters[BURSTS] % BURST_LOG
+            log[2 * k] = counters[LINES_SENT]
+            log[2 * k + 1] = time.monotonic()
+            counters[BURSTS] += 1
+
+        try:
+            written = os.write(master, backlog)
+            backlog = backlog[written:]
+        except BlockingIOError:
+            pass
+        except OSError:
+            break   # the slave side went away
+
+
+def _corrupt(lines, rate, rng):
+    """Overwrite the first digit of a random subset of lines with 'x'"""
+    buf = np.frombuffer(lines, dtype=np.uint8).copy()
+    starts = np.concatenate(([0], np.flatnonzero(buf == ord('\n'))[:-1] + 1))
+    hit = starts[rng.random(len(starts)) < rate]
+    buf[hit] = ord('x')
+    return buf.tobytes(), len(hit)
+
+
+class PtyEmulator:
+    """Pseudo-terminal that behaves like the STM32 running main.c in ASCII mode.
+
+    A child process writes "%hu#%hu\\n" lines into the pty master at
+    `sample_rate` lines per second, `burst` lines per write, while SerialReader
+    opens `port` (the slave path) with pyserial like a real COM port. Lines can
+    be corrupted and bytes dropped at random. As on the board, when the host
+    stops reading the output backs up and the sample instants that could not
+    be sent are skipped and counted.
+
+    Every burst is logged with its time.monotonic() timestamp, so a benchmark
+    can match decoded samples to the moment their bytes reached the pty.
+    """
+
+    def __init__(self, sample_rate=1000, burst=1, corrupt_rate=0.0, drop_byte_rate=0.0,
+                 source=None, seed=None):
+        self.sample_rate = sample_rate
+        self.burst = burst
+        self.corrupt_rate = corrupt_rate
+        self.drop_byte_rate = drop_byte_rate
+        self.source = source or SyntheticSource(SINE, frequency=50, amplitude=2.0, noise=0.01,
+                                                sample_rate=sample_rate)
+        self.seed = seed
+        self.port = None
+        self.process = None
+        self._master = None
+        self._slave = None
+        ctx = mp.get_context('fork')
+        self._ctx = ctx
+        self._counters = ctx.Array('q', N_COUNTERS, lock=False)
+        self._log = ctx.Array('d', 2 * BURST_LOG, lock=False)
+        self._stop_event = ctx.Event()
+
+    def counters(self):
+        return {'lines_sent': self._counters[LINES_SENT],
+                'lines_corrupted': self._counters[LINES_CORRUPTED],
+                'bytes_dropped': self._counters[BYTES_DROPPED],
+                'samples_skipped': self._counters[SAMPLES_SKIPPED]}
+
+    def burst_log(self):
+        """(lines sent after each burst, monotonic time of the burst), oldest first"""
+        bursts = self._counters[BURSTS]
+        log = np.frombuffer(self._log, dtype=np.float64).reshape(-1, 2)
+        if bursts > BURST_LOG:
+            log = np.roll(log, -(bursts % BURST_LOG), axis=0)
+        else:
+            log = log[:bursts]
+        return log[:, 0].astype(np.int64), log[:, 1].copy()
+
+    def start(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.process = self._ctx.Process(
+            target=_emulate,
+            args=(self._master, self.sample_rate, self.burst, self.corrupt_rate,
+                  self.drop_byte_rate, self.source, self.seed, self._counters, self._log,
+                  self._stop_event),
+            daemon=True)
+        self.process.start()
+        return self.port
+
+    def stop(self):
+        if self.process is not None:
+            self._stop_event.set()
+            self.process.join(1.0)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
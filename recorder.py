@@ -0,0 +1,215 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from decoder import ADC_FULL_SCALE, ADC_VREF
+
+# Capture file: MAGIC, then a JSON header space-padded to HEADER_SIZE bytes,
+# then the raw little-endian samples. The fixed header size lets the writer
+# fill in the final sample count in place and readers np.memmap the data at
+# a known offset.
+MAGIC = b'OSCCAP1\n'
+HEADER_SIZE = 4096
+CAPTURE_EXT = '.osc'
+
+# Stored sample types; int16 keeps ADC counts (volts = value * scale) losslessly
+CAPTURE_DTYPES = {'int16': np.dtype('<i2'), 'float32': np.dtype('<f4')}
+ADC_VOLTS_PER_COUNT = ADC_VREF / ADC_FULL_SCALE
+MAX_GAPS = 32       # gaps listed in the header; samples_dropped counts them all
+
+
+def _encode_header(header):
+    text = json.dumps(header, indent=1).encode('utf-8')
+    if len(MAGIC) + len(text) + 1 > HEADER_SIZE:
+        raise ValueError("capture header does not fit in HEADER_SIZE")
+    return MAGIC + text.ljust(HEADER_SIZE - len(MAGIC) - 1) + b'\n'
+
+
+def read_header(path):
+    """Header dict of a capture file"""
+    with open(path, 'rb') as f:
+        block = f.read(HEADER_SIZE)
+    if not block.startswith(MAGIC):
+        raise ValueError(f"{path} is not a capture file")
+    return json.loads(block[len(MAGIC):].decode('utf-8'))
+
+
+def open_capture(path):
+    """(header, read-only memmap of the stored samples); multiply by header['scale'] for volts
+
+    Multi-channel captures are stored interleaved and map as (samples, channels).
+    """
+    header = read_header(path)
+    dtype = CAPTURE_DTYPES[header['dtype']]
+    channels = header.get('channels', 1)
+    shape = (channels,) if channels > 1 else ()
+    # Use the file size rather than the header count, so a capture cut short
+    # by a crash is still readable up to its last complete sample
+    count = (os.path.getsize(path) - HEADER_SIZE) // (dtype.itemsize * channels)
+    if count <= 0:
+        return header, np.empty((0,) + shape, dtype=dtype)
+    return header, np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE,
+                             shape=(count,) + shape)
+
+
+class CaptureRecorder:
+    """Streams decoded samples to a capture file on a background writer thread.
+
+    write() only copies the chunk (converting it to the stored type) and
+    queues it, so it costs microseconds on the caller's thread. The writer
+    drains the queue and coalesces chunks into large sequential writes. The
+    queue is bounded: if the disk cannot keep up, chunks are dropped and
+    counted in `samples_dropped` rather than blocking acquisition or redraws.
+
+    write() also takes the block's absolute sample index. Samples lost
+    before it (skipped upstream, dropped from a full queue, or lost to a
+    failed disk write) are listed in the header's `gaps` as [file
+    position, samples missing], so a hole in the file is never mistaken
+    for continuous signal. Each queued chunk carries the samples missing
+    before it and the writer thread, which knows the file position,
+    records the gaps.
+    """
+
+    def __init__(self, dtype='int16', max_pending=256, block_bytes=1 << 20):
+        self.dtype = dtype
+        self.max_pending = max_pending      # queued chunks before new ones are dropped
+        self.block_bytes = block_bytes      # coalesce queued chunks up to this size per write
+        self.path = None
+        self.header = None
+        self.samples_written = 0
+        self.samples_dropped = 0
+        self.gaps = []
+        self.error = None
+        self._missing = 0       # samples lost since the last chunk queued
+        self._next_index = 0    # absolute index expected of the next block
+        self._queue = None
+        self._thread = None
+        self._file = None
+
+    @property
+    def recording(self):
+        return self._thread is not None
+
+    def start(self, path, sample_rate, start_index=0, channels=1, **metadata):
+        """Create `path` and start the writer; extra keyword arguments go into the header"""
+        if self.recording:
+            raise RuntimeError("already recording")
+        if self.dtype not in CAPTURE_DTYPES:
+            raise ValueError(f"unsupported capture dtype '{self.dtype}'")
+        now = time.time()
+        self.header = {
+            'version': 1,
+            'sample_rate': sample_rate,
+            'dtype': self.dtype,
+            'scale': ADC_VOLTS_PER_COUNT if self.dtype == 'int16' else 1.0,
+            'units': 'V',
+            'channels': int(channels),
+            'start_index': int(start_index),
+            'started': now,
+            'started_iso': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)),
+            'stopped': None,
+            'samples': 0,
+            'samples_dropped': 0,
+            'gaps': [],
+        }
+        self.header.update(metadata)
+        self.path = path
+        self.samples_written = 0
+        self.samples_dropped = 0
+        self.gaps = []
+        self.error = None
+        self._missing = 0
+        self._next_index = int(start_index)
+        self._file = open(path, 'wb')
+        self._file.write(_encode_header(self.header))
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, samples, start=None):
+        """Queue samples (volts, or a (channels, n) block) starting at absolute index `start`; never blocks"""
+        samples = np.asarray(samples)
+        if not self.recording or samples.shape[-1] == 0:
+            return
+        if start is not None:
+            if start > self._next_index:
+                self._missing += start - self._next_index
+                self.samples_dropped += start - self._next_index
+            self._next_index = start + samples.shape[-1]
+        # Channels are stored interleaved, one row per sample instant
+        samples = samples.T
+        if self.dtype == 'int16':
+            chunk = np.clip(np.rint(samples / ADC_VOLTS_PER_COUNT), -32768, 32767)
+            chunk = chunk.astype(CAPTURE_DTYPES['int16'])
+        else:
+            chunk = samples.astype(CAPTURE_DTYPES[self.dtype])
+        try:
+            self._queue.put_nowait((self._missing, chunk))
+        except queue.Full:
+            self._missing += len(chunk)
+            self.samples_dropped += len(chunk)
+            return
+        self._missing = 0
+
+    def _gap(self, n):
+        """Note n samples missing at the current end of the file"""
+        if self.gaps and self.gaps[-1][0] == self.samples_written:
+            self.gaps[-1][1] += n
+        elif len(self.gaps) < MAX_GAPS:
+            self.gaps.append([self.samples_written, n])
+
+    def stop(self):
+        """Flush what is queued, finalize the header and close the file; returns the path"""
+        if not self.recording:
+            return None
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._missing:
+            self._gap(self._missing)
+        self.header['stopped'] = time.time()
+        self.header['samples'] = self.samples_written
+        self.header['samples_dropped'] = self.samples_dropped
+        self.header['gaps'] = self.gaps
+        self._file.seek(0)
+        self._file.write(_encode_header(self.header))
+        self._file.close()
+        self._file = None
+        return self.path
+
+    def _run(self):
+        """Writer thread: drain the queue in coalesced sequential writes"""
+        done = False
+        while not done:
+            item = self._queue.get()
+            if item is None:
+                break
+            block = [item]
+            size = item[1].nbytes
+            # Take whatever else is already queued, up to block_bytes
+            while size < self.block_bytes:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    done = True
+                    break
+                block.append(item)
+                size += item[1].nbytes
+            try:
+                self._file.write(b''.join(c.tobytes() for _, c in block))
+            except OSError as e:
+                # Keep draining so write() never blocks; the error is reported on stop
+                self.error = e
+                self.samples_dropped += sum(len(c) for _, c in block)
+                self._gap(sum(missing + len(c) for missing, c in block))
+                continue
+            for missing, chunk in block:
+                if missing:
+                    self._gap(missing)
+                self.samples_written += len(chunk)
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity sample store with a write cursor.
+
+    Every sample is stored twice, `capacity` slots apart, so the newest N
+    samples are always one contiguous slice: latest(n) returns a view in
+    chronological order without copying. Writes cost two small copies per
+    chunk instead of the full-buffer copy np.roll makes.
+
+    Items may be rows (`item_shape`), e.g. one spectrum per item for a
+    waterfall display; latest(n) then returns an (n,) + item_shape view.
+
+    There is a single writer. `head` counts every sample ever written and is
+    advanced only after the data is in place, so a reader that samples `head`
+    first can tell whether anything new arrived without taking a lock.
+    """
+
+    def __init__(self, capacity, dtype=np.float64, buffer=None, item_shape=()):
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self.item_shape = tuple(item_shape)
+        if buffer is None:
+            self._data = np.zeros((2 * self.capacity,) + self.item_shape, dtype=self.dtype)
+        else:
+            # Caller-provided storage (e.g. shared memory), 2 * capacity items
+            self._data = np.ndarray((2 * self.capacity,) + self.item_shape, dtype=self.dtype,
+                                    buffer=buffer)
+        self.head = 0
+
+    def __len__(self):
+        return min(self.head, self.capacity)
+
+    def write(self, samples):
+        """Append samples, overwriting the oldest ones"""
+        samples = np.asarray(samples, dtype=self.dtype)
+        n = len(samples)
+        if n == 0:
+            return
+        cap = self.capacity
+        if n > cap:
+            self.head += n - cap
+            samples = samples[-cap:]
+            n = cap
+
+        pos = self.head % cap
+        end = pos + n
+        data = self._data
+        data[pos:end] = samples
+        if end <= cap:
+            data[pos + cap:end + cap] = samples
+        else:
+            split = cap - pos
+            data[pos + cap:] = samples[:split]
+            data[:end - cap] = samples[split:]
+        self.head += n
+
+    def latest(self, n):
+        """View of the newest n samples, oldest first (zeros before anything was written)"""
+        if n > self.capacity:
+            raise ValueError(f"requested {n} samples from a buffer of {self.capacity}")
+        end = self.head % self.capacity + self.capacity
+        return self._data[end - n:end]
+
+    def skip(self, n):
+        """Advance the write cursor over n samples that never arrived; they read as zeros"""
+        if n <= 0:
+            return
+        held = min(n, self.capacity)
+        self.head += n - held
+        self.write(np.zeros((held,) + self.item_shape, dtype=self.dtype))
+
+    def since(self, head):
+        """View of the samples written after `head` (at most the whole buffer)"""
+        return self.latest(min(self.head - head, self.capacity))
+
+    def reserve(self, capacity):
+        """Grow the store to hold at least `capacity` samples, keeping the newest ones"""
+        if capacity <= self.capacity:
+            return
+        kept = self.latest(len(self)).copy()
+        head = self.head
+        self.capacity = max(int(capacity), 2 * self.capacity)
+        self._data = np.zeros((2 * self.capacity,) + self.item_shape, dtype=self.dtype)
+        self.head = head - len(kept)
+        self.write(kept)
+
+    def clear(self, head=0):
+        """Drop all samples and restart the write cursor at `head`"""
+        self._data[:] = 0
+        self.head = head
@@ -0,0 +1,165 @@
+import time
+
+import numpy as np
+
+NOMINAL = 'nominal'      # trust the configured sample rate
+MEASURED = 'measured'    # retune time axis, filters and FFT to the rate the link delivers
+RESAMPLE = 'resample'    # interpolate the stream onto the configured rate
+CLOCK_MODES = [NOMINAL, MEASURED, RESAMPLE]
+RATE_WINDOW = 4.0        # seconds of block arrivals in the running fit
+MIN_SPAN = 2.0           # seconds of arrivals before the estimate is used
+MAX_ARRIVALS = 512       # arrivals kept; a faster stream is thinned to fit
+RATE_TOLERANCE = 0.005   # relative change worth retuning the display and filters for
+
+
+class BlockStamp:
+    """Host-side record of one decoded block: sequence number, first sample index, size, arrival"""
+    __slots__ = ('seq', 'start', 'count', 'arrival', 'gap')
+
+    def __init__(self, seq, start, count, arrival, gap=0):
+        self.seq = seq
+        self.start = start          # absolute index of the block's first sample
+        self.count = count
+        self.arrival = arrival      # time.perf_counter() when the block was read
+        self.gap = gap              # frames the link lost just before this block
+
+
+class SampleClock:
+    """Stamps decoded blocks and tracks the sample rate the link actually delivers.
+
+    The firmware's rate is set by its polling loop and the UART, not by a
+    timer, so the nominal rate is only a first guess. stamp() records each
+    block's arrival against the number of samples received so far; the rate
+    is the slope of a line fitted through the arrivals of the last `window`
+    seconds. The window is measured in time, not in blocks, so it spans the
+    same seconds whatever the read latency; at most `max_arrivals` are
+    kept, every other one being dropped when a fast stream fills the store.
+
+    Arrivals only ever lag the true sample times (OS scheduling, driver
+    buffering, a busy reader), so a least-squares fit is pulled by every
+    late read. The fit here is a median of slopes between points half the
+    window apart (Theil-Sen on a fixed pairing): each arrival sits in one
+    pair, so a late read spoils one slope of window / 2 and the median
+    passes over it, and the baseline of half the window divides the jitter
+    by seconds rather than by one block interval. The estimate is used once
+    the arrivals span `min_span` seconds; before that `rate` is the nominal
+    rate. Frames lost on the link break the count-to-time relation, so a
+    gap restarts the fit.
+    """
+
+    def __init__(self, nominal, window=RATE_WINDOW, min_span=MIN_SPAN, max_arrivals=MAX_ARRIVALS):
+        self.nominal = nominal
+        self.window = window
+        self.min_span = min_span
+        self._index = np.zeros(max_arrivals)
+        self._time = np.zeros(max_arrivals)
+        self.seq = 0
+        self.samples = 0
+        self.last = None            # BlockStamp of the newest block
+        self.restart()
+
+    def restart(self):
+        """Forget the arrivals fitted so far"""
+        self._first = 0             # the fit uses _index/_time[_first:_end]
+        self._end = 0
+        self._period = None
+
+    def stamp(self, count, arrival=None, gap=0):
+        """BlockStamp for the next `count` samples, read at `arrival` (default: now)"""
+        if arrival is None:
+            arrival = time.perf_counter()
+        stamp = BlockStamp(self.seq, self.samples, count, arrival, gap)
+        self.seq += 1
+        self.samples += count
+        if gap:
+            self.restart()
+        if self._end == len(self._time):
+            self._compact()
+        self._index[self._end] = self.samples
+        self._time[self._end] = arrival
+        self._end += 1
+        # Arrivals older than the window leave the fit
+        self._first += int(np.searchsorted(self._time[self._first:self._end], arrival - self.window))
+        self._period = None
+        self.last = stamp
+        return stamp
+
+    def _compact(self):
+        """Move the fitted arrivals to the front of the store, thinning them if they fill half of it"""
+        keep = slice(self._first, self._end)
+        if self._end - self._first > len(self._time) // 2:
+            # Every other arrival, ending with the newest
+            keep = slice(self._end - 1 - 2 * ((self._end - 1 - self._first) // 2), self._end, 2)
+        index, times = self._index[keep].copy(), self._time[keep].copy()
+        self._first, self._end = 0, len(index)
+        self._index[:self._end] = index
+        self._time[:self._end] = times
+
+    @property
+    def span(self):
+        """Seconds between the oldest and newest arrivals in the fit"""
+        if self._end - self._first < 2:
+            return 0.0
+        return self._time[self._end - 1] - self._time[self._first]
+
+    @property
+    def locked(self):
+        return self.span >= self.min_span
+
+    @property
+    def period(self):
+        """Fitted seconds per sample (nominal until locked)"""
+        if not self.locked:
+            return 1 / self.nominal
+        if self._period is None:
+            # Each point against the one half the window later
+            index, times = self._index[self._first:self._end], self._time[self._first:self._end]
+            half = len(index) // 2
+            slopes = (times[half:2 * half] - times[:half]) / (index[half:2 * half] - index[:half])
+            self._period = float(np.median(slopes))
+        return self._period
+
+    @property
+    def rate(self):
+        return 1 / self.period
+
+    def counters(self):
+        return {'blocks': self.seq,
+                'sample_rate': self.rate,
+                'rate_locked': self.locked}
+
+
+class UniformResampler:
+    """Linear interpolation of a stream arriving at a measured rate onto a fixed `rate` grid.
+
+    process() takes each (channels, n) block with the input rate of the
+    moment and returns the output samples that fall inside it. The grid
+    position and the block's last sample carry over, so output samples
+    between two blocks are interpolated across them and the output rate is
+    exact over any number of blocks. All channels share one gather.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.reset()
+
+    def reset(self):
+        self._last = None           # (channels, 1) last input sample
+        self._position = 0.0        # input position of the next output sample, 0 = _last
+
+    def process(self, block, input_rate):
+        """Output samples of a (channels, n) block received at `input_rate` samples/s"""
+        x = block if self._last is None else np.hstack((self._last, block))
+        if x.shape[1] < 2:
+            self._last = x[:, -1:] if x.shape[1] else self._last
+            return block[:, :0]
+        step = input_rate / self.rate
+        end = x.shape[1] - 1
+        k = int(np.floor((end - self._position) / step)) + 1 if self._position <= end else 0
+        positions = self._position + np.arange(k) * step
+        j = np.minimum(positions.astype(np.intp), end - 1)
+        w = positions - j
+        out = x[:, j] + w * (x[:, j + 1] - x[:, j])
+        self._position += k * step - end
+        self._last = x[:, -1:].copy()
+        return out
@@ -0,0 +1,161 @@
+import numpy as np
+
+SEGMENT = 'Segment'     # browse the segments one at a time
+AVERAGE = 'Average'
+ENVELOPE = 'Envelope'   # min/max of every sample position over all segments (peak detect)
+SEGMENT_MODES = [SEGMENT, AVERAGE, ENVELOPE]
+SEGMENT_COUNTS = [10, 100, 1000, 5000]
+
+
+class SegmentGatherer:
+    """Turns fired triggers into segments once their post-trigger samples have arrived.
+
+    Triggers (absolute indices from TriggerEngine) wait in `pending` until
+    the ring holds `length` samples from `pre_trigger` before them; gather()
+    then copies all that are ready in one fancy-index gather. A trigger
+    whose first samples already left the ring is counted in `missed`.
+    """
+
+    def __init__(self, length=0, pre_trigger=0):
+        self.length = length
+        self.pre_trigger = pre_trigger
+        self.clear()
+
+    def clear(self):
+        self.pending = []
+        self.missed = 0
+
+    def configure(self, length, pre_trigger):
+        """Change the segment geometry; waiting triggers are dropped"""
+        if (length, pre_trigger) != (self.length, self.pre_trigger):
+            self.length = length
+            self.pre_trigger = pre_trigger
+            self.clear()
+
+    def gather(self, ring, triggers=(), limit=None):
+        """(trigger positions, (k, channels, length) segments) of the triggers complete in `ring`"""
+        self.pending.extend(int(t) for t in triggers)
+        if not self.pending:
+            return np.empty(0, dtype=np.int64), None
+        head = ring.head
+        starts = np.array(self.pending, dtype=np.int64) - self.pre_trigger
+        ready = starts + self.length <= head
+        lost = ready & (starts < head - len(ring))
+        self.missed += int(lost.sum())
+        self.pending = [t for t, r in zip(self.pending, ready) if not r]
+        starts = starts[ready & ~lost][:limit]
+        if len(starts) == 0:
+            return starts, None
+        # (k, length) sample indices into the newest samples, oldest segment first
+        oldest = int(starts[0])
+        window = ring.latest(head - oldest)
+        index = (starts - oldest)[:, None] + np.arange(self.length)
+        return starts + self.pre_trigger, window[index].transpose(0, 2, 1)
+
+
+class SegmentMemory:
+    """Segmented acquisition: every trigger captured into the next row of a preallocated array.
+
+    arm() allocates (segments, channels, length) float32 rows once. capture()
+    is fed each chunk's fired triggers (absolute indices from TriggerEngine)
+    and the ring they were found in; a trigger is copied as soon as its
+    post-trigger samples are in the ring (see SegmentGatherer). Triggers are
+    taken from the stream as it arrives, so there is no re-arm dead time
+    beyond the trigger holdoff: back-to-back and even overlapping events get
+    their own segments.
+
+    The running sum, min and max over segments are updated with each batch,
+    so average() and envelope() cost one pass over a single segment however
+    many were captured. Capture stops once the memory is full.
+    """
+
+    def __init__(self):
+        self.gatherer = SegmentGatherer()
+        self.disarm()
+
+    @property
+    def armed(self):
+        return self.data is not None and not self.full
+
+    @property
+    def full(self):
+        return self.data is not None and self.count == len(self.data)
+
+    @property
+    def length(self):
+        return self.data.shape[-1] if self.data is not None else 0
+
+    @property
+    def pre_trigger(self):
+        return self.gatherer.pre_trigger
+
+    @property
+    def missed(self):
+        """Triggers whose pre-trigger samples had already left the ring"""
+        return self.gatherer.missed
+
+    def arm(self, segments, length, pre_trigger, channels):
+        """Allocate the memory and start capturing from segment 0"""
+        if self.data is None or self.data.shape != (segments, channels, length):
+            self.data = np.empty((segments, channels, length), dtype=np.float32)
+            self.positions = np.empty(segments, dtype=np.int64)
+            self._sum = np.empty((channels, length))
+            self._min = np.empty((channels, length), dtype=np.float32)
+            self._max = np.empty((channels, length), dtype=np.float32)
+        self.gatherer.configure(length, pre_trigger)
+        self.clear()
+
+    def disarm(self):
+        """Release the memory"""
+        self.data = None
+        self.positions = None
+        self._sum = self._min = self._max = None
+        self.count = 0
+        self.gatherer.clear()
+
+    def clear(self):
+        """Forget the captured segments; the memory stays allocated"""
+        self.count = 0
+        self.gatherer.clear()
+        if self._sum is not None:
+            self._sum[:] = 0
+            self._min[:] = np.inf
+            self._max[:] = -np.inf
+
+    def capture(self, ring, triggers=()):
+        """Copy every trigger whose segment is complete in `ring` (a (samples, channels) RingBuffer)"""
+        if not self.armed:
+            return 0
+        positions, segments = self.gatherer.gather(ring, triggers, limit=len(self.data) - self.count)
+        k = len(positions)
+        if k == 0:
+            return 0
+        batch = self.data[self.count:self.count + k]
+        batch[:] = segments
+        self.positions[self.count:self.count + k] = positions
+        self.count += k
+
+        self._sum += batch.sum(axis=0, dtype=np.float64)
+        np.minimum(self._min, batch.min(axis=0), out=self._min)
+        np.maximum(self._max, batch.max(axis=0), out=self._max)
+        return k
+
+    def segment(self, i):
+        """(channels, length) samples of segment i"""
+        return self.data[i]
+
+    def average(self):
+        """(channels, length) mean over the captured segments"""
+        return self._sum / self.count
+
+    def envelope(self):
+        """(min, max), each (channels, length), over the captured segments"""
+        return self._min, self._max
+
+    def timestamps(self, sample_rate):
+        """Trigger time of every captured segment in seconds, on the stream's clock"""
+        return self.positions[:self.count] / sample_rate
+
+    def intervals(self, sample_rate):
+        """Seconds from each segment's trigger to the next one's"""
+        return np.diff(self.positions[:self.count]) / sample_rate
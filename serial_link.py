@@ -0,0 +1,110 @@
+import time
+
+import numpy as np
+
+from measurements import RunningStats
+
+LATENCY_TARGETS = [0.002, 0.005, 0.01, 0.02, 0.05, 0.1]   # seconds, offered in the GUI
+DEFAULT_LATENCY = 0.01
+HISTOGRAM_BUCKETS = 20    # bucket k counts reads of 2**k .. 2**(k+1) - 1 bytes
+RATE_WINDOW = 1.0         # seconds of history in the bytes/s average
+RX_BUFFER = 1 << 16       # driver receive buffer requested where supported (~0.7 s at 921600 baud)
+
+
+class LinkReader:
+    """Event-driven reads from a serial port, with throughput and latency counters.
+
+    Instead of sleeping a fixed interval and taking read_all(), read() blocks
+    in the port's own read() until a chunk has arrived or the latency target
+    has passed, whichever is first. The chunk size follows the measured byte
+    rate so a chunk takes about one latency target to arrive: a slow link
+    returns after a few bytes, a 921600 baud link returns a target's worth of
+    data per call. Bytes already waiting in the driver are always taken in
+    full, so its buffer never backs up while the host keeps up.
+
+    Counters: bytes read and bytes/s, a histogram of read sizes (power-of-two
+    buckets) and the latency from the oldest byte of a read reaching the
+    driver to delivered() — an upper bound, since arrival times are not known
+    exactly.
+    """
+
+    def __init__(self, port, latency=DEFAULT_LATENCY, max_chunk=1 << 16):
+        self.port = port
+        self.max_chunk = max_chunk
+        self.latency = latency
+        if hasattr(port, 'set_buffer_size'):
+            # Windows drivers default to 4 KB, about 45 ms at 921600 baud
+            try:
+                port.set_buffer_size(rx_size=RX_BUFFER)
+            except Exception as e:
+                print(f"Could not enlarge the receive buffer: {e}")
+        self.bytes_read = 0
+        self.reads = 0
+        self.empty_reads = 0
+        self.rate = 0.0           # bytes/s, averaged over about RATE_WINDOW
+        self.histogram = np.zeros(HISTOGRAM_BUCKETS, dtype=np.int64)
+        self.delivery = RunningStats()   # seconds from arrival to delivered()
+        self._last_return = time.perf_counter()
+        self._oldest = None
+
+    @property
+    def latency(self):
+        return self._latency
+
+    @latency.setter
+    def latency(self, seconds):
+        # read() waits at most this long for its chunk to fill
+        self._latency = seconds
+        self.port.timeout = seconds
+
+    @property
+    def chunk(self):
+        """Bytes expected to arrive within one latency target"""
+        return int(np.clip(self.rate * self._latency, 1, self.max_chunk))
+
+    def read(self):
+        """Next chunk of bytes (empty if nothing arrived within the latency target)"""
+        called = time.perf_counter()
+        waiting = self.port.in_waiting
+        data = self.port.read(min(max(waiting, self.chunk), self.max_chunk))
+        now = time.perf_counter()
+        # Bytes already waiting may have arrived any time since the last read returned
+        self._oldest = self._last_return if waiting else called
+        elapsed = now - self._last_return
+        self._last_return = now
+        if elapsed > 0:
+            weight = min(elapsed / RATE_WINDOW, 1.0)
+            self.rate += weight * (len(data) / elapsed - self.rate)
+        self.reads += 1
+        if not data:
+            self.empty_reads += 1
+            return data
+        self.bytes_read += len(data)
+        self.histogram[min(len(data).bit_length() - 1, HISTOGRAM_BUCKETS - 1)] += 1
+        return data
+
+    def delivered(self):
+        """Record that the last chunk has been decoded and handed on; returns its latency"""
+        if self._oldest is None:
+            return None
+        latency = time.perf_counter() - self._oldest
+        self.delivery.add(latency)
+        self._oldest = None
+        return latency
+
+    def counters(self):
+        return {'bytes_read': self.bytes_read,
+                'bytes_per_s': self.rate,
+                'reads': self.reads,
+                'empty_reads': self.empty_reads,
+                'chunk_histogram': self.histogram.copy(),
+                'latency_mean': self.delivery.mean,
+                'latency_max': self.delivery.max if self.delivery.count else 0.0}
+
+
+def format_link(counters):
+    """One-line summary of LinkReader counters for the status bar"""
+    histogram = counters['chunk_histogram']
+    typical = 1 << int(np.argmax(histogram)) if histogram.any() else 0
+    return (f"{counters['bytes_per_s'] / 1e3:.1f} kB/s, reads ~{typical} B, "
+            f"latency {counters['latency_mean'] * 1e3:.1f} ms (max {counters['latency_max'] * 1e3:.1f} ms)")
@@ -0,0 +1,195 @@
+import time
+
+import numpy as np
+
+from recorder import open_capture
+
+SINE = 'Sine'
+CHIRP = 'Chirp'
+SQUARE = 'Square'
+NOISE = 'Noise'
+WAVEFORMS = [SINE, CHIRP, SQUARE, NOISE]
+
+
+class SampleSource:
+    """Paced producer of sample chunks, standing in for the serial link.
+
+    next_chunk() returns the next `chunk_size` samples as a float64 array once
+    their last sample is due. Deadlines are computed from the start time and
+    the sample count, not by sleeping a fixed interval after each chunk, so
+    the long-run rate is exact however long the consumer takes. `speed`
+    scales the pace (2.0 = twice real time); None produces chunks as fast as
+    they are consumed.
+    """
+
+    def __init__(self, sample_rate=1000, chunk_interval=0.05, speed=1.0):
+        self.sample_rate = sample_rate
+        self.chunk_size = max(int(sample_rate * chunk_interval), 1)
+        self.speed = speed
+        self.position = 0           # samples produced so far
+        self._t0 = None
+
+    @property
+    def exhausted(self):
+        return False
+
+    def start(self):
+        """Open resources and restart the pacing clock"""
+        self.position = 0
+        self._t0 = time.perf_counter()
+
+    def next_chunk(self):
+        """Block until the next chunk is due and return it (empty once exhausted)"""
+        if self._t0 is None:
+            self.start()
+        n = self.chunk_size
+        if self.speed:
+            deadline = self._t0 + (self.position + n) / (self.sample_rate * self.speed)
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return self.generate(n)
+
+    def generate(self, n):
+        """The next n samples, without pacing"""
+        chunk = self._generate(n)
+        self.position += chunk.shape[-1]
+        return chunk
+
+    def stop(self):
+        """Release resources"""
+
+    def _generate(self, n):
+        raise NotImplementedError
+
+
+class SyntheticSource(SampleSource):
+    """Signal generator: sine, linear chirp, square/PWM or noise, plus noise and glitches.
+
+    Phase follows the absolute sample index, so chunks join without
+    discontinuities. A chirp sweeps `frequency` -> `chirp_to` over
+    `chirp_period` seconds and repeats. Glitches are single spikes of
+    `glitch_amplitude` volts and `glitch_width` samples arriving at random
+    (Poisson) at `glitch_rate` per second, for exercising triggers and the
+    display's peak detection.
+    """
+
+    def __init__(self, kind=SINE, frequency=50.0, amplitude=1.0, offset=0.0, duty=0.5,
+                 chirp_to=None, chirp_period=1.0, noise=0.0, glitch_rate=0.0,
+                 glitch_amplitude=1.0, glitch_width=1, seed=None, **pacing):
+        super().__init__(**pacing)
+        if kind not in WAVEFORMS:
+            raise ValueError(f"unknown waveform '{kind}'")
+        self.kind = kind
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.offset = offset
+        self.duty = duty                        # high fraction of each square period (PWM)
+        self.chirp_to = chirp_to if chirp_to is not None else 10 * frequency
+        self.chirp_period = chirp_period
+        self.noise = noise                      # Gaussian noise, volts RMS
+        self.glitch_rate = glitch_rate
+        self.glitch_amplitude = glitch_amplitude
+        self.glitch_width = glitch_width
+        self.rng = np.random.default_rng(seed)
+
+    def _generate(self, n):
+        t = (self.position + np.arange(n)) / self.sample_rate
+        if self.kind == SINE:
+            x = np.sin(2 * np.pi * self.frequency * t)
+        elif self.kind == CHIRP:
+            tau = t % self.chirp_period
+            slope = (self.chirp_to - self.frequency) / self.chirp_period
+            x = np.sin(2 * np.pi * (self.frequency * tau + 0.5 * slope * tau * tau))
+        elif self.kind == SQUARE:
+            x = np.where((t * self.frequency) % 1.0 < self.duty, 1.0, -1.0)
+        else:
+            x = self.rng.standard_normal(n)
+        x *= self.amplitude
+        x += self.offset
+        if self.noise:
+            x += self.rng.normal(0, self.noise, n)
+        if self.glitch_rate:
+            count = self.rng.poisson(self.glitch_rate * n / self.sample_rate)
+            at = self.rng.integers(0, n, count)
+            for k in range(self.glitch_width):
+                x[np.minimum(at + k, n - 1)] += self.glitch_amplitude
+        return x
+
+
+class MultiChannelSource(SampleSource):
+    """Several single-channel sources sampled together as (channels, n) blocks.
+
+    The member sources are only asked for samples (generate()), pacing is
+    this source's own.
+    """
+
+    def __init__(self, sources, **pacing):
+        super().__init__(**pacing)
+        self.sources = list(sources)
+
+    @property
+    def exhausted(self):
+        return any(source.exhausted for source in self.sources)
+
+    def start(self):
+        super().start()
+        for source in self.sources:
+            source.start()
+
+    def stop(self):
+        for source in self.sources:
+            source.stop()
+
+    def _generate(self, n):
+        chunks = [source.generate(n) for source in self.sources]
+        n = min(len(chunk) for chunk in chunks)
+        return np.stack([chunk[:n] for chunk in chunks])
+
+
+def test_signal(sample_rate=1000, **pacing):
+    """What the scope shows without a port: CH1 a 100 Hz, 5 V square wave, CH2 a 50 Hz, 2 V sine"""
+    return MultiChannelSource([SyntheticSource(SQUARE, frequency=100, amplitude=5,
+                                               sample_rate=sample_rate),
+                               SyntheticSource(SINE, frequency=50, amplitude=2,
+                                               sample_rate=sample_rate)],
+                              sample_rate=sample_rate, **pacing)
+
+
+class ReplaySource(SampleSource):
+    """Plays a recorded capture back at its own sample rate times `speed` (None = max).
+
+    The file is memory-mapped when the source starts, so replaying a long
+    capture does not load it; with `loop` it restarts at the end. Captures
+    with several channels replay as (channels, n) blocks.
+    """
+
+    def __init__(self, path, speed=1.0, loop=False, chunk_interval=0.05):
+        self.path = path
+        self.loop = loop
+        header, _ = open_capture(path)
+        super().__init__(sample_rate=header['sample_rate'], chunk_interval=chunk_interval,
+                         speed=speed)
+        self._data = None
+        self._scale = header['scale']
+        self._offset = 0            # read position in the file
+
+    @property
+    def exhausted(self):
+        return not self.loop and self._data is not None and self._offset >= len(self._data)
+
+    def start(self):
+        super().start()
+        header, self._data = open_capture(self.path)
+        self._scale = header['scale']
+        self._offset = 0
+
+    def stop(self):
+        self._data = None
+
+    def _generate(self, n):
+        if self.loop and self._offset >= len(self._data) and len(self._data):
+            self._offset = 0
+        chunk = self._data[self._offset:self._offset + n]
+        self._offset += len(chunk)
+        return (chunk * self._scale).T
@@ -0,0 +1,137 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ring_buffer import RingBuffer
+
+HANN = 'Hann'
+BLACKMAN_HARRIS = 'Blackman-Harris'
+FLAT_TOP = 'Flat-top'
+WINDOW_TYPES = [HANN, BLACKMAN_HARRIS, FLAT_TOP]
+SEGMENT_SIZES = [256, 512, 1024, 2048, 4096, 8192]
+
+_SCIPY_WINDOWS = {HANN: 'hann', BLACKMAN_HARRIS: 'blackmanharris', FLAT_TOP: 'flattop'}
+
+# Windows and frequency axes shared by every analyzer, keyed by configuration
+_window_cache = {}
+_axis_cache = {}
+
+MIN_DB = -160.0
+
+
+def spectrum_window(kind, n):
+    """Periodic window of length n, built once per (kind, n)"""
+    key = (kind, n)
+    window = _window_cache.get(key)
+    if window is None:
+        # Deferred: scipy.signal is slow to import and only needed once a spectrum is shown
+        from scipy.signal import get_window
+        window = get_window(_SCIPY_WINDOWS[kind], n, fftbins=True)
+        _window_cache[key] = window
+    return window
+
+
+def frequency_axis(n, fs):
+    """rfft bin frequencies for an n-point segment, built once per (n, fs)"""
+    key = (n, fs)
+    axis = _axis_cache.get(key)
+    if axis is None:
+        axis = np.fft.rfftfreq(n, 1 / fs)
+        _axis_cache[key] = axis
+    return axis
+
+
+class SpectrumAnalyzer:
+    """Welch-averaged amplitude spectrum that follows a RingBuffer incrementally.
+
+    The stream is cut into power-of-two segments advancing by
+    `segment * (1 - overlap)` samples, positioned on absolute ring indices.
+    update() transforms only the segments completed since the previous call
+    (one batched rfft), keeps the power spectra of the last `averages`
+    segments with their running sum, and appends each new spectrum in dB to
+    a `waterfall_rows` deep 2-D ring for the spectrogram view.
+
+    Magnitudes are amplitude-corrected for the window, so a sine of
+    amplitude A reads 20*log10(A) dBV at its bin (exactly so with FLAT_TOP).
+    """
+
+    def __init__(self, segment=1024, window=HANN, overlap=0.5, averages=8, fs=1000,
+                 waterfall_rows=128):
+        self.segment = segment
+        self.window = window
+        self.overlap = overlap
+        self.averages = averages
+        self.fs = fs
+        self.waterfall_rows = waterfall_rows
+        self.reset()
+
+    @property
+    def step(self):
+        return max(int(self.segment * (1 - self.overlap)), 1)
+
+    @property
+    def frequencies(self):
+        return frequency_axis(self.segment, self.fs)
+
+    def reset(self):
+        """Drop the average and the waterfall; the next update starts over"""
+        bins = self.segment // 2 + 1
+        self._next = None                   # absolute index of the next segment start
+        self._powers = RingBuffer(self.averages, item_shape=(bins,))
+        self._sum = np.zeros(bins)
+        self.waterfall = RingBuffer(self.waterfall_rows, item_shape=(bins,))
+        self.waterfall.latest(self.waterfall_rows)[:] = MIN_DB
+        self.segments = 0
+
+    def configure(self, **settings):
+        """Update settings; any change restarts the average"""
+        changed = False
+        for key, value in settings.items():
+            if not hasattr(self, key):
+                raise AttributeError(f"unknown spectrum setting '{key}'")
+            if getattr(self, key) != value:
+                setattr(self, key, value)
+                changed = True
+        if changed:
+            self.reset()
+        return changed
+
+    def update(self, ring):
+        """Transform the segments of `ring` completed since the last call; returns their count"""
+        head = ring.head
+        step = self.step
+        # After a pause only the segments that still count towards the average matter
+        oldest = head - self.segment - (self.averages - 1) * step
+        oldest = max(oldest, head - len(ring))
+        if self._next is None or self._next < oldest:
+            self._next = max(oldest, 0)
+        count = (head - self._next - self.segment) // step + 1
+        if count <= 0:
+            return 0
+
+        span = (count - 1) * step + self.segment
+        data = ring.latest(head - self._next)[:span]
+        segments = sliding_window_view(data, self.segment)[::step]
+        segments = segments - segments.mean(axis=1, keepdims=True)   # remove DC per segment
+        from scipy.fft import rfft
+        window = spectrum_window(self.window, self.segment)
+        spectra = rfft(segments * window, axis=1)
+        # Single-sided amplitude: 2|X| / sum(w), averaged as power
+        power = np.abs(spectra) ** 2 * (2 / window.sum()) ** 2
+        power[:, 0] /= 4
+        self._next += count * step
+
+        # The average is over the newest `averages` segments, the oldest fall out of the ring
+        self._powers.write(power[-self.averages:])
+        self._sum = self._powers.latest(len(self._powers)).sum(axis=0)
+        self.waterfall.write(self._to_db(power[-self.waterfall_rows:]))
+        self.segments += count
+        return count
+
+    def spectrum_db(self):
+        """(frequencies, averaged amplitude in dBV), or None before the first segment"""
+        if len(self._powers) == 0:
+            return None
+        return self.frequencies, self._to_db(self._sum / len(self._powers))
+
+    def _to_db(self, power):
+        return 10 * np.log10(np.maximum(power, 10 ** (MIN_DB / 10)))
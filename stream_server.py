@@ -0,0 +1,313 @@
+import base64
+import collections
+import hashlib
+import os
+import selectors
+import socket
+import struct
+import threading
+
+import numpy as np
+
+# Frame: header, then channels x samples float32 (little-endian), one row per channel
+FRAME_MAGIC = b'OSCB'
+FRAME_HEADER = struct.Struct('<4sHxxIqd')   # magic, channels, samples, start index, sample rate
+
+DROP_OLDEST = 'drop-oldest'     # a full queue loses its oldest frame
+DROP_NEWEST = 'drop-newest'     # a full queue refuses the new frame
+DISCONNECT = 'disconnect'       # a full queue closes the connection
+POLICIES = [DROP_OLDEST, DROP_NEWEST, DISCONNECT]
+
+_WS_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def parse_address(text):
+    """'host:port' or ':port' -> TCP address; anything else is a Unix socket path"""
+    host, sep, port = text.rpartition(':')
+    if sep and port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return text
+
+
+def encode_frame(block, start, sample_rate):
+    """A (channels, n) block as one frame buffer; the float32 conversion is its only copy"""
+    block = np.asarray(block)
+    channels, n = block.shape
+    frame = bytearray(FRAME_HEADER.size + 4 * channels * n)
+    FRAME_HEADER.pack_into(frame, 0, FRAME_MAGIC, channels, n, start, sample_rate)
+    np.frombuffer(frame, dtype='<f4', offset=FRAME_HEADER.size).reshape(channels, n)[:] = block
+    return memoryview(frame)
+
+
+def _websocket_header(length):
+    """Header of an unmasked binary WebSocket frame carrying `length` bytes"""
+    if length < 126:
+        return struct.pack('!BB', 0x82, length)
+    if length < 1 << 16:
+        return struct.pack('!BBH', 0x82, 126, length)
+    return struct.pack('!BBQ', 0x82, 127, length)
+
+
+class _Client:
+    __slots__ = ('sock', 'name', 'queue', 'out', 'websocket', 'request', 'closing',
+                 'frames_sent', 'frames_dropped', 'bytes_sent')
+
+    def __init__(self, sock, name, max_queue, websocket):
+        self.sock = sock
+        self.name = name
+        self.queue = collections.deque(maxlen=max_queue)
+        self.out = collections.deque()      # memoryviews of the frame being sent
+        self.websocket = websocket
+        self.request = b'' if websocket else None   # HTTP upgrade request until answered
+        self.closing = False
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+
+
+class StreamServer:
+    """Fans live sample blocks out to local subscribers over TCP or a Unix socket.
+
+    publish() encodes each (channels, n) block once into a frame buffer and
+    appends a reference to it to every subscriber's bounded queue, then
+    wakes the server thread; it never blocks on a socket. The server thread
+    sends memoryview slices of that one buffer to every subscriber through
+    non-blocking sockets, so a block is copied once however many listen.
+
+    A subscriber that cannot keep up fills its queue, and `policy` decides
+    what happens: drop its oldest queued frame, drop the new frame, or
+    disconnect it. Frames are dropped whole and counted per subscriber, so
+    what a subscriber receives is always a valid frame stream whose start
+    indices show the gaps.
+
+    With `websocket` the server speaks WebSocket instead (binary messages
+    of the same frames), for browser dashboards.
+    """
+
+    def __init__(self, address, sample_rate, max_queue=64, policy=DROP_OLDEST, websocket=False):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown drop policy '{policy}'")
+        self.address = address
+        self.sample_rate = sample_rate
+        self.max_queue = max_queue
+        self.policy = policy
+        self.websocket = websocket
+        self.frames_published = 0
+        self.clients_served = 0
+        self.clients_dropped = 0        # disconnected by the DISCONNECT policy
+        self._clients = {}
+        self._listener = None
+        self._thread = None
+        self._running = False
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+
+    @property
+    def subscribers(self):
+        return len(self._clients)
+
+    def start(self):
+        family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+        self._listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(self.address)
+        self._listener.listen()
+        self._listener.setblocking(False)
+        if family == socket.AF_INET:
+            self.address = self._listener.getsockname()     # the real port when 0 was asked
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def publish(self, block, start):
+        """Queue a (channels, n) block whose first sample has absolute index `start`"""
+        clients = [c for c in list(self._clients.values()) if c.request is None and not c.closing]
+        if not clients or np.shape(block)[-1] == 0:
+            return
+        frame = encode_frame(block, start, self.sample_rate)
+        self.frames_published += 1
+        for client in clients:
+            if len(client.queue) == self.max_queue:
+                if self.policy == DISCONNECT:
+                    client.closing = True
+                    self.clients_dropped += 1
+                    continue
+                client.frames_dropped += 1
+                if self.policy == DROP_NEWEST:
+                    continue
+            # Full with DROP_OLDEST: the bounded deque evicts the oldest frame
+            client.queue.append(frame)
+        self._wake()
+
+    def counters(self):
+        clients = list(self._clients.values())
+        return {'subscribers': len(clients),
+                'clients_served': self.clients_served,
+                'clients_dropped': self.clients_dropped,
+                'frames_published': self.frames_published,
+                'frames_sent': sum(c.frames_sent for c in clients),
+                'frames_dropped': sum(c.frames_dropped for c in clients),
+                'bytes_sent': sum(c.bytes_sent for c in clients),
+                'per_client': {c.name: {'queued': len(c.queue), 'sent': c.frames_sent,
+                                        'dropped': c.frames_dropped} for c in clients}}
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._running = False
+        self._wake()
+        self._thread.join(1.0)
+        self._thread = None
+        for client in list(self._clients.values()):
+            client.sock.close()
+        self._clients.clear()
+        self._listener.close()
+        self._wake_r.close()
+        self._wake_w.close()
+        if isinstance(self.address, str):
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass    # a wake-up is already pending
+
+    def _run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._listener, selectors.EVENT_READ, 'accept')
+        selector.register(self._wake_r, selectors.EVENT_READ, 'wake')
+        while self._running:
+            for key, events in selector.select():
+                if key.data == 'accept':
+                    self._accept(selector)
+                elif key.data == 'wake':
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                else:
+                    client = key.data
+                    if events & selectors.EVENT_READ:
+                        self._receive(client)
+            # Send what is queued; sockets that cannot take it all are watched for space
+            for client in list(self._clients.values()):
+                if not client.closing:
+                    self._flush(client)
+                if client.closing:
+                    self._close(selector, client)
+                    continue
+                events = selectors.EVENT_READ
+                if client.out or (client.queue and client.request is None):
+                    events |= selectors.EVENT_WRITE
+                if selector.get_key(client.sock).events != events:
+                    selector.modify(client.sock, events, client)
+        selector.close()
+
+    def _accept(self, selector):
+        try:
+            sock, peer = self._listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        name = f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else f"unix-{self.clients_served}"
+        client = _Client(sock, name, self.max_queue, self.websocket)
+        self._clients[sock.fileno()] = client
+        self.clients_served += 1
+        selector.register(sock, selectors.EVENT_READ, client)
+
+    def _receive(self, client):
+        """Subscribers only talk to hang up, or to open a WebSocket"""
+        try:
+            data = client.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            client.closing = True
+        elif client.request is not None:
+            client.request += data
+            if b'\r\n\r\n' in client.request:
+                self._accept_websocket(client)
+        elif client.websocket and data[0] & 0x0F == 0x8:
+            client.closing = True   # close frame
+
+    def _accept_websocket(self, client):
+        key = None
+        for line in client.request.split(b'\r\n'):
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'sec-websocket-key':
+                key = value.strip()
+        if key is None:
+            client.closing = True
+            return
+        accept = base64.b64encode(hashlib.sha1(key + _WS_GUID).digest())
+        client.out.append(memoryview(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                                     b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + accept + b'\r\n\r\n'))
+        client.request = None
+
+    def _flush(self, client):
+        """Send as much as the socket takes without blocking"""
+        while True:
+            if not client.out:
+                if not client.queue or client.request is not None:
+                    return
+                frame = client.queue.popleft()
+                if client.websocket:
+                    client.out.append(memoryview(_websocket_header(len(frame))))
+                client.out.append(frame)
+                client.frames_sent += 1
+            try:
+                sent = client.sock.send(client.out[0])
+            except BlockingIOError:
+                return
+            except OSError:
+                client.closing = True
+                return
+            client.bytes_sent += sent
+            if sent == len(client.out[0]):
+                client.out.popleft()
+            else:
+                client.out[0] = client.out[0][sent:]
+
+    def _close(self, selector, client):
+        selector.unregister(client.sock)
+        del self._clients[client.sock.fileno()]
+        client.sock.close()
+
+
+def subscribe(address):
+    """Yield (start index, sample rate, (channels, n) float32 block) from a StreamServer"""
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.connect(address)
+    header = bytearray(FRAME_HEADER.size)
+    try:
+        while True:
+            if not _recv_exactly(sock, memoryview(header)):
+                return
+            magic, channels, n, start, sample_rate = FRAME_HEADER.unpack(header)
+            if magic != FRAME_MAGIC:
+                raise ValueError("not a sample stream")
+            block = np.empty((channels, n), dtype='<f4')
+            if not _recv_exactly(sock, memoryview(block).cast('B')):
+                return
+            yield start, sample_rate, block
+    finally:
+        sock.close()
+
+
+def _recv_exactly(sock, view):
+    while len(view):
+        n = sock.recv_into(view)
+        if n == 0:
+            return False
+        view = view[n:]
+    return True
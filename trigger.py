@@ -0,0 +1,214 @@
+from collections import deque
+
+import numpy as np
+
+EDGE = 'Edge'
+PULSE_WIDTH = 'Pulse Width'
+RUNT = 'Runt'
+TRIGGER_TYPES = [EDGE, PULSE_WIDTH, RUNT]
+
+
+def _schmitt(x, upper, lower, positive, initial):
+    """Comparator with hysteresis: 1 above `upper`, 0 below `lower`, held in between.
+
+    Returns the state after every sample (-1 while still undetermined).
+    `positive` selects the comparison strictness so that a zero-width band
+    reproduces `prev < level <= current` for rising and `prev > level >= current`
+    for falling edges.
+    """
+    if positive:
+        high = x >= upper
+        low = x < lower
+    else:
+        high = x > upper
+        low = x <= lower
+    mark = np.full(len(x), -1, dtype=np.int8)
+    mark[low] = 0
+    mark[high] = 1
+    # Forward-fill the last decided state over the band between the thresholds
+    last = np.where(mark >= 0, np.arange(len(x)), -1)
+    np.maximum.accumulate(last, out=last)
+    return np.where(last >= 0, mark[last], np.int8(initial))
+
+
+class TriggerEngine:
+    """Vectorized trigger detection on the continuous sample stream.
+
+    process() is fed every chunk as it arrives and returns the absolute sample
+    indices (ring buffer `head` coordinates) where the trigger fired. The
+    comparator state, open pulses and holdoff carry over between calls, so an
+    edge split across two serial reads is still found exactly once. A chunk
+    that does not start where the previous one ended (samples were lost)
+    restarts the comparator and open pulse, so no edge spans the hole.
+
+    kind:        EDGE, PULSE_WIDTH (fires at the end of a pulse whose width in
+                 samples lies in [width_min, width_max]) or RUNT (fires when a
+                 pulse crosses `level` but returns without reaching `runt_level`).
+    edge:        'Rising' or 'Falling'; for pulse and runt triggers it selects a
+                 positive or negative pulse.
+    hysteresis:  volts the signal must move back past the level to re-arm.
+    holdoff:     minimum number of samples between two triggers.
+    pre_trigger / post_trigger: samples shown before / after the trigger point.
+    """
+
+    def __init__(self, level=0.0, edge='Rising', kind=EDGE, hysteresis=0.0, holdoff=0,
+                 pre_trigger=0, post_trigger=0, width_min=0, width_max=None,
+                 runt_level=None, history=64):
+        self.level = level
+        self.edge = edge
+        self.kind = kind
+        self.hysteresis = hysteresis
+        self.holdoff = holdoff
+        self.pre_trigger = pre_trigger
+        self.post_trigger = post_trigger
+        self.width_min = width_min
+        self.width_max = width_max
+        self.runt_level = runt_level
+        self.triggers = deque(maxlen=history)
+        self.trigger_count = 0
+        self.reset()
+
+    def reset(self):
+        """Disarm and forget any partially seen pulse"""
+        self._state = -1            # comparator output after the last sample
+        self._pulse_start = None    # absolute index where the open pulse began
+        self._pulse_reached = False  # runt: the open pulse already hit runt_level
+        self._next_allowed = 0      # holdoff: earliest index for the next trigger
+        self._end = None            # index one past the last sample processed
+        self.triggers.clear()
+
+    def configure(self, **settings):
+        """Update settings; switching type or polarity restarts detection"""
+        restart = any(key in ('kind', 'edge', 'runt_level') and getattr(self, key) != value
+                      for key, value in settings.items())
+        for key, value in settings.items():
+            if not hasattr(self, key):
+                raise AttributeError(f"unknown trigger setting '{key}'")
+            setattr(self, key, value)
+        if restart:
+            self.reset()
+
+    def process(self, samples, start):
+        """Scan a chunk whose first sample has absolute index `start`"""
+        x = np.asarray(samples, dtype=np.float64)
+        if len(x) == 0:
+            return np.empty(0, dtype=np.int64)
+        if start != self._end:
+            self._state = -1
+            self._pulse_start = None
+            self._pulse_reached = False
+        self._end = start + len(x)
+
+        positive = self.edge == 'Rising'
+        if self.kind == RUNT:
+            candidates = self._runt(x if positive else -x, start, positive)
+        else:
+            if positive:
+                state = _schmitt(x, self.level, self.level - self.hysteresis, True, self._state)
+            else:
+                state = _schmitt(x, self.level + self.hysteresis, self.level, False, self._state)
+            up, down = self._transitions(state, start)
+            if not positive:
+                up, down = down, up
+            if self.kind == EDGE:
+                candidates = up
+            else:
+                candidates = self._pulse_width(up, down)
+
+        fired = self._apply_holdoff(candidates)
+        self.triggers.extend(fired.tolist())
+        self.trigger_count += len(fired)
+        return fired
+
+    def latest_complete(self, head):
+        """Newest trigger whose post-trigger samples have all arrived by `head`"""
+        for t in reversed(self.triggers):
+            if t + self.post_trigger <= head:
+                return t
+        return None
+
+    def _transitions(self, state, start):
+        """Absolute indices of 0->1 and 1->0 comparator changes, continuing the last chunk"""
+        prev = np.empty_like(state)
+        prev[0] = self._state
+        prev[1:] = state[:-1]
+        self._state = int(state[-1])
+        up = start + np.flatnonzero((prev == 0) & (state == 1))
+        down = start + np.flatnonzero((prev == 1) & (state == 0))
+        return up, down
+
+    def _match_starts(self, starts, ends):
+        """Start index of the pulse each end closes (-1 when none was seen)"""
+        k = np.searchsorted(starts, ends) - 1
+        matched = starts[np.maximum(k, 0)] if len(starts) else np.zeros_like(ends)
+        matched = np.where(k >= 0, matched, -1)
+        if self._pulse_start is not None:
+            matched[k < 0] = self._pulse_start
+        return matched
+
+    def _track_open_pulse(self, starts, ends):
+        """Remember a pulse that is still open at the end of the chunk"""
+        if len(starts) and (len(ends) == 0 or starts[-1] > ends[-1]):
+            self._pulse_start = int(starts[-1])
+            return True
+        if len(ends):
+            self._pulse_start = None
+        return False
+
+    def _pulse_width(self, starts, ends):
+        began = self._match_starts(starts, ends)
+        self._track_open_pulse(starts, ends)
+        width = ends - began
+        ok = began >= 0
+        ok &= width >= self.width_min
+        if self.width_max is not None:
+            ok &= width <= self.width_max
+        return ends[ok]
+
+    def _runt(self, x, start, positive):
+        """Pulses crossing `level` that fall back without reaching `runt_level`.
+
+        Negative runts arrive here with x and the levels mirrored, so the
+        logic only has to handle positive pulses.
+        """
+        sign = 1 if positive else -1
+        low = sign * self.level
+        high = sign * (self.runt_level if self.runt_level is not None else self.level)
+        state = _schmitt(x, low, low - self.hysteresis, True, self._state)
+        starts, ends = self._transitions(state, start)
+
+        # Samples at or past the upper level, counted between pulse edges
+        hits = np.zeros(len(x) + 1, dtype=np.int64)
+        np.cumsum(x >= high, out=hits[1:])
+        carried = self._pulse_start is not None
+        began = self._match_starts(starts, ends)
+        inside = hits[ends - start] - hits[np.maximum(began - start, 0)]
+        runt = (began >= 0) & (inside == 0)
+        if carried:
+            # The first end may close a pulse opened in an earlier chunk
+            from_before = began < start
+            runt &= ~(from_before & self._pulse_reached)
+
+        was_open = self._pulse_start
+        if self._track_open_pulse(starts, ends):
+            self._pulse_reached = bool(hits[-1] - hits[self._pulse_start - start] > 0)
+        elif was_open is not None and self._pulse_start is not None:
+            self._pulse_reached |= bool(hits[-1] > 0)
+        return ends[runt]
+
+    def _apply_holdoff(self, candidates):
+        """Greedy holdoff: each trigger blocks the next `holdoff` samples"""
+        candidates = candidates[candidates >= self._next_allowed]
+        if len(candidates) == 0:
+            return candidates
+        if self.holdoff <= 0:
+            self._next_allowed = int(candidates[-1]) + 1
+            return candidates
+        fired = []
+        i = 0
+        while i < len(candidates):
+            t = int(candidates[i])
+            fired.append(t)
+            i = int(np.searchsorted(candidates, t + self.holdoff))
+        self._next_allowed = fired[-1] + self.holdoff
+        return np.array(fired, dtype=np.int64)